@@ -46,6 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "user.middleware.MetricsMiddleware",
+    "user.middleware.PerformanceMiddleware",
+    "user.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -85,17 +88,63 @@ WSGI_APPLICATION = "api_service.wsgi.application"
 #     }
 # }
 
+# Connections of the default database come from a per-process pool (see
+# user/db_pool.py) and go back to it at the end of each request, so
+# CONN_MAX_AGE stays 0. Size it so that workers * threads (or concurrent
+# async requests) * DB_POOL_MAX_SIZE fits in max_connections. Timeouts
+# and lifetimes are in seconds; 0 disables MAX_USES and MAX_LIFETIME.
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "1") == "1"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": (
+            "user.db_backends.postgresql" if DB_POOL_ENABLED
+            else "django.db.backends.postgresql"
+        ),
         "HOST": os.environ["POSTGRES_HOST"],
         "NAME": os.environ["POSTGRES_DB"],
         "USER": os.environ["POSTGRES_USER"],
         "PASSWORD": os.environ["POSTGRES_PASSWORD"],
-        "PORT": os.environ["POSTGRES_PORT"]
+        "PORT": os.environ["POSTGRES_PORT"],
+        "POOL": {
+            "MIN_SIZE": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+            "MAX_IDLE": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+            "MAX_USES": int(os.getenv("DB_POOL_MAX_USES", 0)),
+            "MAX_LIFETIME": float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+            "HEALTH_CHECK_AFTER": float(
+                os.getenv("DB_POOL_HEALTH_CHECK_AFTER", 1)
+            ),
+        },
     }
 }
 
+# Read replicas, as "host[:port[:weight]]" separated by commas. GET, HEAD
+# and OPTIONS requests read from one of them picked by weight (see
+# user/replicas.py), except for users who posted, liked, commented or
+# followed in the last REPLICA_STICKY_SECONDS; set REPLICA_PIN_CACHE_ALIAS
+# to a CACHES alias shared by every worker (the system checks refuse a
+# local-memory one). A replica failing to connect is skipped for
+# REPLICA_RETRY_AFTER seconds.
+DATABASE_REPLICAS = {}
+for number, replica in enumerate(
+        filter(None, os.getenv("DB_REPLICAS", "").split(",")), start=1
+):
+    host, port, weight = (replica.strip().split(":") + ["", ""])[:3]
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS[f"replica_{number}"] = float(weight or 1)
+
+DATABASE_ROUTERS = ["user.replicas.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+REPLICA_RETRY_AFTER = float(os.getenv("REPLICA_RETRY_AFTER", 30))
+REPLICA_PIN_CACHE_ALIAS = os.getenv("REPLICA_PIN_CACHE_ALIAS", "default")
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -114,24 +163,155 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The first hasher verifies and rehashes existing pbkdf2_sha256 hashes with
+# PASSWORD_HASH_ITERATIONS iterations.
+PASSWORD_HASHERS = [
+    "user.hashers.TunedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", 600_000))
+
+# Registration and login hash passwords in this many threads; requests
+# beyond PASSWORD_HASHING_MAX_PENDING queued jobs get a 503.
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", 2))
+PASSWORD_HASHING_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASHING_MAX_PENDING", 32)
+)
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+        "user.authentication.JWTAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "user.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "user.pagination.KeysetPagination",
+    "PAGE_SIZE": int(os.getenv("PAGE_SIZE", 20)),
 }
 
+PAGINATION_MAX_PAGE_SIZE = int(os.getenv("PAGINATION_MAX_PAGE_SIZE", 100))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
 }
 
+# Home timeline: posts are fanned out to followers' timelines on write,
+# except for authors with more followers than the limit below, whose posts
+# are merged into feeds at read time.
+TIMELINE_FANOUT_FOLLOWER_LIMIT = int(
+    os.getenv("TIMELINE_FANOUT_FOLLOWER_LIMIT", 10000)
+)
+TIMELINE_BACKFILL_LIMIT = int(os.getenv("TIMELINE_BACKFILL_LIMIT", 200))
+
+# Spread like/comment counter updates of each post over this many rows to
+# avoid lock contention on viral posts (0 updates the post row directly).
+# Run `python manage.py reconcile_counters` periodically to fold them back.
+POST_COUNTER_SHARDS = int(os.getenv("POST_COUNTER_SHARDS", 0))
+
+# Per-process follow graph cache, bounded by the number of cached user ids.
+# Set FOLLOW_CACHE_SHARED_ALIAS to a CACHES alias reachable by every worker
+# to propagate invalidations between processes.
+FOLLOW_CACHE_MAX_IDS = int(os.getenv("FOLLOW_CACHE_MAX_IDS", 2_000_000))
+FOLLOW_CACHE_TTL = int(os.getenv("FOLLOW_CACHE_TTL", 300))
+FOLLOW_CACHE_SHARED_ALIAS = os.getenv("FOLLOW_CACHE_SHARED_ALIAS")
+
+# Maximum number of ids accepted by the bulk follow/like endpoints.
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 500))
+
+# Resized variants of uploaded images, rendered in a bounded process pool
+# after the upload is committed (IMAGE_PIPELINE_SYNC renders in-process).
+IMAGE_PIPELINE_ENABLED = os.getenv("IMAGE_PIPELINE_ENABLED", "1") == "1"
+IMAGE_PIPELINE_SYNC = os.getenv("IMAGE_PIPELINE_SYNC", "0") == "1"
+IMAGE_PIPELINE_WORKERS = int(os.getenv("IMAGE_PIPELINE_WORKERS", 2))
+IMAGE_PIPELINE_MAX_PENDING = int(os.getenv("IMAGE_PIPELINE_MAX_PENDING", 100))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 40_000_000))
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", 80))
+
+# Post images and avatars are stored once per distinct content, under their
+# SHA-256 digest; unreferenced blobs are deleted after the grace period.
+MEDIA_CONTENT_ADDRESSED = os.getenv("MEDIA_CONTENT_ADDRESSED", "1") == "1"
+MEDIA_BLOB_GRACE_PERIOD = int(os.getenv("MEDIA_BLOB_GRACE_PERIOD", 600))
+# Media files are served by Django with range and cache headers, or handed
+# to the front proxy with MEDIA_SENDFILE set to "x-accel-redirect" (nginx,
+# internal location MEDIA_ACCEL_PREFIX) or "x-sendfile" (Apache, lighttpd).
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", 3600))
+# Uploads are streamed to temporary files and hashed while they arrive.
+FILE_UPLOAD_HANDLERS = ["user.storage.HashingFileUploadHandler"]
+
+# Serialized posts, comments and profiles are cached per object version in
+# a per-process LRU, and in the RENDER_CACHE_SHARED_ALIAS cache when set.
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "1") == "1"
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", 10_000))
+RENDER_CACHE_SHARED_ALIAS = os.getenv("RENDER_CACHE_SHARED_ALIAS")
+RENDER_CACHE_TIMEOUT = int(os.getenv("RENDER_CACHE_TIMEOUT", 3600))
+
+# List endpoints serialize `.values()` rows with compiled row serializers
+# instead of DRF serializers over model instances.
+FAST_SERIALIZATION = os.getenv("FAST_SERIALIZATION", "1") == "1"
+
+# Rows fetched per round trip by the NDJSON data export.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+# Per-request timings in a Server-Timing header, and a log of requests
+# slower than PERF_SLOW_REQUEST_MS with their slowest queries and plans.
+# A PERF_TRACEMALLOC_SAMPLE_RATE fraction of requests also traces memory.
+PERF_INSTRUMENTATION = os.getenv("PERF_INSTRUMENTATION", "0") == "1"
+PERF_SLOW_REQUEST_MS = int(os.getenv("PERF_SLOW_REQUEST_MS", 500))
+PERF_SLOW_QUERIES = int(os.getenv("PERF_SLOW_QUERIES", 3))
+PERF_TRACEMALLOC_SAMPLE_RATE = float(
+    os.getenv("PERF_TRACEMALLOC_SAMPLE_RATE", 0)
+)
+
+# Prometheus metrics at /metrics. Set PROMETHEUS_MULTIPROC_DIR (an empty
+# directory) in the environment to aggregate them over worker processes,
+# and METRICS_TOKEN to require "Authorization: Bearer <token>" to scrape.
+# Without a token only clients in METRICS_ALLOWED_NETWORKS (CIDRs, by
+# REMOTE_ADDR) may scrape; behind a reverse proxy on the same host every
+# request comes from loopback, so set a token or deny /metrics there.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_NETWORKS = [
+    network.strip()
+    for network in os.getenv(
+        "METRICS_ALLOWED_NETWORKS",
+        "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16",
+    ).split(",")
+    if network.strip()
+]
+
+# JWT requests resolve their user from a per-process LRU of User rows.
+# Changes are seen at once by the process making them and within the TTL
+# (seconds) by the others.
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10_000))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 30))
+
+# Revoked token ids are checked in memory; each worker fetches new
+# revocations every TOKEN_REVOCATION_SYNC_INTERVAL seconds. Purge expired
+# ones with `manage.py purge_revoked_tokens`.
+TOKEN_REVOCATION_CHECK_ACCESS = (
+    os.getenv("TOKEN_REVOCATION_CHECK_ACCESS", "1") == "1"
+)
+TOKEN_REVOCATION_SYNC_INTERVAL = float(
+    os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", 1.0)
+)
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Social Media API",
     "DESCRIPTION": "Documentation for Social Media API",
     "VERSION": "1.0.0",
     "SERVE_INCLUDE_SCHEMA": False,
+    # Adds the async register/ and token/ views, which are not DRF views.
+    "PREPROCESSING_HOOKS": ["user.schema.document_function_views"],
 }
 
 # Internationalization
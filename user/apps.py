@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self) -> None:
+        from django.core import checks
+        from django.db.models.signals import post_migrate
+
+        from user import schema, signals  # noqa: F401
+        from user.replicas import check_pin_cache
+        from user.search import ensure_sqlite_search_index
+
+        post_migrate.connect(ensure_sqlite_search_index, sender=self)
+        checks.register(check_pin_cache)
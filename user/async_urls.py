@@ -0,0 +1,27 @@
+from django.urls import path
+
+from user.async_views import (
+    PostCommentListView,
+    PostDetailView,
+    PostListView,
+    ProfileDetailView,
+    ProfileListView,
+)
+
+urlpatterns = [
+    path("posts/", PostListView.as_view(), name="posts-list"),
+    path("posts/<int:pk>/", PostDetailView.as_view(), name="posts-detail"),
+    path(
+        "posts/<int:pk>/comments/",
+        PostCommentListView.as_view(),
+        name="posts-comments",
+    ),
+    path("profile/", ProfileListView.as_view(), name="profile-list"),
+    path(
+        "profile/<int:pk>/",
+        ProfileDetailView.as_view(),
+        name="profile-detail",
+    ),
+]
+
+app_name = "user-async"
@@ -0,0 +1,365 @@
+"""
+Async registration and login, and async variants of the hot read paths.
+
+DRF views are synchronous, so these are plain Django views answering like
+the DRF ones. Validation and queries go through `sync_to_async` and the
+async ORM while password hashing is bounded by `user.hashing`'s pool:
+registration awaits a hash from its threads, login runs `authenticate()`
+with `sync_to_async` in one of its slots. Under ASGI a login spike waits
+for hashing workers, or is refused with a 503 once their queue is full,
+without holding the event loop that serves every other request. Under
+WSGI they work the same, one request per thread.
+
+The read views (`user.async_urls`) authenticate with
+`JWTAuthentication.aauthenticate()`, read pages with the async ORM and
+serialize rows with the same `RowSerializer`s as the sync views, so a
+request only leaves the event loop for its queries and for cache misses.
+"""
+from functools import wraps
+from typing import Any, Callable, Optional
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError
+from django.db.models import QuerySet
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseNotAllowed,
+)
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from user.authentication import JWTAuthentication
+from user.counters import with_counters
+from user.hashing import HashingBusy, hash_password, pool
+from user.models import Comment, Posts, Profile, User
+from user.pagination import CreatedAtKeysetPagination, KeysetPagination
+from user.permissions import IsOwnerOrReadOnly
+from user.render_cache import render_cache
+from user.renderers import ORJSONRenderer
+from user.row_serializers import (
+    CommentRowSerializer,
+    PostRowSerializer,
+    ProfileRowSerializer,
+    RowSerializer,
+)
+from user.serializers import UserSerializer
+from user.timeline import visible_posts
+from user.views import (
+    TIMELINE_ORDERING,
+    feed_ordering,
+    feed_sources,
+    post_feed,
+)
+
+
+def json_response(data, status: int = 200) -> HttpResponse:
+    return HttpResponse(
+        ORJSONRenderer().render(data),
+        status=status,
+        content_type="application/json",
+    )
+
+
+def async_api_view(view: Callable) -> Callable:
+    """
+    Parse JSON or form bodies and answer `HashingBusy` with a 503. Django
+    4.2's `csrf_exempt` and `require_POST` only wrap sync views.
+    """
+
+    @wraps(view)
+    async def wrapper(request: HttpRequest) -> HttpResponse:
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        if request.content_type == "application/json":
+            try:
+                data = orjson.loads(request.body or b"{}")
+            except orjson.JSONDecodeError as error:
+                return json_response(
+                    {"detail": f"JSON parse error - {error}"}, 400
+                )
+            if not isinstance(data, dict):
+                return json_response({"detail": "Expected an object."}, 400)
+        else:
+            data = request.POST.dict()
+
+        try:
+            return await view(request, data)
+        except HashingBusy:
+            response = json_response(
+                {"detail": "Too many logins at once, retry shortly."}, 503
+            )
+            response["Retry-After"] = "1"
+            return response
+
+    # Like DRF's views: token-authenticated, not session-authenticated.
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+@async_api_view
+async def register(request: HttpRequest, data: dict) -> HttpResponse:
+    serializer = UserSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return json_response(serializer.errors, 400)
+
+    fields = dict(serializer.validated_data)
+    password = fields.pop("password")
+    user = User(**fields)
+    user.email = User.objects.normalize_email(user.email)
+    user.password = await hash_password(password)
+    try:
+        await user.asave()
+    except IntegrityError:
+        return json_response(
+            {"email": ["user with this email address already exists."]}, 400
+        )
+
+    rendered = await sync_to_async(lambda: UserSerializer(user).data)()
+    return json_response(rendered, 201)
+
+
+@async_api_view
+async def obtain_token_pair(request: HttpRequest, data: dict) -> HttpResponse:
+    """
+    `TokenObtainPairView`: its serializer runs `authenticate()`, and so
+    the `AUTHENTICATION_BACKENDS`, counted against the hashing pool.
+    """
+    serializer = TokenObtainPairSerializer(
+        data=data, context={"request": request}
+    )
+    try:
+        valid = await sync_to_async(pool.call)(serializer.is_valid)
+    except exceptions.AuthenticationFailed as error:
+        return json_response({"detail": str(error.detail)}, 401)
+    if not valid:
+        return json_response(serializer.errors, 400)
+    return json_response(serializer.validated_data)
+
+
+async def represent(serializer: RowSerializer, rows: list) -> list[dict]:
+    """`to_representations()`, in a thread if the render cache is shared."""
+    if render_cache.shared_alias:
+        return await sync_to_async(serializer.to_representations)(rows)
+    return serializer.to_representations(rows)
+
+
+class AsyncReadView(View):
+    """
+    Read-only async view authenticating and checking permissions like
+    DRF's `APIView`, and answering errors with the same bodies. The
+    permission classes must not query the database.
+    """
+
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    http_method_names = ["get", "head", "options"]
+
+    async def dispatch(
+            self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        try:
+            self.request = await self.initial(request)
+            return await super().dispatch(self.request, *args, **kwargs)
+        except Exception as error:
+            return self.handle_exception(error)
+
+    async def initial(self, request: HttpRequest) -> Request:
+        """Authenticate and check permissions, return the DRF request."""
+        user, auth = AnonymousUser(), None
+        for authentication_class in self.authentication_classes:
+            result = await authentication_class().aauthenticate(request)
+            if result is not None:
+                user, auth = result
+                break
+
+        request = Request(request)
+        request.user = user
+        request.auth = auth
+        for permission_class in self.permission_classes:
+            permission = permission_class()
+            if not permission.has_permission(request, self):
+                if auth is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(
+                    getattr(permission, "message", None)
+                )
+        return request
+
+    def http_method_not_allowed(
+            self, request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        raise exceptions.MethodNotAllowed(request.method)
+
+    def handle_exception(self, error: Exception) -> HttpResponse:
+        """DRF's `exception_handler()`, rendered with orjson."""
+        if isinstance(error, Http404):
+            error = exceptions.NotFound()
+        elif isinstance(error, PermissionDenied):
+            error = exceptions.PermissionDenied()
+        if not isinstance(error, exceptions.APIException):
+            raise error
+
+        authenticate_header = None
+        if isinstance(
+                error,
+                (exceptions.NotAuthenticated, exceptions.AuthenticationFailed),
+        ):
+            authenticate_header = self.authentication_classes[
+                0
+            ]().authenticate_header(self.request)
+            if not authenticate_header:
+                error.status_code = 403
+
+        if isinstance(error.detail, (list, dict)):
+            data = error.detail
+        else:
+            data = {"detail": error.detail}
+        response = json_response(data, error.status_code)
+        if authenticate_header:
+            response["WWW-Authenticate"] = authenticate_header
+        if isinstance(error, exceptions.MethodNotAllowed):
+            response["Allow"] = ", ".join(self._allowed_methods())
+        return response
+
+
+class AsyncRowView(AsyncReadView):
+    """Rows of `get_queryset()` serialized by `row_serializer_class`."""
+
+    row_serializer_class: type[RowSerializer]
+
+    async def get_queryset(self) -> QuerySet:
+        raise NotImplementedError
+
+    def get_serializer(self) -> RowSerializer:
+        return self.row_serializer_class(
+            context={"request": self.request, "format": None, "view": self}
+        )
+
+    async def get_rows(self, serializer: RowSerializer) -> QuerySet:
+        queryset = await self.get_queryset()
+        return queryset.values(
+            *serializer.columns, *queryset.query.annotation_select
+        )
+
+
+class AsyncListView(AsyncRowView):
+    pagination_class: type[KeysetPagination] = KeysetPagination
+
+    async def get(self, request: Request, **kwargs: Any) -> HttpResponse:
+        serializer = self.get_serializer()
+        self.paginator = self.pagination_class()
+        page = await self.paginate(await self.get_rows(serializer))
+        return json_response(
+            self.paginator.get_paginated_data(
+                await represent(serializer, page)
+            )
+        )
+
+    async def paginate(self, rows: QuerySet) -> list:
+        return await self.paginator.apaginate_queryset(
+            rows, self.request, self
+        )
+
+
+class AsyncDetailView(AsyncRowView):
+    async def get(self, request: Request, pk: int) -> HttpResponse:
+        serializer = self.get_serializer()
+        rows = await self.get_rows(serializer)
+        row = await rows.filter(pk=pk).afirst()
+        if row is None:
+            raise exceptions.NotFound()
+        return json_response((await represent(serializer, [row]))[0])
+
+
+class PostListView(AsyncListView):
+    """The home timeline of `PostViewSet`, paged the same way."""
+
+    permission_classes = (IsOwnerOrReadOnly, IsAuthenticated)
+    row_serializer_class = PostRowSerializer
+    pagination_class = CreatedAtKeysetPagination
+
+    def get_keyset_ordering(self) -> Optional[tuple]:
+        return feed_ordering(self.request.query_params) or TIMELINE_ORDERING
+
+    async def get_queryset(self) -> QuerySet[Posts]:
+        # Follow graph lookups may query on a cache miss.
+        return await sync_to_async(post_feed)(
+            self.request.user, self.request.query_params
+        )
+
+    async def get(self, request: Request, **kwargs: Any) -> HttpResponse:
+        if feed_ordering(request.query_params):
+            return await super().get(request, **kwargs)
+
+        serializer = self.get_serializer()
+        self.paginator = self.pagination_class()
+        sources = await sync_to_async(feed_sources)(
+            request.user, request.query_params
+        )
+        page = await self.paginator.apaginate_merged(
+            [
+                source.values(
+                    *serializer.columns, *source.query.annotation_select
+                )
+                for source in sources
+            ],
+            request,
+            self,
+        )
+        return json_response(
+            self.paginator.get_paginated_data(
+                await represent(serializer, page)
+            )
+        )
+
+
+class PostDetailView(AsyncDetailView):
+    permission_classes = (IsOwnerOrReadOnly, IsAuthenticated)
+    row_serializer_class = PostRowSerializer
+
+    async def get_queryset(self) -> QuerySet[Posts]:
+        return with_counters(visible_posts(self.request.user))
+
+
+class PostCommentListView(AsyncListView):
+    permission_classes = (IsOwnerOrReadOnly, IsAuthenticated)
+    row_serializer_class = CommentRowSerializer
+    pagination_class = CreatedAtKeysetPagination
+
+    async def get_queryset(self) -> QuerySet[Comment]:
+        self.posts = visible_posts(self.request.user)
+        return Comment.objects.filter(
+            posts_id=self.kwargs["pk"], posts__in=self.posts
+        )
+
+    async def paginate(self, rows: QuerySet) -> list:
+        page = await super().paginate(rows)
+        if not page and not await self.posts.filter(
+                pk=self.kwargs["pk"]
+        ).aexists():
+            raise exceptions.NotFound()
+        return page
+
+
+class ProfileViewMixin:
+    permission_classes = (IsOwnerOrReadOnly,)
+    row_serializer_class = ProfileRowSerializer
+
+    async def get_queryset(self) -> QuerySet[Profile]:
+        return Profile.objects.all()
+
+
+class ProfileListView(ProfileViewMixin, AsyncListView):
+    pass
+
+
+class ProfileDetailView(ProfileViewMixin, AsyncDetailView):
+    pass
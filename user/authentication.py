@@ -0,0 +1,126 @@
+from typing import Optional
+
+from django.conf import settings
+from django.http import HttpRequest
+from django.utils.translation import gettext_lazy as _
+from rest_framework.request import Request
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+from user.models import TokenUser
+from user.perf import timed
+from user.revocation import ais_revoked, is_revoked
+from user.user_cache import user_cache
+
+# Request attribute holding the last (raw token, decoded token) pair.
+DECODED_TOKEN = "_decoded_access_token"
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """
+    simplejwt's authentication, timed as the `auth` phase, resolving the
+    token's user through `user_cache` into a `TokenUser` instead of
+    loading the `User` row on every request. `USER_ID_CLAIM` must hold the
+    primary key. Revoked access tokens are refused unless
+    `TOKEN_REVOCATION_CHECK_ACCESS` is off.
+
+    `aauthenticate()` does the same for async views and, with the user
+    cached and revocations synced, without leaving the event loop.
+
+    A token decoded for a request, by `user_id()` in a middleware, is kept
+    on the request so authentication does not verify its signature again.
+    """
+
+    def authenticate(self, request: Request) -> Optional[tuple]:
+        with timed("auth"):
+            raw_token = self._raw_token(request)
+            if raw_token is None:
+                return None
+            token = self._validated(raw_token, request)
+            return self.get_user(token), token
+
+    async def aauthenticate(self, request: HttpRequest) -> Optional[tuple]:
+        with timed("auth"):
+            raw_token = self._raw_token(request)
+            if raw_token is None:
+                return None
+            token = self._decode(raw_token, request)
+            if self._check_revocation and await ais_revoked(token):
+                raise InvalidToken(_("Token is blacklisted"))
+            return await self.aget_user(token), token
+
+    def user_id(self, request: HttpRequest):
+        """The user id of the request's valid access token, or None."""
+        try:
+            raw_token = self._raw_token(request)
+            if raw_token is None:
+                return None
+            return self._user_id(self._decode(raw_token, request))
+        except (AuthenticationFailed, InvalidToken):
+            return None
+
+    def _raw_token(self, request: HttpRequest) -> Optional[bytes]:
+        header = self.get_header(request)
+        return None if header is None else self.get_raw_token(header)
+
+    def _decode(
+            self, raw_token: bytes, request: Optional[HttpRequest] = None
+    ) -> Token:
+        decoded = getattr(request, DECODED_TOKEN, None)
+        if decoded is not None and decoded[0] == raw_token:
+            return decoded[1]
+        token = super().get_validated_token(raw_token)
+        if request is not None:
+            setattr(request, DECODED_TOKEN, (raw_token, token))
+        return token
+
+    @property
+    def _check_revocation(self) -> bool:
+        return getattr(settings, "TOKEN_REVOCATION_CHECK_ACCESS", True)
+
+    def get_validated_token(self, raw_token: bytes) -> Token:
+        return self._validated(raw_token)
+
+    def _validated(
+            self, raw_token: bytes, request: Optional[HttpRequest] = None
+    ) -> Token:
+        token = self._decode(raw_token, request)
+        if self._check_revocation and is_revoked(token):
+            raise InvalidToken(_("Token is blacklisted"))
+        return token
+
+    def get_user(self, validated_token: Token) -> TokenUser:
+        return self._user_from(
+            user_cache.get(self._user_id(validated_token))
+        )
+
+    async def aget_user(self, validated_token: Token) -> TokenUser:
+        return self._user_from(
+            await user_cache.aget(self._user_id(validated_token))
+        )
+
+    @staticmethod
+    def _user_id(validated_token: Token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+    @staticmethod
+    def _user_from(values: Optional[dict]) -> TokenUser:
+        if values is None:
+            raise AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+        if not values["is_active"]:
+            raise AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        return TokenUser.from_values(values)
@@ -0,0 +1,434 @@
+"""
+In-process benchmark of every route in `user.urls`.
+
+Each endpoint is requested through the test client with a JWT, inside a
+savepoint that is rolled back, so writes leave the data as they found
+it. For every endpoint one request counts the SQL queries, one measures
+the peak of memory allocated with `tracemalloc`, and `iterations` more
+are timed; timed requests run with `DEBUG` off and without either
+instrument. Results can be saved as a JSON baseline and later runs
+compared with it: any extra query fails (that is how an N+1 shows up,
+whatever the machine), as does latency or memory beyond `max_slowdown`
+times the baseline.
+"""
+import json
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user import urls
+from user.follow_cache import follow_graph
+from user.models import Comment, Follow, Like, Posts, Profile, User
+from user.render_cache import render_cache
+from user.revocation import revocations
+from user.user_cache import user_cache
+
+PASSWORD = "benchmark-password"
+
+
+class Endpoint:
+    """One request to benchmark; `data` may depend on the fixture."""
+
+    def __init__(
+            self,
+            method: str,
+            url_name: str,
+            status: int,
+            kwargs: Optional[Callable[["Fixture"], dict]] = None,
+            data: Optional[Callable[["Fixture"], dict]] = None,
+            query: str = "",
+            client: str = "user",
+            label: str = "",
+    ) -> None:
+        self.method = method
+        self.url_name = url_name
+        self.status = status
+        self.kwargs = kwargs
+        self.data = data
+        self.query = query
+        self.client = client
+        self.name = label or f"{method} {url_name}{query}"
+
+    @property
+    def writes(self) -> bool:
+        return self.method not in ("GET", "HEAD", "OPTIONS")
+
+
+class Fixture:
+    """
+    Objects the endpoints act on, added to an already seeded database:
+    `user` follows `other` and has a profile, a post, a like and a
+    comment; `target` and `target_post` are free to be followed and
+    liked.
+    """
+
+    def __init__(self) -> None:
+        self.user = User.objects.create_user(
+            "benchmark-user@example.com", PASSWORD
+        )
+        # The first seeded user, the most followed one with seed_graph().
+        self.other = User.objects.exclude(
+            id=self.user.id
+        ).order_by("id").first() or User.objects.create_user(
+            "benchmark-other@example.com", PASSWORD
+        )
+        self.target = User.objects.create_user(
+            "benchmark-target@example.com", PASSWORD
+        )
+        self.profile = Profile.objects.create(user=self.user, name="Bench")
+        self.follow = Follow.objects.create(
+            follower=self.user, followed=self.other
+        )
+        self.post = Posts.objects.create(
+            user=self.user, content="Benchmark #benchmark"
+        )
+        self.other_post = Posts.objects.create(
+            user=self.other, content="Benchmark other"
+        )
+        self.target_post = Posts.objects.create(
+            user=self.target, content="Benchmark target"
+        )
+        self.like = Like.objects.create(user=self.user, posts=self.other_post)
+        self.comment = Comment.objects.create(
+            user=self.user, posts=self.other_post, content="Benchmark"
+        )
+        refresh = RefreshToken.for_user(self.user)
+        self.refresh_token = str(refresh)
+        self.access_token = str(refresh.access_token)
+        self.clients = {
+            name: self.client_for(user)
+            for name, user in (("user", self.user), ("target", self.target))
+        }
+        self.clients["anonymous"] = APIClient()
+
+    @staticmethod
+    def client_for(user: User) -> APIClient:
+        client = APIClient()
+        token = RefreshToken.for_user(user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+
+def _pk(name: str) -> Callable[[Fixture], dict]:
+    return lambda fixture: {"pk": getattr(fixture, name).id}
+
+
+ENDPOINTS = [
+    Endpoint("GET", "api-root", 200),
+    Endpoint(
+        "POST",
+        "create",
+        201,
+        data=lambda f: {"email": "new@example.com", "password": PASSWORD},
+        client="anonymous",
+    ),
+    Endpoint(
+        "POST",
+        "token_obtain_pair",
+        200,
+        data=lambda f: {"email": f.user.email, "password": PASSWORD},
+        client="anonymous",
+    ),
+    Endpoint(
+        "POST",
+        "token_verify",
+        200,
+        data=lambda f: {"token": f.access_token},
+        client="anonymous",
+    ),
+    Endpoint(
+        "POST",
+        "token_refresh",
+        200,
+        data=lambda f: {"refresh": f.refresh_token},
+        client="anonymous",
+    ),
+    Endpoint("GET", "manage", 200),
+    Endpoint(
+        "PATCH", "manage", 200, data=lambda f: {"email": f.user.email}
+    ),
+    Endpoint("POST", "manage", 200),
+    Endpoint("GET", "export", 200),
+    Endpoint("GET", "users", 200),
+    Endpoint("GET", "user-followers", 200, _pk("other")),
+    Endpoint("GET", "user-following", 200, _pk("user")),
+    Endpoint("GET", "profile-list", 200),
+    Endpoint(
+        "POST",
+        "profile-list",
+        201,
+        data=lambda f: {"name": "Target"},
+        client="target",
+    ),
+    Endpoint("GET", "profile-detail", 200, _pk("profile")),
+    Endpoint(
+        "PATCH",
+        "profile-detail",
+        200,
+        _pk("profile"),
+        data=lambda f: {"bio": "Benchmarking"},
+    ),
+    Endpoint("DELETE", "profile-detail", 204, _pk("profile")),
+    Endpoint("GET", "posts-list", 200),
+    Endpoint("GET", "posts-list", 200, query="?hashtags=benchmark"),
+    Endpoint("GET", "posts-list", 200, query="?content=benchmark"),
+    Endpoint(
+        "POST",
+        "posts-list",
+        201,
+        data=lambda f: {"content": "New #benchmark", "hashtags": "new"},
+    ),
+    Endpoint("GET", "posts-detail", 200, _pk("post")),
+    Endpoint(
+        "PATCH",
+        "posts-detail",
+        200,
+        _pk("post"),
+        data=lambda f: {"content": "Edited #benchmark"},
+    ),
+    Endpoint("DELETE", "posts-detail", 204, _pk("post")),
+    Endpoint("GET", "posts-comments", 200, _pk("other_post")),
+    Endpoint("PUT", "posts-like", 200, _pk("post")),
+    Endpoint("DELETE", "posts-like", 200, _pk("other_post")),
+    Endpoint("GET", "follow-list", 200),
+    Endpoint(
+        "POST",
+        "follow-list",
+        201,
+        data=lambda f: {"follower": f.user.id, "followed": f.target.id},
+    ),
+    Endpoint(
+        "POST",
+        "follow-bulk",
+        200,
+        data=lambda f: {"followed": [f.target.id, f.other.id]},
+    ),
+    Endpoint("GET", "follow-detail", 200, _pk("follow")),
+    Endpoint("DELETE", "follow-detail", 204, _pk("follow")),
+    Endpoint("GET", "like-list", 200),
+    Endpoint(
+        "POST",
+        "like-list",
+        201,
+        data=lambda f: {"user": f.user.id, "posts": f.target_post.id},
+    ),
+    Endpoint(
+        "POST",
+        "like-bulk",
+        200,
+        data=lambda f: {"posts": [f.target_post.id, f.other_post.id]},
+    ),
+    Endpoint("GET", "like-detail", 200, _pk("like")),
+    Endpoint("DELETE", "like-detail", 204, _pk("like")),
+    Endpoint("GET", "comment-list", 200),
+    Endpoint(
+        "POST",
+        "comment-list",
+        201,
+        data=lambda f: {
+            "user": f.user.id, "posts": f.other_post.id, "content": "New"
+        },
+    ),
+    Endpoint("GET", "comment-detail", 200, _pk("comment")),
+    Endpoint(
+        "PATCH",
+        "comment-detail",
+        200,
+        _pk("comment"),
+        data=lambda f: {"content": "Edited"},
+    ),
+    Endpoint("DELETE", "comment-detail", 204, _pk("comment")),
+]
+
+
+def route_names(patterns: Optional[list] = None) -> set[str]:
+    """Names of all routes in `user.urls`."""
+    names = set()
+    for pattern in urls.urlpatterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def uncovered_routes(endpoints: list[Endpoint]) -> set[str]:
+    return route_names() - {endpoint.url_name for endpoint in endpoints}
+
+
+def _request(
+        endpoint: Endpoint, fixture: Fixture, path: str, data: Any
+) -> int:
+    """Send the request in a rolled back savepoint, return the status."""
+    client = fixture.clients[endpoint.client]
+    with transaction.atomic():
+        if endpoint.writes:
+            response = getattr(client, endpoint.method.lower())(
+                path, data, format="json"
+            )
+        else:
+            response = client.get(path)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        transaction.set_rollback(True)
+    return response.status_code
+
+
+def _forget_writes() -> None:
+    """Rolled back writes may still be in the in-process caches."""
+    follow_graph.clear()
+    render_cache.clear()
+    user_cache.clear()
+    # Reloaded now rather than by the next, measured, request.
+    revocations.clear()
+    revocations.sync(force=True)
+
+
+def percentile(sorted_timings: list[float], percent: int) -> float:
+    if len(sorted_timings) == 1:
+        return sorted_timings[0]
+    return statistics.quantiles(
+        sorted_timings, n=100, method="inclusive"
+    )[percent - 1]
+
+
+def measure(
+        endpoint: Endpoint, fixture: Fixture, iterations: int
+) -> dict[str, float]:
+    kwargs = endpoint.kwargs(fixture) if endpoint.kwargs else None
+    path = reverse(f"user:{endpoint.url_name}", kwargs=kwargs)
+    path += endpoint.query
+    data = endpoint.data(fixture) if endpoint.data else None
+
+    def send() -> None:
+        status = _request(endpoint, fixture, path, data)
+        if status != endpoint.status:
+            raise AssertionError(
+                f"{endpoint.name} returned {status}, "
+                f"expected {endpoint.status}."
+            )
+
+    # Every measured request must see the state the first one saw: a
+    # logout, for one, would otherwise be measured answering 401.
+    def reset() -> None:
+        if endpoint.writes:
+            _forget_writes()
+
+    send()
+    reset()
+    # Due now or not, no periodic sync should land in the counted request.
+    revocations.sync(force=True)
+    with CaptureQueriesContext(connection) as queries:
+        send()
+    # The savepoint itself is not part of the endpoint's cost.
+    query_count = len(
+        [
+            query for query in queries.captured_queries
+            if "SAVEPOINT" not in query["sql"].upper()
+        ]
+    )
+
+    reset()
+    revocations.sync(force=True)
+    tracemalloc.start()
+    try:
+        send()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    with override_settings(DEBUG=False):
+        for _ in range(iterations):
+            reset()
+            started = time.perf_counter()
+            send()
+            timings.append(time.perf_counter() - started)
+    reset()
+
+    timings.sort()
+    return {
+        "queries": query_count,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "rps": len(timings) / sum(timings),
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_benchmarks(
+        iterations: int = 50,
+        endpoints: Optional[list[Endpoint]] = None,
+        log: Callable[[str, dict], None] = lambda name, result: None,
+        fixture: Optional[Fixture] = None,
+) -> dict[str, dict[str, float]]:
+    """Benchmark `endpoints` (all of them by default) on seeded data."""
+    fixture = fixture or Fixture()
+    results = {}
+    for endpoint in ENDPOINTS if endpoints is None else endpoints:
+        results[endpoint.name] = measure(endpoint, fixture, iterations)
+        log(endpoint.name, results[endpoint.name])
+    return results
+
+
+def compare(
+        results: dict[str, dict[str, float]],
+        baseline: dict[str, dict[str, float]],
+        max_slowdown: float = 2.0,
+) -> list[str]:
+    """Describe every regression of `results` against `baseline`."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["queries"] > expected["queries"]:
+            regressions.append(
+                f"{name}: {result['queries']} queries, "
+                f"baseline {expected['queries']}"
+            )
+        for metric in ("p95_ms", "peak_kib"):
+            if result[metric] > expected[metric] * max_slowdown:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]:.1f}, "
+                    f"baseline {expected[metric]:.1f}"
+                )
+    return regressions
+
+
+def load_baseline(path: str) -> dict:
+    """The stored `{"seeding": ..., "endpoints": {name: result}}`."""
+    with open(path) as baseline:
+        return json.load(baseline)
+
+
+def save_baseline(
+        path: str, results: dict[str, dict[str, float]], seeding: dict
+) -> None:
+    with open(path, "w") as baseline:
+        json.dump(
+            {
+                "seeding": seeding,
+                "endpoints": {
+                    name: {
+                        metric: round(value, 2)
+                        for metric, value in result.items()
+                    }
+                    for name, result in results.items()
+                },
+            },
+            baseline,
+            indent=2,
+            sort_keys=True,
+        )
+        baseline.write("\n")
@@ -0,0 +1,129 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from user.follow_cache import invalidate_follow
+from user.models import Follow, Like, Posts, User
+from user.replicas import pin_user
+from user.timeline import backfill_follows
+
+CREATED = "created"
+EXISTS = "exists"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+
+
+def _unique(ids: list[int]) -> list[int]:
+    return list(dict.fromkeys(ids))
+
+
+def _insert_missing(
+        model,
+        owner_field: str,
+        owner_id: int,
+        target_field: str,
+        target_ids: list[int],
+) -> set[int]:
+    """
+    Insert a `model` row for `owner_id` and every id of `target_ids` that
+    still exists with one INSERT ... SELECT ... ON CONFLICT DO NOTHING,
+    and return the target ids of the rows actually inserted. Concurrent
+    requests inserting the same pair are settled by the unique
+    constraint: only one of them gets the id back.
+    """
+    if not target_ids:
+        return set()
+    quote = connection.ops.quote_name
+    target = model._meta.get_field(target_field)
+    owner_column = quote(model._meta.get_field(owner_field).column)
+    target_column = quote(target.column)
+    placeholders = ", ".join(["%s"] * len(target_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(model._meta.db_table)} "
+            f"({owner_column}, {target_column}, created_at) "
+            f"SELECT %s, id, %s "
+            f"FROM {quote(target.related_model._meta.db_table)} "
+            f"WHERE id IN ({placeholders}) "
+            f"ON CONFLICT DO NOTHING RETURNING {target_column}",
+            [
+                owner_id,
+                connection.ops.adapt_datetimefield_value(timezone.now()),
+                *target_ids,
+            ],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def bulk_follow(user: User, user_ids: list[int]) -> dict[int, str]:
+    """
+    Follow many users with one INSERT ... ON CONFLICT DO NOTHING and
+    return the outcome for every requested id.
+    """
+    user_ids = _unique(user_ids)
+    found = set(
+        User.objects.filter(id__in=user_ids).values_list("id", flat=True)
+    )
+
+    with transaction.atomic():
+        inserted = _insert_missing(
+            Follow,
+            "follower",
+            user.id,
+            "followed",
+            [user_id for user_id in user_ids if user_id in found - {user.id}],
+        )
+        new_ids = [user_id for user_id in user_ids if user_id in inserted]
+        # The raw SQL sends no signals, so do their work here.
+        for user_id in new_ids:
+            invalidate_follow(user.id, user_id)
+        backfill_follows(user.id, new_ids)
+        if new_ids:
+            pin_user(user.id)
+
+    outcomes = {}
+    for user_id in user_ids:
+        if user_id == user.id:
+            outcomes[user_id] = INVALID
+        elif user_id not in found:
+            outcomes[user_id] = NOT_FOUND
+        elif user_id in inserted:
+            outcomes[user_id] = CREATED
+        else:
+            outcomes[user_id] = EXISTS
+    return outcomes
+
+
+def bulk_like(user: User, post_ids: list[int]) -> dict[int, str]:
+    """
+    Like many posts in one statement, see `bulk_follow`. The like counts
+    of the posts liked are raised with one UPDATE.
+    """
+    post_ids = _unique(post_ids)
+    found = set(
+        Posts.objects.filter(id__in=post_ids).values_list("id", flat=True)
+    )
+
+    with transaction.atomic():
+        inserted = _insert_missing(
+            Like,
+            "user",
+            user.id,
+            "posts",
+            [post_id for post_id in post_ids if post_id in found],
+        )
+        if inserted:
+            Posts.objects.filter(id__in=inserted).update(
+                like_count=F("like_count") + 1
+            )
+            pin_user(user.id)
+
+    outcomes = {}
+    for post_id in post_ids:
+        if post_id not in found:
+            outcomes[post_id] = NOT_FOUND
+        elif post_id in inserted:
+            outcomes[post_id] = CREATED
+        else:
+            outcomes[post_id] = EXISTS
+    return outcomes
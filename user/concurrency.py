@@ -0,0 +1,324 @@
+"""
+Concurrency benchmark of the sync read views against their async
+variants in `user.async_urls`, at equal worker counts.
+
+A sync worker is a thread serving one request at a time through Django's
+WSGI handler, like a gthread worker's thread. An async worker is a thread
+running its own event loop that serves up to `concurrency` requests at
+once through the ASGI handler; it runs in its own
+`ThreadSensitiveContext`, so like a separate ASGI process it has one
+thread for the queries of the async ORM. Every worker pulls requests
+from the same queue until `requests` have been sent. The workers share
+one process and the GIL: absolute numbers are lower than with one process
+per worker, but both sides pay the same.
+
+Requests are read-only and go through every middleware, against the
+committed data of the database: seed it first (`manage.py seed_data`).
+"""
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from io import BytesIO
+from typing import Callable, Optional
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import Comment, Follow, Profile, User
+from user.timeline import home_timeline
+
+HOST = "testserver"
+# Modes and the namespace of their views.
+MODES = (("sync", "user"), ("async", "user-async"))
+
+
+class Target:
+    """
+    Objects the read endpoints are requested for: the user following the
+    most users, the newest post of their feed and their profile. A profile
+    and `comments` comments on the post are added when missing, and
+    removed again by `cleanup()`.
+    """
+
+    def __init__(self, comments: int = 20) -> None:
+        follower = Follow.objects.values("follower_id").annotate(
+            follows=Count("id")
+        ).order_by("-follows").first()
+        self.user = (
+            User.objects.get(id=follower["follower_id"]) if follower
+            else User.objects.order_by("id").first()
+        )
+        if self.user is None:
+            raise ValueError("The database has no users, seed it first.")
+        self.post = home_timeline(self.user).order_by(
+            "-created_at", "-id"
+        ).first()
+        if self.post is None:
+            raise ValueError(f"{self.user} has an empty feed, seed posts.")
+
+        self._created = []
+        self.profile = Profile.objects.filter(user=self.user).first()
+        if self.profile is None:
+            self.profile = Profile.objects.create(
+                user=self.user, name="Concurrency benchmark"
+            )
+            self._created.append(self.profile)
+        missing = comments - Comment.objects.filter(posts=self.post).count()
+        for number in range(missing):
+            self._created.append(
+                Comment.objects.create(
+                    user=self.user,
+                    posts=self.post,
+                    content=f"Concurrency benchmark {number}",
+                )
+            )
+        self.authorization = (
+            f"Bearer {RefreshToken.for_user(self.user).access_token}"
+        )
+
+    def cleanup(self) -> None:
+        for instance in reversed(self._created):
+            instance.delete()
+        self._created = []
+
+    def url_kwargs(self) -> dict[str, dict]:
+        """URL kwargs of the benchmarked routes, by URL name."""
+        return {
+            "posts-list": {},
+            "posts-detail": {"pk": self.post.id},
+            "posts-comments": {"pk": self.post.id},
+            "profile-list": {},
+            "profile-detail": {"pk": self.profile.id},
+        }
+
+
+class Requests:
+    """The shared queue: hands out request numbers until `total`."""
+
+    def __init__(self, total: int) -> None:
+        self.total = total
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self._next >= self.total:
+                return False
+            self._next += 1
+            return True
+
+
+class Run:
+    def __init__(self) -> None:
+        self.timings: list[float] = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, started: float, status: int) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.timings.append(elapsed)
+            if status != 200:
+                self.errors += 1
+
+
+def _wsgi_environ(path: str, authorization: str) -> dict:
+    return {
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": HOST,
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": HOST,
+        "HTTP_AUTHORIZATION": authorization,
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+
+
+def _asgi_scope(path: str, authorization: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", HOST.encode()),
+            (b"authorization", authorization.encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": (HOST, 80),
+    }
+
+
+def _sync_worker(
+        handler: WSGIHandler,
+        path: str,
+        authorization: str,
+        requests: Requests,
+        run: Run,
+) -> None:
+    statuses = []
+
+    def start_response(status: str, headers: list) -> None:
+        statuses.append(int(status.split(" ", 1)[0]))
+
+    try:
+        while requests.take():
+            started = time.perf_counter()
+            response = handler(
+                _wsgi_environ(path, authorization), start_response
+            )
+            for _ in response:
+                pass
+            response.close()
+            run.record(started, statuses.pop())
+    finally:
+        connections.close_all()
+
+
+async def _async_client(
+        handler: ASGIHandler,
+        path: str,
+        authorization: str,
+        requests: Requests,
+        run: Run,
+) -> None:
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    while requests.take():
+        statuses = []
+
+        async def send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        started = time.perf_counter()
+        await handler(_asgi_scope(path, authorization), receive, send)
+        run.record(started, statuses[0])
+
+
+def _async_worker(
+        handler: ASGIHandler,
+        path: str,
+        authorization: str,
+        requests: Requests,
+        run: Run,
+        concurrency: int,
+) -> None:
+    async def serve() -> None:
+        async with ThreadSensitiveContext():
+            try:
+                await asyncio.gather(*(
+                    _async_client(
+                        handler, path, authorization, requests, run
+                    )
+                    for _ in range(concurrency)
+                ))
+            finally:
+                await sync_to_async(connections.close_all)()
+
+    asyncio.run(serve())
+
+
+def percentile(sorted_timings: list[float], percent: int) -> float:
+    if len(sorted_timings) == 1:
+        return sorted_timings[0]
+    return statistics.quantiles(
+        sorted_timings, n=100, method="inclusive"
+    )[percent - 1]
+
+
+def measure(
+        mode: str,
+        path: str,
+        authorization: str,
+        workers: int,
+        concurrency: int,
+        requests: int,
+) -> dict[str, float]:
+    """Serve `requests` GETs of `path` in `mode` "sync" or "async"."""
+    run = Run()
+    queue = Requests(requests)
+    if mode == "sync":
+        handler = WSGIHandler()
+        target, args = _sync_worker, ()
+    else:
+        handler = ASGIHandler()
+        target, args = _async_worker, (concurrency,)
+    threads = [
+        threading.Thread(
+            target=target,
+            args=(handler, path, authorization, queue, run, *args),
+        )
+        for _ in range(workers)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings = sorted(run.timings)
+    return {
+        "rps": len(timings) / elapsed,
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "p99_ms": percentile(timings, 99) * 1000,
+        "errors": run.errors,
+    }
+
+
+def run_benchmarks(
+        workers: int = 4,
+        concurrency: int = 8,
+        requests: int = 400,
+        names: Optional[list[str]] = None,
+        log: Callable[[str, str, dict], None] = lambda *args: None,
+        target: Optional[Target] = None,
+) -> dict[str, dict[str, dict[str, float]]]:
+    """`{url_name: {"sync": result, "async": result}}` of every endpoint."""
+    own_target = target is None
+    target = target or Target()
+    results = {}
+    try:
+        for name, kwargs in target.url_kwargs().items():
+            if names and not any(part in name for part in names):
+                continue
+            results[name] = {}
+            for mode, namespace in MODES:
+                results[name][mode] = measure(
+                    mode,
+                    reverse(f"{namespace}:{name}", kwargs=kwargs),
+                    target.authorization,
+                    workers,
+                    concurrency,
+                    requests,
+                )
+                log(name, mode, results[name][mode])
+    finally:
+        if own_target:
+            target.cleanup()
+    return results
@@ -0,0 +1,105 @@
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from user.models import Comment, Like, PostCounterShard, Posts
+
+COUNTER_FIELDS = ("like_count", "comment_count")
+
+
+def counter_shards() -> int:
+    """Number of shards per post; 0 updates the `Posts` row directly."""
+    return getattr(settings, "POST_COUNTER_SHARDS", 0)
+
+
+def change_counter(post_id: int, field: str, delta: int) -> None:
+    """Atomically add `delta` to one of a post's engagement counters."""
+    shards = counter_shards()
+
+    if shards and delta > 0:
+        # A random shard row spreads likes of a viral post over several
+        # rows, so concurrent writers do not queue on one row lock.
+        shard = random.randrange(shards)
+        shard_row = PostCounterShard.objects.filter(
+            posts_id=post_id, shard=shard
+        )
+        if not shard_row.update(**{field: F(field) + delta}):
+            PostCounterShard.objects.bulk_create(
+                [PostCounterShard(posts_id=post_id, shard=shard)],
+                ignore_conflicts=True,
+            )
+            shard_row.update(**{field: F(field) + delta})
+        return
+
+    # Decrements never create shard rows, so they are safe while the post
+    # itself is being deleted.
+    posts = Posts.objects.filter(id=post_id)
+    if delta < 0:
+        posts = posts.filter(**{f"{field}__gte": -delta})
+    if posts.update(**{field: F(field) + delta}) or not shards:
+        return
+
+    shard_ids = PostCounterShard.objects.filter(
+        posts_id=post_id, **{f"{field}__gte": -delta}
+    ).values("id")[:1]
+    PostCounterShard.objects.filter(id__in=shard_ids).update(
+        **{field: F(field) + delta}
+    )
+
+
+def with_counters(queryset: QuerySet[Posts]) -> QuerySet[Posts]:
+    """Annotate pending shard totals, read by `PostSerializer`."""
+    if not counter_shards():
+        return queryset
+
+    shards = PostCounterShard.objects.filter(
+        posts=OuterRef("pk")
+    ).values("posts")
+    return queryset.annotate(**{
+        f"shard_{field}": Coalesce(
+            Subquery(shards.annotate(total=Sum(field)).values("total")), 0
+        )
+        for field in COUNTER_FIELDS
+    })
+
+
+def reconcile_counters(post_ids: list[int]) -> int:
+    """
+    Recount likes and comments of the given posts, fold their counter
+    shards into the `Posts` row and return how many rows had drifted.
+    """
+    with transaction.atomic():
+        posts = list(
+            Posts.objects.select_for_update().filter(
+                id__in=post_ids
+            ).only("id", *COUNTER_FIELDS)
+        )
+        likes = dict(
+            Like.objects.filter(posts_id__in=post_ids).values(
+                "posts_id"
+            ).annotate(total=Count("id")).values_list("posts_id", "total")
+        )
+        comments = dict(
+            Comment.objects.filter(posts_id__in=post_ids).values(
+                "posts_id"
+            ).annotate(total=Count("id")).values_list("posts_id", "total")
+        )
+
+        drifted = []
+        for post in posts:
+            like_count = likes.get(post.id, 0)
+            comment_count = comments.get(post.id, 0)
+            if (post.like_count, post.comment_count) != (
+                    like_count, comment_count
+            ):
+                post.like_count = like_count
+                post.comment_count = comment_count
+                drifted.append(post)
+
+        Posts.objects.bulk_update(drifted, COUNTER_FIELDS)
+        PostCounterShard.objects.filter(posts_id__in=post_ids).delete()
+
+    return len(drifted)
@@ -0,0 +1,29 @@
+from typing import Any
+
+from django.db.backends.postgresql import base, creation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from user.db_pool import (
+    PooledDatabaseCreationMixin,
+    PooledDatabaseWrapperMixin,
+)
+
+
+class DatabaseCreation(
+        PooledDatabaseCreationMixin, creation.DatabaseCreation
+):
+    pass
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """PostgreSQL with connections from `user.db_pool`."""
+
+    creation_class = DatabaseCreation
+
+    def reuse_connection(self, raw: Any) -> None:
+        # A configured level is already set on the connection itself.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
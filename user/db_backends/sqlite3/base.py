@@ -0,0 +1,21 @@
+from django.db.backends.sqlite3 import base, creation
+
+from user.db_pool import (
+    PooledDatabaseCreationMixin,
+    PooledDatabaseWrapperMixin,
+)
+
+
+class DatabaseCreation(
+        PooledDatabaseCreationMixin, creation.DatabaseCreation
+):
+    pass
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    """
+    SQLite with connections from `user.db_pool`, for tests and local
+    runs. In-memory databases are never closed, so never pooled.
+    """
+
+    creation_class = DatabaseCreation
@@ -0,0 +1,455 @@
+"""
+Database connection pooling for Django 4.2, which has none.
+
+Django gives every thread (and every async context) its own connection
+object and, with `CONN_MAX_AGE = 0`, opens a connection when a request
+first queries and closes it when the request ends. The pooled backends
+in `user.db_backends` keep those connection objects but take the
+underlying DB-API connection from a per-process `ConnectionPool` when
+Django connects, and give it back when Django closes: a request costs
+the pool's lock instead of a TCP and authentication handshake. That is
+the same under WSGI threads and under ASGI, where the async ORM's
+queries and the `request_finished` cleanup run in the same thread.
+
+A pool holds at most `MAX_SIZE` connections, opens `MIN_SIZE` when it is
+created and lets idle connections beyond that go after `MAX_IDLE`
+seconds. Checkouts wait up to `TIMEOUT` seconds for a connection and then
+raise `PoolTimeout`. Connections idle for `HEALTH_CHECK_AFTER` seconds or
+more are pinged before they are handed out; connections are retired
+after `MAX_USES` checkouts or `MAX_LIFETIME` seconds (0 for no limit).
+Returned connections are rolled back, so no transaction leaks between
+requests.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from functools import partial
+from typing import Any, Callable, Optional
+
+from django.db import OperationalError
+
+NO_DB_ALIAS = "__no_db__"
+DEFAULTS = {
+    "MIN_SIZE": 0,
+    "MAX_SIZE": 10,
+    "TIMEOUT": 5.0,
+    "MAX_IDLE": 300.0,
+    "MAX_USES": 0,
+    "MAX_LIFETIME": 3600.0,
+    "HEALTH_CHECK_AFTER": 1.0,
+}
+
+
+class PoolTimeout(OperationalError):
+    """No connection became available within the pool's timeout."""
+
+
+class _PooledConnection:
+    __slots__ = ("raw", "created_at", "released_at", "uses")
+
+    def __init__(self, raw: Any) -> None:
+        self.raw = raw
+        self.created_at = self.released_at = time.monotonic()
+        self.uses = 0
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of DB-API connections, opened by the `connect`
+    callables given to `fill()` and `checkout()`. The connection last
+    returned is handed out first, so the others go idle and are closed
+    after `max_idle` seconds when traffic drops.
+    """
+
+    def __init__(
+            self,
+            min_size: int = 0,
+            max_size: int = 10,
+            timeout: float = 5.0,
+            max_idle: float = 300.0,
+            max_uses: int = 0,
+            max_lifetime: float = 3600.0,
+            health_check_after: Optional[float] = 1.0,
+            metrics: Optional["PoolMetrics"] = None,
+    ) -> None:
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError("The pool needs 0 <= min_size <= max_size.")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.metrics = metrics or PoolMetrics()
+        self.pid = os.getpid()
+        self._idle: deque[_PooledConnection] = deque()
+        self._in_use: dict[int, _PooledConnection] = {}
+        # Connections open or being opened.
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition(threading.Lock())
+        self.metrics.max_size.set(max_size)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def in_use(self) -> int:
+        return len(self._in_use)
+
+    def fill(self, connect: Callable[[], Any]) -> None:
+        """Open connections until the pool holds `min_size`."""
+        while True:
+            with self._condition:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            pooled = self._open(connect)
+            with self._condition:
+                self._idle.appendleft(pooled)
+                self._publish()
+                self._condition.notify()
+
+    def checkout(self, connect: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        A connection and whether it was reused, rather than opened with
+        `connect`; waits up to `timeout` seconds for one.
+        """
+        while True:
+            pooled = self._reserve()
+            reused = pooled is not None
+            if not reused:
+                pooled = self._open(connect)
+            elif not self._healthy(pooled):
+                self._retire(pooled, "unhealthy")
+                continue
+            pooled.uses += 1
+            with self._condition:
+                self._in_use[id(pooled.raw)] = pooled
+                self._publish()
+            return pooled.raw, reused
+
+    def release(self, raw: Any) -> None:
+        """Take a connection back; a failed rollback discards it."""
+        with self._condition:
+            pooled = self._in_use.pop(id(raw), None)
+        if pooled is None:
+            return
+        try:
+            raw.rollback()
+        except Exception:
+            self._retire(pooled, "broken")
+            return
+
+        now = time.monotonic()
+        if self._closed or self._expired(pooled, now):
+            self._retire(pooled, "recycled")
+            return
+        pooled.released_at = now
+        with self._condition:
+            self._idle.append(pooled)
+            stale = self._trim(now)
+            self._publish()
+            self._condition.notify()
+        for pooled in stale:
+            self._close(pooled, "idle")
+
+    def discard(self, raw: Any) -> None:
+        """Close a checked out connection instead of returning it."""
+        with self._condition:
+            pooled = self._in_use.pop(id(raw), None)
+        if pooled is not None:
+            self._retire(pooled, "broken")
+
+    def close(self) -> None:
+        """Close the idle connections; checked out ones close on return."""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._publish()
+            self._condition.notify_all()
+        for pooled in idle:
+            self._close(pooled, "idle")
+
+    def _reserve(self) -> Optional[_PooledConnection]:
+        """An idle connection, or None after taking a slot to open one."""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        stale = []
+        try:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("The connection pool is closed.")
+                    now = time.monotonic()
+                    while self._idle:
+                        pooled = self._idle.pop()
+                        if not self._expired(pooled, now):
+                            return pooled
+                        self._size -= 1
+                        stale.append(pooled)
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.metrics.timeouts.inc()
+                        raise PoolTimeout(
+                            f"No database connection available within "
+                            f"{self.timeout:g}s ({self.max_size} in use)."
+                        )
+                    self._condition.wait(remaining)
+        finally:
+            self.metrics.wait.observe(time.perf_counter() - started)
+            for pooled in stale:
+                self._close(pooled, "recycled")
+
+    def _open(self, connect: Callable[[], Any]) -> _PooledConnection:
+        """Connect, for a slot already counted in `_size`."""
+        try:
+            pooled = _PooledConnection(connect())
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        self.metrics.created.inc()
+        return pooled
+
+    def _healthy(self, pooled: _PooledConnection) -> bool:
+        if self.health_check_after is None or (
+                time.monotonic() - pooled.released_at
+                < self.health_check_after
+        ):
+            return True
+        try:
+            cursor = pooled.raw.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            pooled.raw.rollback()
+        except Exception:
+            return False
+        return True
+
+    def _expired(self, pooled: _PooledConnection, now: float) -> bool:
+        return (
+            self.max_uses and pooled.uses >= self.max_uses
+        ) or (
+            self.max_lifetime and now - pooled.created_at >= self.max_lifetime
+        )
+
+    def _trim(self, now: float) -> list[_PooledConnection]:
+        """Take idle connections beyond `min_size` past `max_idle`."""
+        stale = []
+        # The least recently returned connections are on the left.
+        while (
+                self._idle
+                and self._size > self.min_size
+                and now - self._idle[0].released_at >= self.max_idle
+        ):
+            stale.append(self._idle.popleft())
+            self._size -= 1
+        return stale
+
+    def _retire(self, pooled: _PooledConnection, reason: str) -> None:
+        with self._condition:
+            self._size -= 1
+            self._publish()
+            self._condition.notify()
+        self._close(pooled, reason)
+
+    def _close(self, pooled: _PooledConnection, reason: str) -> None:
+        self.metrics.closed.labels(reason).inc()
+        try:
+            pooled.raw.close()
+        except Exception:
+            pass
+
+    def _publish(self) -> None:
+        self.metrics.in_use.set(len(self._in_use))
+        self.metrics.idle.set(len(self._idle))
+
+
+class _NullMetric:
+    def labels(self, *args: Any) -> "_NullMetric":
+        return self
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def set(self, value: float) -> None:
+        pass
+
+    def observe(self, value: float) -> None:
+        pass
+
+
+class PoolMetrics:
+    """The pool's metric children; no-ops unless given."""
+
+    def __init__(
+            self,
+            wait=None,
+            in_use=None,
+            idle=None,
+            max_size=None,
+            timeouts=None,
+            created=None,
+            closed=None,
+    ) -> None:
+        null = _NullMetric()
+        self.wait = wait or null
+        self.in_use = in_use or null
+        self.idle = idle or null
+        self.max_size = max_size or null
+        self.timeouts = timeouts or null
+        self.created = created or null
+        self.closed = closed or null
+
+    @classmethod
+    def for_alias(cls, alias: str) -> "PoolMetrics":
+        # Imported late: backends load before the apps are ready.
+        from user import metrics
+
+        return cls(
+            wait=metrics.DB_POOL_WAIT.labels(alias),
+            in_use=metrics.DB_POOL_CONNECTIONS.labels(alias, "in_use"),
+            idle=metrics.DB_POOL_CONNECTIONS.labels(alias, "idle"),
+            max_size=metrics.DB_POOL_MAX_SIZE.labels(alias),
+            timeouts=metrics.DB_POOL_TIMEOUTS.labels(alias),
+            created=metrics.DB_POOL_CREATED.labels(alias),
+            closed=_AliasLabels(metrics.DB_POOL_CLOSED, alias),
+        )
+
+
+class _AliasLabels:
+    """A labelled metric with the alias label already applied."""
+
+    def __init__(self, metric, alias: str) -> None:
+        self.metric = metric
+        self.alias = alias
+
+    def labels(self, *args: str):
+        return self.metric.labels(self.alias, *args)
+
+
+_pools: dict[tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+        alias: str, options: dict, key: tuple, connect: Callable[[], Any]
+) -> ConnectionPool:
+    """
+    The process's pool for `alias` and connection parameters `key`,
+    created and filled with `connect` if needed. Pools inherited from a
+    parent process over `fork()` are dropped, not closed: their
+    connections belong to the parent.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and pool.pid == os.getpid():
+            return pool
+        options = {**DEFAULTS, **options}
+        pool = ConnectionPool(
+            min_size=options["MIN_SIZE"],
+            max_size=options["MAX_SIZE"],
+            timeout=options["TIMEOUT"],
+            max_idle=options["MAX_IDLE"],
+            max_uses=options["MAX_USES"],
+            max_lifetime=options["MAX_LIFETIME"],
+            health_check_after=options["HEALTH_CHECK_AFTER"],
+            metrics=PoolMetrics.for_alias(alias),
+        )
+        _pools[key] = pool
+    pool.fill(connect)
+    return pool
+
+
+def close_pools(alias: Optional[str] = None) -> None:
+    """Close every pool of this process, or those of `alias`."""
+    with _pools_lock:
+        keys = [key for key in _pools if alias is None or key[0] == alias]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Take connections from a `ConnectionPool` configured by the database's
+    `POOL` settings, and give them back on `close()`. `CONN_MAX_AGE`
+    should stay 0 so connections go back at the end of every request.
+    Connections closed inside a transaction or after an error, and those
+    of connection objects dropped without closing when their thread
+    ends, are closed rather than reused.
+    """
+
+    pool: Optional[ConnectionPool] = None
+    # Whether the current connection came from the pool's idle ones.
+    reused_from_pool = False
+    _lease: Optional[weakref.finalize] = None
+
+    def get_new_connection(self, conn_params: dict) -> Any:
+        # The connection creating and dropping test databases.
+        if self.alias == NO_DB_ALIAS:
+            self.pool = None
+            return super().get_new_connection(conn_params)
+
+        key = (
+            self.alias,
+            tuple(
+                sorted(
+                    (name, repr(value))
+                    for name, value in conn_params.items()
+                )
+            ),
+        )
+        connect = partial(super().get_new_connection, conn_params)
+        self.pool = get_pool(
+            self.alias, self.settings_dict.get("POOL", {}), key, connect
+        )
+        raw, self.reused_from_pool = self.pool.checkout(connect)
+        if self.reused_from_pool:
+            self.reuse_connection(raw)
+        self._lease = weakref.finalize(self, self.pool.discard, raw)
+        return raw
+
+    def reuse_connection(self, raw: Any) -> None:
+        """Set up what `get_new_connection()` sets on the wrapper."""
+
+    def _close(self) -> None:
+        lease, self._lease = self._lease, None
+        if self.connection is None or lease is None:
+            return super()._close()
+        lease.detach()
+        if self.in_atomic_block or self.errors_occurred:
+            self.pool.discard(self.connection)
+        else:
+            self.pool.release(self.connection)
+
+
+class PooledDatabaseCreationMixin:
+    """
+    Close the alias's pools before dropping a test database: PostgreSQL
+    refuses to drop a database idle pooled connections are still using.
+    """
+
+    def _destroy_test_db(
+            self, test_database_name: str, verbosity: int
+    ) -> None:
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
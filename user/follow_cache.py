@@ -0,0 +1,228 @@
+"""
+Per-process cache of the follow graph.
+
+Each user's followed ids are kept as a sorted `array('q')` (8 bytes per
+id) and follower counts as plain ints, in one LRU bounded by the total
+number of stored ids. `Follow` signals invalidate the affected entries;
+with `FOLLOW_CACHE_SHARED_ALIAS` set, invalidations are also published as
+per-user versions in that Django cache so other processes notice them.
+"""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Count
+
+from user.models import Follow
+
+FOLLOWING = "following"
+FOLLOWERS_COUNT = "followers_count"
+
+
+class _Entry:
+    __slots__ = ("value", "size", "version", "loaded_at", "checked_at")
+
+    def __init__(self, value, size: int, version, now: float) -> None:
+        self.value = value
+        self.size = size
+        self.version = version
+        self.loaded_at = now
+        self.checked_at = now
+
+
+class FollowGraphCache:
+    def __init__(
+            self,
+            max_ids: int = 2_000_000,
+            ttl: float = 300.0,
+            shared_alias: Optional[str] = None,
+            sync_interval: float = 1.0,
+    ) -> None:
+        self.max_ids = max_ids
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self.sync_interval = sync_interval
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidation, so results loaded concurrently
+        # with one are not stored.
+        self._generation = 0
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self._generation += 1
+
+    def following_ids(self, user_id: int) -> array:
+        """Sorted ids of the users `user_id` follows."""
+        return self._get_many(FOLLOWING, [user_id], _load_following)[user_id]
+
+    def is_following(self, follower_id: int, followed_id: int) -> bool:
+        following = self.following_ids(follower_id)
+        index = bisect_left(following, followed_id)
+        return index < len(following) and following[index] == followed_id
+
+    def followers_counts(self, user_ids: Iterable[int]) -> dict[int, int]:
+        return self._get_many(
+            FOLLOWERS_COUNT, list(user_ids), _load_followers_counts
+        )
+
+    def followers_count(self, user_id: int) -> int:
+        return self.followers_counts([user_id])[user_id]
+
+    def invalidate(self, follower_id: int, followed_id: int) -> None:
+        keys = [(FOLLOWING, follower_id), (FOLLOWERS_COUNT, followed_id)]
+        self._discard(keys)
+        if self.shared_alias:
+            shared = caches[self.shared_alias]
+            for key in keys:
+                shared_key = self._shared_key(key)
+                shared.add(shared_key, 0, timeout=None)
+                shared.incr(shared_key)
+
+    def _get_many(
+            self,
+            kind: str,
+            user_ids: list[int],
+            loader: Callable[[list[int]], dict],
+    ) -> dict:
+        now = time.monotonic()
+        keys = [(kind, user_id) for user_id in user_ids]
+        versions = self._shared_versions(keys, now)
+        found = {}
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or now - entry.loaded_at > self.ttl:
+                    continue
+                if key in versions and versions[key] != entry.version:
+                    continue
+                if key in versions:
+                    entry.checked_at = now
+                self._entries.move_to_end(key)
+                found[key[1]] = entry.value
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            generation = self._generation
+
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if not missing:
+            return found
+
+        loaded = loader(missing)
+        found.update(loaded)
+        # Rows read inside a transaction may still be rolled back, so only
+        # data read in autocommit mode is shared with other requests.
+        if not connection.in_atomic_block:
+            self._store(kind, loaded, versions, now, generation)
+        return found
+
+    def _store(
+            self,
+            kind: str,
+            values: dict,
+            versions: dict,
+            now: float,
+            generation: int,
+    ) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            for user_id, value in values.items():
+                key = (kind, user_id)
+                size = len(value) + 1 if isinstance(value, array) else 1
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self.size -= old.size
+                self._entries[key] = _Entry(
+                    value, size, versions.get(key), now
+                )
+                self.size += size
+
+            while self.size > self.max_ids and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def _discard(self, keys: list) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self.size -= entry.size
+
+    def _shared_key(self, key: tuple) -> str:
+        return "follow-graph:{}:{}".format(*key)
+
+    def _shared_versions(self, keys: list, now: float) -> dict:
+        """Shared versions of the entries due for a freshness check."""
+        if not self.shared_alias:
+            return {}
+
+        with self._lock:
+            due = [
+                key for key in keys
+                if key not in self._entries
+                or now - self._entries[key].checked_at > self.sync_interval
+            ]
+        if not due:
+            return {}
+
+        shared_keys = {self._shared_key(key): key for key in due}
+        stored = caches[self.shared_alias].get_many(list(shared_keys))
+        return {
+            key: stored.get(shared_key, 0)
+            for shared_key, key in shared_keys.items()
+        }
+
+
+def _load_following(user_ids: list[int]) -> dict[int, array]:
+    following = {user_id: [] for user_id in user_ids}
+    # Loads read the primary, never a lagging replica: entries must not
+    # predate the invalidation that caused them.
+    rows = Follow.objects.using(DEFAULT_DB_ALIAS).filter(
+        follower_id__in=user_ids
+    ).values_list("follower_id", "followed_id")
+    for follower_id, followed_id in rows:
+        following[follower_id].append(followed_id)
+    return {
+        user_id: array("q", sorted(ids)) for user_id, ids in following.items()
+    }
+
+
+def _load_followers_counts(user_ids: list[int]) -> dict[int, int]:
+    counts = dict.fromkeys(user_ids, 0)
+    counts.update(
+        Follow.objects.using(DEFAULT_DB_ALIAS).filter(
+            followed_id__in=user_ids
+        ).values("followed_id").annotate(
+            total=Count("id")
+        ).values_list("followed_id", "total")
+    )
+    return counts
+
+
+follow_graph = FollowGraphCache(
+    max_ids=getattr(settings, "FOLLOW_CACHE_MAX_IDS", 2_000_000),
+    ttl=getattr(settings, "FOLLOW_CACHE_TTL", 300),
+    shared_alias=getattr(settings, "FOLLOW_CACHE_SHARED_ALIAS", None),
+)
+
+
+def invalidate_follow(follower_id: int, followed_id: int) -> None:
+    """Drop cached entries now and again once the change is committed."""
+    follow_graph.invalidate(follower_id, followed_id)
+    transaction.on_commit(
+        lambda: follow_graph.invalidate(follower_id, followed_id)
+    )
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with `PASSWORD_HASH_ITERATIONS` iterations (see
+    `manage.py tune_password_hasher`). It keeps the `pbkdf2_sha256` name,
+    so existing hashes are verified by it and rehashed on the next login
+    whenever their iteration count differs.
+    """
+
+    @property
+    def iterations(self) -> int:
+        return getattr(
+            settings,
+            "PASSWORD_HASH_ITERATIONS",
+            PBKDF2PasswordHasher.iterations,
+        )
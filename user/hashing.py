@@ -0,0 +1,128 @@
+"""
+Password hashing off the request's thread or event loop.
+
+PBKDF2 runs in `hashlib` with the GIL released, so a small thread pool
+hashes passwords in parallel while async views await the result and keep
+the event loop serving other requests. Jobs beyond
+`PASSWORD_HASHING_MAX_PENDING` are refused with `HashingBusy` instead of
+queueing behind a login spike.
+
+Jobs that also use the database, like `authenticate()`, run in the
+caller's thread with `HashingPool.call()`, where its connection is, but
+count against the same caps.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+from user.metrics import (
+    HASHING_DURATION,
+    HASHING_PENDING,
+    HASHING_REJECTED,
+    HASHING_WAIT,
+)
+
+
+class HashingBusy(Exception):
+    """Every hashing slot is taken; the client should retry later."""
+
+
+class HashingPool:
+    """A thread pool with a cap on queued jobs; extra jobs are refused."""
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._running = threading.BoundedSemaphore(workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="password-hashing"
+                )
+            return self._executor
+
+    def _reserve(self) -> Callable[[], None]:
+        """Take a slot, or raise `HashingBusy`; return its release."""
+        if not self._slots.acquire(blocking=False):
+            HASHING_REJECTED.inc()
+            raise HashingBusy()
+        HASHING_PENDING.inc()
+
+        def release() -> None:
+            HASHING_PENDING.dec()
+            self._slots.release()
+
+        return release
+
+    def _run(self, function: Callable, queued: float, *args, **kwargs):
+        with self._running:
+            started = time.perf_counter()
+            HASHING_WAIT.observe(started - queued)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                HASHING_DURATION.observe(time.perf_counter() - started)
+
+    def call(self, function: Callable, *args, **kwargs):
+        """
+        Run `function` in this thread once one of `workers` may, or raise
+        `HashingBusy` if `max_pending` jobs are already waiting or running.
+        """
+        release = self._reserve()
+        try:
+            return self._run(function, time.perf_counter(), *args, **kwargs)
+        finally:
+            release()
+
+    def submit(self, function: Callable, *args) -> Future:
+        release = self._reserve()
+        queued = time.perf_counter()
+
+        def job():
+            try:
+                return self._run(function, queued, *args)
+            finally:
+                # Before the result is set, so its callers find the slot.
+                release()
+
+        def done(finished: Future) -> None:
+            # Cancelled while queued, e.g. by a client going away.
+            if finished.cancelled():
+                release()
+
+        try:
+            future = self._get_executor().submit(job)
+        except Exception:
+            release()
+            raise
+        future.add_done_callback(done)
+        return future
+
+    async def run(self, function: Callable, *args):
+        return await asyncio.wrap_future(self.submit(function, *args))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+pool = HashingPool(
+    workers=getattr(settings, "PASSWORD_HASHING_WORKERS", 2),
+    max_pending=getattr(settings, "PASSWORD_HASHING_MAX_PENDING", 32),
+)
+
+
+async def hash_password(password: Optional[str]) -> str:
+    return await pool.run(make_password, password)
+
@@ -0,0 +1,73 @@
+import re
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Count, QuerySet
+
+from user.models import Hashtag, PostHashtag, Posts
+
+HASHTAG_PATTERN = re.compile(r"#(\w+)")
+FIELD_SEPARATOR = re.compile(r"[\s,;]+")
+MAX_HASHTAG_LENGTH = Hashtag._meta.get_field("name").max_length
+
+
+def normalize_hashtag(tag: str) -> str:
+    return tag.strip().lstrip("#").casefold()[:MAX_HASHTAG_LENGTH]
+
+
+def parse_hashtags(hashtags: Optional[str], content: str = "") -> set[str]:
+    """
+    Collect normalized tags from the free-form `hashtags` field (words
+    with or without a leading `#`) and from `#tags` inside the content.
+    """
+    tags = set()
+    for word in FIELD_SEPARATOR.split(hashtags or ""):
+        tags.add(normalize_hashtag(word))
+    for word in HASHTAG_PATTERN.findall(content or ""):
+        tags.add(normalize_hashtag(word))
+    tags.discard("")
+    return tags
+
+
+def index_hashtags(posts: Iterable[Posts]) -> None:
+    """Replace the hashtag rows of the given posts in a few statements."""
+    tags_by_post = {
+        post.id: parse_hashtags(post.hashtags, post.content) for post in posts
+    }
+    if not tags_by_post:
+        return
+
+    names = set().union(*tags_by_post.values())
+    with transaction.atomic():
+        Hashtag.objects.bulk_create(
+            [Hashtag(name=name) for name in names], ignore_conflicts=True
+        )
+        hashtag_ids = dict(
+            Hashtag.objects.filter(name__in=names).values_list("name", "id")
+        )
+        PostHashtag.objects.filter(posts_id__in=tags_by_post).delete()
+        PostHashtag.objects.bulk_create(
+            [
+                PostHashtag(posts_id=post_id, hashtag_id=hashtag_ids[name])
+                for post_id, tags in tags_by_post.items()
+                for name in tags
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def filter_by_hashtags(
+        queryset: QuerySet[Posts], tags: Iterable[str], match_all: bool
+) -> QuerySet[Posts]:
+    """Exact, index-backed tag lookup; `match_all` requires every tag."""
+    names = {normalize_hashtag(tag) for tag in tags} - {""}
+    if not names:
+        return queryset
+
+    tagged = PostHashtag.objects.filter(hashtag__name__in=names)
+    if match_all and len(names) > 1:
+        tagged = tagged.values("posts_id").annotate(
+            matched=Count("hashtag_id")
+        ).filter(matched=len(names))
+
+    return queryset.filter(id__in=tagged.values("posts_id"))
@@ -0,0 +1,266 @@
+"""
+Resized image variants for post images and profile avatars.
+
+Originals are stored as uploaded; once the row is committed, the image is
+decoded and resized in a bounded process pool, off the request thread,
+and the variant paths are recorded in the model's `*_variants` field.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models import Model
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = {"thumbnail": 320, "medium": 1080}
+VARIANT_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+# Model -> (image field, variants field).
+IMAGE_FIELDS = {
+    "posts": ("image", "image_variants"),
+    "profile": ("avatar", "avatar_variants"),
+}
+
+
+def render_variants(
+        data: bytes, max_pixels: int, quality: int
+) -> dict[str, dict[str, bytes]]:
+    """
+    Decode an image and encode every size/format variant.
+
+    Runs in a worker process, so it takes no Django settings. Images over
+    `max_pixels` are rejected from their header, before decoding (Pillow's
+    own limit only warns below twice `MAX_IMAGE_PIXELS`), EXIF orientation
+    is applied and all metadata is dropped.
+    """
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(io.BytesIO(data)) as source:
+        if source.width * source.height > max_pixels:
+            raise Image.DecompressionBombError(
+                f"Image size ({source.width * source.height} pixels) "
+                f"exceeds limit of {max_pixels} pixels"
+            )
+        largest = max(VARIANT_SIZES.values())
+        # Let the JPEG decoder downscale while decoding when it can.
+        source.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    variants = {}
+    for name, size in VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variants[name] = {}
+        for extension, image_format in VARIANT_FORMATS.items():
+            encoded = resized if image_format == "WEBP" else (
+                resized.convert("RGB")
+            )
+            buffer = io.BytesIO()
+            encoded.save(buffer, image_format, quality=quality)
+            variants[name][extension] = buffer.getvalue()
+    return variants
+
+
+def render_options() -> dict:
+    return {
+        "max_pixels": getattr(settings, "IMAGE_MAX_PIXELS", 40_000_000),
+        "quality": getattr(settings, "IMAGE_VARIANT_QUALITY", 80),
+    }
+
+
+def variant_name(source_name: str, variant: str, extension: str) -> str:
+    directory, filename = os.path.split(source_name)
+    stem, _ = os.path.splitext(filename)
+    filename = f"{stem}-{variant}.{extension}"
+    return os.path.join(directory, "variants", filename)
+
+
+def _store_variant(name: str, data: bytes, overwrite: bool) -> str:
+    if default_storage.exists(name):
+        # Content-addressed sources share their variants: keep the stored
+        # file unless it is being re-rendered on purpose.
+        if not overwrite:
+            return name
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(data))
+
+
+def store_variants(
+        source_name: str,
+        rendered: dict[str, dict[str, bytes]],
+        overwrite: bool = False,
+) -> dict:
+    variants = {"source": source_name}
+    for variant, encoded in rendered.items():
+        variants[variant] = {
+            extension: _store_variant(
+                variant_name(source_name, variant, extension),
+                data,
+                overwrite,
+            )
+            for extension, data in encoded.items()
+        }
+    return variants
+
+
+def stored_variants(source_name: str) -> Optional[dict]:
+    """Variants already rendered for the same source file, if complete."""
+    variants = {"source": source_name}
+    for variant in VARIANT_SIZES:
+        variants[variant] = {}
+        for extension in VARIANT_FORMATS:
+            name = variant_name(source_name, variant, extension)
+            if not default_storage.exists(name):
+                return None
+            variants[variant][extension] = name
+    return variants
+
+
+def _field_names(instance: Model) -> tuple[str, str]:
+    return IMAGE_FIELDS[instance._meta.model_name]
+
+
+def needs_variants(instance: Model) -> bool:
+    image_field, variants_field = _field_names(instance)
+    image = getattr(instance, image_field)
+    variants = getattr(instance, variants_field) or {}
+    return bool(image) and variants.get("source") != image.name
+
+
+def record_variants(
+        model: type[Model],
+        pk: int,
+        source_name: str,
+        rendered: dict,
+        overwrite: bool = False,
+) -> None:
+    """
+    Store rendered variants unless the image was replaced meanwhile,
+    replacing variant files already stored if `overwrite` is set.
+    """
+    image_field, variants_field = IMAGE_FIELDS[model._meta.model_name]
+    variants = store_variants(source_name, rendered, overwrite)
+    model.objects.filter(pk=pk, **{image_field: source_name}).update(
+        **{variants_field: variants}
+    )
+
+
+def process_now(instance: Model) -> None:
+    """Render and record the variants of `instance` in this process."""
+    image_field, _ = _field_names(instance)
+    image = getattr(instance, image_field)
+    with image.open("rb") as source:
+        rendered = render_variants(source.read(), **render_options())
+    record_variants(type(instance), instance.pk, image.name, rendered)
+
+
+class ImagePipeline:
+    """A process pool with a cap on queued jobs; extra jobs are skipped."""
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers)
+            return self._executor
+
+    def submit(self, instance: Model) -> Optional[Future]:
+        if not self._slots.acquire(blocking=False):
+            logger.warning(
+                "Image pipeline is full, skipping %s %s; run "
+                "generate_image_variants to catch up.",
+                instance._meta.model_name,
+                instance.pk,
+            )
+            return None
+
+        image_field, _ = _field_names(instance)
+        image = getattr(instance, image_field)
+        try:
+            with image.open("rb") as source:
+                data = source.read()
+            future = self._get_executor().submit(
+                render_variants, data, **render_options()
+            )
+        except Exception:
+            self._slots.release()
+            raise
+
+        model, pk, source_name = type(instance), instance.pk, image.name
+
+        def done(finished: Future) -> None:
+            try:
+                record_variants(model, pk, source_name, finished.result())
+            except Exception:
+                logger.exception(
+                    "Could not render variants of %s", source_name
+                )
+            finally:
+                self._slots.release()
+                connections.close_all()
+
+        future.add_done_callback(done)
+        return future
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+pipeline = ImagePipeline(
+    workers=getattr(settings, "IMAGE_PIPELINE_WORKERS", 2),
+    max_pending=getattr(settings, "IMAGE_PIPELINE_MAX_PENDING", 100),
+)
+
+
+def _process_logged(instance: Model) -> None:
+    try:
+        process_now(instance)
+    except Exception:
+        logger.exception("Could not render variants of %s", instance)
+
+
+def schedule_variants(instance: Model) -> None:
+    """Queue variant generation once the upload is committed."""
+    image_field, variants_field = _field_names(instance)
+    if not getattr(instance, image_field) and getattr(
+            instance, variants_field
+    ):
+        type(instance).objects.filter(pk=instance.pk).update(
+            **{variants_field: {}}
+        )
+        return
+
+    if not getattr(settings, "IMAGE_PIPELINE_ENABLED", True):
+        return
+    if not needs_variants(instance):
+        return
+
+    source_name = getattr(instance, image_field).name
+    variants = stored_variants(source_name)
+    if variants is not None:
+        type(instance).objects.filter(
+            pk=instance.pk, **{image_field: source_name}
+        ).update(**{variants_field: variants})
+        return
+
+    if getattr(settings, "IMAGE_PIPELINE_SYNC", False):
+        transaction.on_commit(lambda: _process_logged(instance))
+    else:
+        transaction.on_commit(lambda: pipeline.submit(instance))
@@ -0,0 +1,54 @@
+from typing import Optional
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from user.counters import change_counter, with_counters
+from user.models import Like, Posts, User
+from user.replicas import pin_user
+
+
+def _table(model) -> str:
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def like_count(post_id: int) -> Optional[int]:
+    """Current like count including shards, None if the post is gone."""
+    post = with_counters(Posts.objects.filter(id=post_id)).first()
+    if post is None:
+        return None
+    return post.like_count + getattr(post, "shard_like_count", 0)
+
+
+def set_like(user: User, post_id: int, liked: bool) -> Optional[int]:
+    """
+    Idempotently like or unlike a post with a single INSERT ... ON
+    CONFLICT DO NOTHING or DELETE keyed on (user, posts), and return the
+    new like count (None if the post does not exist).
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        if liked:
+            # INSERT ... SELECT skips posts that do not exist.
+            cursor.execute(
+                f"INSERT INTO {_table(Like)} (user_id, posts_id, created_at) "
+                f"SELECT %s, id, %s FROM {_table(Posts)} WHERE id = %s "
+                f"ON CONFLICT DO NOTHING RETURNING id",
+                [
+                    user.id,
+                    connection.ops.adapt_datetimefield_value(timezone.now()),
+                    post_id,
+                ],
+            )
+        else:
+            cursor.execute(
+                f"DELETE FROM {_table(Like)} "
+                f"WHERE user_id = %s AND posts_id = %s RETURNING id",
+                [user.id, post_id],
+            )
+        changed = cursor.fetchone() is not None
+
+        if changed:
+            change_counter(post_id, "like_count", 1 if liked else -1)
+            # The raw SQL sends no signals.
+            pin_user(user.id)
+        return like_count(post_id)
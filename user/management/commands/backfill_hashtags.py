@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from user.hashtags import index_hashtags
+from user.models import Posts
+
+
+class Command(BaseCommand):
+    help = "Build the hashtag index for existing posts in batches."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options) -> None:
+        batch_size = options["batch_size"]
+        posts = Posts.objects.order_by("id").only("id", "content", "hashtags")
+        last_id = 0
+        indexed = 0
+
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            index_hashtags(batch)
+            last_id = batch[-1].id
+            indexed += len(batch)
+            self.stdout.write(f"Indexed {indexed} posts...")
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} posts."))
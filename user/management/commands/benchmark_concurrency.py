@@ -0,0 +1,77 @@
+from django.core.management import BaseCommand, CommandError
+from django.test import override_settings
+
+from user.concurrency import HOST, run_benchmarks
+
+COLUMNS = ("rps", "p50_ms", "p95_ms", "p99_ms", "errors")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput and latency of the sync read views and "
+        "their async variants under concurrent load, at equal worker "
+        "counts, on the data already in the database."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Sync worker threads, and async event loops.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Requests in flight per async worker.",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=400,
+            help="Requests per endpoint and mode.",
+        )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            dest="endpoints",
+            help="Only benchmark endpoints whose name contains this.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if min(options["workers"], options["concurrency"]) < 1:
+            raise CommandError("--workers and --concurrency must be >= 1.")
+
+        self.stdout.write(f"{'endpoint':<20}{'mode':<8}" + "".join(
+            f"{column:>10}" for column in COLUMNS
+        ))
+        with override_settings(ALLOWED_HOSTS=[HOST]):
+            try:
+                results = run_benchmarks(
+                    options["workers"],
+                    options["concurrency"],
+                    options["requests"],
+                    options["endpoints"],
+                    self.report,
+                )
+            except ValueError as error:
+                raise CommandError(str(error))
+
+        for name, modes in results.items():
+            ratio = modes["async"]["rps"] / modes["sync"]["rps"]
+            self.stdout.write(f"{name}: async/sync throughput {ratio:.2f}x")
+        if any(
+                result["errors"]
+                for modes in results.values()
+                for result in modes.values()
+        ):
+            raise CommandError("Some requests did not answer 200.")
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    def report(self, name: str, mode: str, result: dict) -> None:
+        self.stdout.write(f"{name:<20}{mode:<8}" + "".join(
+            f"{result[column]:>10.1f}" if column != "errors"
+            else f"{result[column]:>10}"
+            for column in COLUMNS
+        ))
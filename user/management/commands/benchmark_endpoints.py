@@ -0,0 +1,136 @@
+import os
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from user.benchmark import (
+    ENDPOINTS,
+    compare,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+    uncovered_routes,
+)
+from user.follow_cache import follow_graph
+from user.render_cache import render_cache
+from user.seed import rebuild_derived_data, seed_graph
+
+COLUMNS = ("p50_ms", "p95_ms", "p99_ms", "rps", "queries", "peak_kib")
+
+
+def default_baseline() -> str:
+    return getattr(
+        settings,
+        "BENCHMARK_BASELINE",
+        os.path.join(settings.BASE_DIR, "benchmarks", "endpoints.json"),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every API route in-process on a seeded graph (rolled "
+        "back afterwards) and compare with the stored baseline."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--posts-per-user", type=float, default=5)
+        parser.add_argument("--follows-per-user", type=float, default=20)
+        parser.add_argument("--likes", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            dest="endpoints",
+            help="Only benchmark endpoints whose name contains this.",
+        )
+        parser.add_argument("--baseline", default=default_baseline())
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store the results as the new baseline.",
+        )
+        parser.add_argument(
+            "--max-slowdown",
+            type=float,
+            default=2.0,
+            help="Fail when p95 latency or peak memory exceed the "
+                 "baseline by this factor.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        uncovered = uncovered_routes(ENDPOINTS)
+        if uncovered:
+            raise CommandError(
+                f"No benchmark for route(s): {', '.join(sorted(uncovered))}."
+            )
+
+        endpoints = [
+            endpoint
+            for endpoint in ENDPOINTS
+            if not options["endpoints"]
+            or any(part in endpoint.name for part in options["endpoints"])
+        ]
+        seeding = {
+            name: options[name]
+            for name in ("users", "posts_per_user", "follows_per_user",
+                         "likes", "seed")
+        }
+
+        self.stdout.write(f"{'endpoint':<40}" + "".join(
+            f"{column:>10}" for column in COLUMNS
+        ))
+        with override_settings(ALLOWED_HOSTS=["testserver"]):
+            with transaction.atomic():
+                seed_graph(
+                    options["users"],
+                    posts_per_user=options["posts_per_user"],
+                    follows_per_user=options["follows_per_user"],
+                    likes=options["likes"],
+                    seed=options["seed"],
+                    domain="benchmark.example",
+                )
+                rebuild_derived_data()
+                results = run_benchmarks(
+                    options["iterations"], endpoints, self.report
+                )
+                transaction.set_rollback(True)
+        follow_graph.clear()
+        render_cache.clear()
+
+        path = options["baseline"]
+        if options["save_baseline"]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            save_baseline(path, results, seeding)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline {path}."))
+            return
+
+        if not os.path.exists(path):
+            self.stdout.write(f"No baseline at {path}, nothing to compare.")
+            return
+
+        baseline = load_baseline(path)
+        if baseline["seeding"] != seeding:
+            self.stdout.write(
+                "The baseline was seeded differently, latencies may not "
+                "be comparable."
+            )
+        regressions = compare(
+            results, baseline["endpoints"], options["max_slowdown"]
+        )
+        if regressions:
+            raise CommandError(
+                "Regressions against the baseline:\n"
+                + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def report(self, name: str, result: dict) -> None:
+        self.stdout.write(f"{name:<40}" + "".join(
+            f"{result[column]:>10.1f}" if column != "queries"
+            else f"{result[column]:>10}"
+            for column in COLUMNS
+        ))
@@ -0,0 +1,89 @@
+import time
+from typing import Callable
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from user.models import Posts, User
+from user.render_cache import render_cache
+from user.renderers import ORJSONRenderer
+from user.row_serializers import PostRowSerializer
+from user.serializers import PostSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare PostSerializer + JSONRenderer with the row serializer + "
+        "orjson list path on temporary posts (rolled back afterwards)."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--rows", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options) -> None:
+        with transaction.atomic():
+            self.run(options["rows"], options["repeat"])
+            transaction.set_rollback(True)
+
+    def run(self, rows: int, repeat: int) -> None:
+        user = User.objects.create_user(
+            "benchmark-serialization@example.com", None
+        )
+        Posts.objects.bulk_create(
+            [
+                Posts(
+                    user=user,
+                    content=f"Benchmark post {number} #benchmark",
+                    hashtags="#benchmark",
+                )
+                for number in range(rows)
+            ],
+            batch_size=1000,
+        )
+        queryset = Posts.objects.filter(user=user).order_by("-id")
+        request = APIRequestFactory().get("/", HTTP_HOST="127.0.0.1")
+        context = {"request": Request(request)}
+
+        def drf() -> bytes:
+            data = PostSerializer(queryset, many=True, context=context).data
+            return JSONRenderer().render(data)
+
+        def fast() -> bytes:
+            serializer = PostRowSerializer(context=context)
+            values = queryset.values(*serializer.columns)
+            return ORJSONRenderer().render(
+                serializer.to_representations(list(values))
+            )
+
+        with override_settings(RENDER_CACHE_ENABLED=False):
+            if drf() != fast():
+                self.stderr.write("Outputs differ!")
+            baseline = self.measure("DRF serializer + json", drf, repeat)
+            uncached = self.measure("row serializer + orjson", fast, repeat)
+
+        render_cache.clear()
+        fast()
+        cached = self.measure("row serializer + render cache", fast, repeat)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Speedup over DRF: {baseline / uncached:.1f}x uncached, "
+                f"{baseline / cached:.1f}x with warm render cache."
+            )
+        )
+
+    def measure(self, label: str, run: Callable, repeat: int) -> float:
+        """Best of `repeat` runs, in seconds."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        self.stdout.write(f"{label:<32} {best * 1000:8.1f} ms")
+        return best
@@ -0,0 +1,26 @@
+from django.core.management import BaseCommand
+
+from user.media import collect_blobs, recount_blobs
+
+
+class Command(BaseCommand):
+    help = "Delete media blobs no post or profile references any more."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--recount",
+            action="store_true",
+            help="Recount references before collecting.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        batch_size = options["batch_size"]
+        if options["recount"]:
+            drifted = recount_blobs(batch_size)
+            self.stdout.write(f"Repaired {drifted} reference counts.")
+
+        collected = collect_blobs(batch_size=batch_size)
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {collected} unreferenced blobs.")
+        )
@@ -0,0 +1,46 @@
+from django.core.management import BaseCommand, CommandError
+
+from user.export import export_user, parse_since
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Write a user's data as NDJSON to stdout or a file."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("email")
+        parser.add_argument(
+            "--since",
+            help="Only rows created or changed after this ISO 8601 time.",
+        )
+        parser.add_argument("--output", help="File to write instead.")
+
+    def handle(self, *args, **options) -> None:
+        try:
+            user = User.objects.get(email=options["email"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user {options['email']}.")
+
+        since = None
+        if options["since"]:
+            try:
+                since = parse_since(options["since"])
+            except ValueError:
+                raise CommandError("--since must be an ISO 8601 time.")
+
+        lines = export_user(user, since)
+        if not options["output"]:
+            for line in lines:
+                self.stdout.write(line.decode(), ending="")
+            return
+
+        written = 0
+        with open(options["output"], "wb") as output:
+            for line in lines:
+                output.write(line)
+                written += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {written - 1} rows to {options['output']}."
+            )
+        )
@@ -0,0 +1,88 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db.models import Model, Q
+
+from user.images import (
+    IMAGE_FIELDS,
+    needs_variants,
+    record_variants,
+    render_options,
+    render_variants,
+)
+from user.models import Posts, Profile
+
+
+class Command(BaseCommand):
+    help = "Render missing image variants of posts and profile avatars."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Re-render variants that already exist, replacing their "
+            "files.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        workers = getattr(settings, "IMAGE_PIPELINE_WORKERS", 2)
+        with ProcessPoolExecutor(workers) as executor:
+            for model in (Posts, Profile):
+                rendered = self.backfill(model, executor, options)
+                self.stdout.write(
+                    f"Rendered variants of {rendered} "
+                    f"{model._meta.verbose_name_plural}."
+                )
+
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    def backfill(
+            self, model: type[Model], executor, options: dict
+    ) -> int:
+        image_field, variants_field = IMAGE_FIELDS[model._meta.model_name]
+        instances = model.objects.exclude(
+            Q(**{f"{image_field}__isnull": True}) | Q(**{image_field: ""})
+        ).order_by("pk").only("pk", image_field, variants_field)
+        last_pk = 0
+        rendered = 0
+
+        while True:
+            batch = list(
+                instances.filter(pk__gt=last_pk)[:options["batch_size"]]
+            )
+            if not batch:
+                return rendered
+            last_pk = batch[-1].pk
+
+            jobs = []
+            for instance in batch:
+                if not options["force"] and not needs_variants(instance):
+                    continue
+                image = getattr(instance, image_field)
+                try:
+                    with image.open("rb") as source:
+                        data = source.read()
+                except OSError as error:
+                    self.stderr.write(f"Skipping {image.name}: {error}")
+                    continue
+                future = executor.submit(
+                    render_variants, data, **render_options()
+                )
+                jobs.append((instance, image.name, future))
+
+            for instance, name, future in jobs:
+                try:
+                    result = future.result()
+                except Exception as error:
+                    self.stderr.write(f"Could not render {name}: {error}")
+                    continue
+                record_variants(
+                    model,
+                    instance.pk,
+                    name,
+                    result,
+                    overwrite=options["force"],
+                )
+                rendered += 1
@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+
+from user.revocation import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete revocations of tokens that have expired anyway."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options) -> None:
+        purged = purge_expired(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {purged} expired revocations.")
+        )
@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand
+
+from user.models import User
+from user.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = "Rebuild materialized home timelines from posts and follows."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--user",
+            type=int,
+            dest="user_ids",
+            action="append",
+            help="Only rebuild the timeline of this user id (repeatable).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        users = User.objects.order_by("id")
+        if options["user_ids"]:
+            users = users.filter(id__in=options["user_ids"])
+
+        rebuilt = 0
+        for user in users.iterator(chunk_size=500):
+            rebuild_timeline(user)
+            rebuilt += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {rebuilt} timeline(s).")
+        )
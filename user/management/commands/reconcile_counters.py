@@ -0,0 +1,33 @@
+from django.core.management import BaseCommand
+
+from user.counters import reconcile_counters
+from user.models import Posts
+
+
+class Command(BaseCommand):
+    help = "Recount post like/comment counters and fold counter shards."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options) -> None:
+        batch_size = options["batch_size"]
+        post_ids = Posts.objects.order_by("id").values_list("id", flat=True)
+        last_id = 0
+        checked = 0
+        drifted = 0
+
+        while True:
+            batch = list(post_ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+
+            drifted += reconcile_counters(batch)
+            last_id = batch[-1]
+            checked += len(batch)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {checked} posts, repaired {drifted}."
+            )
+        )
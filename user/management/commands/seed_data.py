@@ -0,0 +1,127 @@
+import os
+import time
+
+from django.core.management import BaseCommand, CommandError
+
+from user.follow_cache import follow_graph
+from user.seed import (
+    RECORD_TYPES,
+    copy_supported,
+    load_records,
+    read_records,
+    rebuild_derived_data,
+    seed_graph,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk load users, posts, follows and likes from CSV/NDJSON files "
+        "or generate a synthetic social graph, then rebuild the hashtag "
+        "index, counters and timelines."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "files",
+            nargs="*",
+            help="CSV or NDJSON files to load, in order.",
+        )
+        parser.add_argument(
+            "--type",
+            choices=RECORD_TYPES,
+            help="Record type of the rows of CSV files.",
+        )
+        parser.add_argument("--users", type=int, default=0)
+        parser.add_argument("--posts-per-user", type=float, default=10)
+        parser.add_argument("--follows-per-user", type=float, default=20)
+        parser.add_argument("--likes", type=int, default=0)
+        parser.add_argument(
+            "--exponent",
+            type=float,
+            default=1.0,
+            help="Power-law exponent of user popularity.",
+        )
+        parser.add_argument("--days", type=int, default=30)
+        parser.add_argument("--password", default="password")
+        parser.add_argument("--domain", default="seed.example")
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use bulk_create() even where COPY is available.",
+        )
+        parser.add_argument(
+            "--skip-rebuild",
+            action="store_true",
+            help="Do not rebuild hashtags, counters and timelines.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if not options["files"] and not options["users"]:
+            raise CommandError("Pass files to load or --users to generate.")
+
+        copy = copy_supported() and not options["no_copy"]
+        self.stdout.write(
+            f"Writing with {'COPY' if copy else 'bulk_create()'}."
+        )
+        started = time.perf_counter()
+
+        for path in options["files"]:
+            self.load(path, options["type"], options["batch_size"], copy)
+
+        if options["users"]:
+            seed_graph(
+                options["users"],
+                posts_per_user=options["posts_per_user"],
+                follows_per_user=options["follows_per_user"],
+                likes=options["likes"],
+                exponent=options["exponent"],
+                days=options["days"],
+                password=options["password"],
+                domain=options["domain"],
+                batch_size=options["batch_size"],
+                copy=copy,
+                seed=options["seed"],
+                log=self.stdout.write,
+            )
+        self.stdout.write(f"Loaded in {time.perf_counter() - started:.1f}s.")
+
+        if options["skip_rebuild"]:
+            follow_graph.clear()
+        else:
+            rebuild_derived_data(self.stdout)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done in {time.perf_counter() - started:.1f}s."
+            )
+        )
+
+    def load(
+            self, path: str, record_type: str, batch_size: int, copy: bool
+    ) -> None:
+        file_format = (
+            "csv" if os.path.splitext(path)[1].lower() == ".csv"
+            else "ndjson"
+        )
+        if file_format == "csv" and record_type is None:
+            raise CommandError("CSV files need --type.")
+
+        try:
+            with open(path, newline="", encoding="utf-8") as source:
+                counts = load_records(
+                    read_records(source, file_format, record_type),
+                    batch_size,
+                    copy,
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(f"{path}: {error}")
+
+        for loaded_type, (written, skipped) in counts.items():
+            if written or skipped:
+                self.stdout.write(
+                    f"{path}: {written} {loaded_type} rows written, "
+                    f"{skipped} skipped."
+                )
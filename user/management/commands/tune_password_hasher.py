@@ -0,0 +1,33 @@
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management import BaseCommand
+
+SAMPLE_ITERATIONS = 100_000
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure PBKDF2 on this machine and suggest the "
+        "PASSWORD_HASH_ITERATIONS that take --target-ms per hash."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--target-ms", type=float, default=100.0)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options) -> None:
+        hasher = PBKDF2PasswordHasher()
+        timings = []
+        for _ in range(options["rounds"]):
+            started = time.perf_counter()
+            hasher.encode("password", hasher.salt(), SAMPLE_ITERATIONS)
+            timings.append(time.perf_counter() - started)
+
+        per_iteration = min(timings) / SAMPLE_ITERATIONS
+        iterations = int(options["target_ms"] / 1000 / per_iteration)
+        # Never weaker than Django's own default.
+        iterations = max(iterations, PBKDF2PasswordHasher.iterations)
+        self.stdout.write(
+            self.style.SUCCESS(f"PASSWORD_HASH_ITERATIONS={iterations}")
+        )
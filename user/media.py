@@ -0,0 +1,165 @@
+"""
+Reference counting of content-addressed media blobs.
+
+Every `Posts.image` and `Profile.avatar` pointing at a blob holds one
+reference. A blob whose count drops to zero is deleted, with its image
+variants, once it has not been touched for MEDIA_BLOB_GRACE_PERIOD
+seconds; the grace period covers uploads that are about to reference it.
+"""
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F, Model
+from django.utils import timezone
+
+from user.images import (
+    IMAGE_FIELDS,
+    VARIANT_FORMATS,
+    VARIANT_SIZES,
+    variant_name,
+)
+from user.models import MediaBlob, Posts, Profile
+from user.storage import content_addressed_storage, is_blob_name
+
+
+def grace_period() -> timedelta:
+    return timedelta(
+        seconds=getattr(settings, "MEDIA_BLOB_GRACE_PERIOD", 600)
+    )
+
+
+def touch_blob(name: str, size: int) -> None:
+    MediaBlob.objects.update_or_create(name=name, defaults={"size": size})
+
+
+def retain_blob(name: str) -> None:
+    MediaBlob.objects.filter(name=name).update(ref_count=F("ref_count") + 1)
+
+
+def release_blob(name: str) -> None:
+    """Drop a reference and collect the blob once that is committed."""
+    MediaBlob.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F("ref_count") - 1
+    )
+    transaction.on_commit(lambda: collect_blobs([name]))
+
+
+def delete_blob_files(name: str) -> None:
+    content_addressed_storage.delete(name)
+    for variant in VARIANT_SIZES:
+        for extension in VARIANT_FORMATS:
+            default_storage.delete(variant_name(name, variant, extension))
+
+
+def collect_blobs(
+        names: Optional[Iterable[str]] = None, batch_size: int = 1000
+) -> int:
+    """
+    Delete unreferenced blobs older than the grace period, all of them or
+    only those in `names`, and return how many were deleted.
+    """
+    cutoff = timezone.now() - grace_period()
+    orphans = MediaBlob.objects.filter(ref_count=0, updated_at__lt=cutoff)
+    if names is not None:
+        orphans = orphans.filter(name__in=list(names))
+
+    collected = 0
+    last_id = 0
+    while True:
+        ids = list(
+            orphans.filter(id__gt=last_id).order_by("id").values_list(
+                "id", flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return collected
+        last_id = ids[-1]
+
+        for blob_id in ids:
+            with transaction.atomic():
+                # Locked and checked again: an upload touching the blob
+                # meanwhile waits for the lock and then writes it anew.
+                blob = orphans.select_for_update().filter(id=blob_id).first()
+                if blob is None:
+                    continue
+                delete_blob_files(blob.name)
+                blob.delete()
+            collected += 1
+
+
+def recount_blobs(batch_size: int = 1000) -> int:
+    """Recompute every blob's reference count, return how many drifted."""
+    drifted = 0
+    last_id = 0
+    while True:
+        blobs = list(
+            MediaBlob.objects.filter(id__gt=last_id).order_by("id").only(
+                "id", "name", "ref_count"
+            )[:batch_size]
+        )
+        if not blobs:
+            return drifted
+        last_id = blobs[-1].id
+
+        names = [blob.name for blob in blobs]
+        counts = dict.fromkeys(names, 0)
+        for model in (Posts, Profile):
+            field, _ = IMAGE_FIELDS[model._meta.model_name]
+            for name, total in model.objects.filter(
+                **{f"{field}__in": names}
+            ).values(field).annotate(total=Count("pk")).values_list(
+                field, "total"
+            ):
+                counts[name] += total
+
+        changed = [
+            blob for blob in blobs if blob.ref_count != counts[blob.name]
+        ]
+        for blob in changed:
+            blob.ref_count = counts[blob.name]
+        MediaBlob.objects.bulk_update(changed, ["ref_count"])
+        drifted += len(changed)
+
+
+def _field_name(instance: Model) -> str:
+    image_field, _ = IMAGE_FIELDS[instance._meta.model_name]
+    return image_field
+
+
+def remember_stored_media(
+        instance: Model, update_fields: Optional[Iterable[str]] = None
+) -> None:
+    """Before saving, note the blob the stored row currently references."""
+    field = _field_name(instance)
+    if instance._state.adding or (
+            update_fields is not None and field not in update_fields
+    ):
+        return
+    instance._stored_media = type(instance).objects.filter(
+        pk=instance.pk
+    ).values_list(field, flat=True).first()
+
+
+def update_media_references(instance: Model, created: bool) -> None:
+    if created:
+        stored = None
+    elif "_stored_media" in instance.__dict__:
+        stored = instance.__dict__.pop("_stored_media")
+    else:
+        return
+    current = getattr(instance, _field_name(instance)).name or None
+    if stored == current:
+        return
+    if current and is_blob_name(current):
+        retain_blob(current)
+    if stored and is_blob_name(stored):
+        release_blob(stored)
+
+
+def release_media(instance: Model) -> None:
+    name = getattr(instance, _field_name(instance)).name
+    if name and is_blob_name(name):
+        release_blob(name)
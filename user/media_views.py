@@ -0,0 +1,192 @@
+"""
+Serving of uploaded media.
+
+With MEDIA_SENDFILE set the file is handed to the front proxy through
+`X-Accel-Redirect` (nginx) or `X-Sendfile` (Apache, lighttpd), which then
+deals with ranges and the transfer itself. Otherwise the file is streamed
+with `FileResponse`, which the WSGI server can send with sendfile(2), and
+single byte ranges are answered with 206 responses.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from typing import Optional
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, parse_etags
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from user.storage import is_blob_name
+
+X_ACCEL_REDIRECT = "x-accel-redirect"
+X_SENDFILE = "x-sendfile"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def cache_control(name: str) -> str:
+    # Content-addressed files never change under the same name.
+    if is_blob_name(name):
+        return IMMUTABLE
+    max_age = getattr(settings, "MEDIA_CACHE_MAX_AGE", 3600)
+    return f"public, max-age={max_age}"
+
+
+def file_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    The inclusive (first, last) bytes of a single range, or None when the
+    header should be ignored. Raises ValueError for unsatisfiable ranges.
+    Multiple ranges are not supported; the whole file is sent instead.
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+
+    if not first:
+        # A suffix range: the last N bytes.
+        if not int(last) or not size:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError(header)
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def range_applies(
+        request: HttpRequest, etag: str, last_modified: int
+) -> bool:
+    """`If-Range` only allows the range when the file is unchanged."""
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return parse_etags(if_range) == [etag]
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _read_range(file, length: int):
+    """Yield `length` bytes of `file` from its current position."""
+    try:
+        while length > 0:
+            data = file.read(min(CHUNK_SIZE, length))
+            if not data:
+                return
+            length -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def sendfile_response(
+        name: str, path: str, content_type: str
+) -> HttpResponse:
+    """An empty response telling the front proxy which file to send."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == X_ACCEL_REDIRECT:
+        prefix = getattr(settings, "MEDIA_ACCEL_PREFIX", "/protected-media/")
+        response.headers["X-Accel-Redirect"] = quote(
+            prefix.rstrip("/") + "/" + name
+        )
+    elif settings.MEDIA_SENDFILE == X_SENDFILE:
+        response.headers["X-Sendfile"] = path
+    else:
+        raise ImproperlyConfigured(
+            f"Unknown MEDIA_SENDFILE {settings.MEDIA_SENDFILE!r}."
+        )
+    return response
+
+
+def _add_headers(response: HttpResponse, headers: dict) -> None:
+    for header, value in headers.items():
+        response.headers[header] = value
+
+
+@require_safe
+def serve_media(request: HttpRequest, path: str) -> HttpResponse:
+    name = posixpath.normpath(path).lstrip("/")
+    full_path = safe_join(settings.MEDIA_ROOT, name)
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Media file not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found.")
+
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": cache_control(name),
+    }
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        _add_headers(response, headers)
+        return response
+
+    content_type, encoding = mimetypes.guess_type(name)
+    content_type = content_type or "application/octet-stream"
+
+    if getattr(settings, "MEDIA_SENDFILE", ""):
+        response = sendfile_response(name, full_path, content_type)
+        _add_headers(response, headers)
+        return response
+
+    byte_range = None
+    header = request.META.get("HTTP_RANGE")
+    if header and range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(header, stat.st_size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+
+    file = open(full_path, "rb")
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        first, last = byte_range
+        file.seek(first)
+        # Streamed, since a file wrapper would send past the range.
+        response = StreamingHttpResponse(
+            _read_range(file, last - first + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response.headers["Content-Length"] = str(last - first + 1)
+        response.headers["Content-Range"] = (
+            f"bytes {first}-{last}/{stat.st_size}"
+        )
+
+    _add_headers(response, headers)
+    response.headers["Accept-Ranges"] = "bytes"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,275 @@
+"""
+Prometheus metrics for capacity planning.
+
+Requests are recorded per resolved URL name by `MetricsMiddleware`. With
+`PROMETHEUS_MULTIPROC_DIR` set in the environment before start-up,
+prometheus_client keeps every worker's values in memory-mapped files in
+that directory and `/metrics` sums them, so any worker can answer a
+scrape. The directory must be emptied before the server starts and dead
+workers should be reported with `prometheus_client.multiprocess.
+mark_process_dead()` (gunicorn's `child_exit` hook).
+"""
+import hmac
+import ipaddress
+import os
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.views.decorators.http import require_safe
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from user.follow_cache import follow_graph
+from user.render_cache import render_cache
+from user.user_cache import user_cache
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+UNRESOLVED = "<unresolved>"
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests by view, method and status code.",
+    ["view", "method", "status"],
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent in Django per request.",
+    ["view", "method"],
+    buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5,
+        5.0, 10.0,
+    ),
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body sizes, where known.",
+    ["view"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled.",
+    multiprocess_mode="livesum",
+)
+QUERIES = Histogram(
+    "db_queries_per_request",
+    "SQL statements executed per request.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+QUERY_TIME = Counter(
+    "db_query_seconds_total",
+    "Time spent executing SQL, by view.",
+    ["view"],
+)
+CONNECTIONS_OPENED = Counter(
+    "db_connections_opened_total",
+    "New database connections, by alias.",
+    ["alias"],
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the pool.",
+    ["alias"],
+    buckets=(
+        0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0,
+    ),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Pooled connections by state (in_use, idle).",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_MAX_SIZE = Gauge(
+    "db_pool_max_connections",
+    "Size limit of the pool; in_use divided by it is the utilization.",
+    ["alias"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a connection.",
+    ["alias"],
+)
+DB_POOL_CREATED = Counter(
+    "db_pool_connections_created_total",
+    "Connections opened by the pool.",
+    ["alias"],
+)
+DB_POOL_CLOSED = Counter(
+    "db_pool_connections_closed_total",
+    "Connections closed by the pool, by reason.",
+    ["alias", "reason"],
+)
+DB_REPLICA_UNAVAILABLE = Counter(
+    "db_replica_unavailable_total",
+    "Failed replica connections; reads went to another database.",
+    ["alias"],
+)
+DB_READS = Counter(
+    "db_read_routes_total",
+    "Safe-method requests by the database their reads were routed to.",
+    ["alias"],
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "In-process cache lookups by cache and result.",
+    ["cache", "result"],
+)
+
+HASHING_PENDING = Gauge(
+    "password_hashing_pending",
+    "Password hashing jobs queued or running.",
+    multiprocess_mode="livesum",
+)
+HASHING_REJECTED = Counter(
+    "password_hashing_rejected_total",
+    "Password hashing jobs refused because the queue was full.",
+)
+HASHING_WAIT = Histogram(
+    "password_hashing_wait_seconds",
+    "Time password hashing jobs waited for a worker.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+HASHING_DURATION = Histogram(
+    "password_hashing_seconds",
+    "Time spent hashing a password.",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+CACHES = {
+    "render": render_cache,
+    "follow_graph": follow_graph,
+    "user": user_cache,
+}
+
+
+class _CacheCounters:
+    """
+    Publishes the growth of the caches' hit/miss counters. Skipped when
+    another thread is already doing it; the next request catches up.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reported: dict[tuple[str, str], int] = {}
+
+    def sync(self) -> None:
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            for name, cache in CACHES.items():
+                for result, value in (
+                        ("hit", cache.hits), ("miss", cache.misses)
+                ):
+                    delta = value - self._reported.get((name, result), 0)
+                    self._reported[name, result] = value
+                    # Negative after the cache was cleared.
+                    if delta > 0:
+                        CACHE_LOOKUPS.labels(name, result).inc(delta)
+        finally:
+            self._lock.release()
+
+
+cache_counters = _CacheCounters()
+
+
+class QueryCounter:
+    """`execute_wrapper()` hook counting statements and their time."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def response_size(response: HttpResponse):
+    if response.has_header("Content-Length"):
+        return int(response["Content-Length"])
+    if not response.streaming:
+        return len(response.content)
+    return None
+
+
+def record_request(
+        request: HttpRequest,
+        response: HttpResponse,
+        duration: float,
+        queries: QueryCounter,
+) -> None:
+    match = request.resolver_match
+    view = match.view_name if match is not None else UNRESOLVED
+    method = request.method if request.method in METHODS else "other"
+
+    REQUESTS.labels(view, method, str(response.status_code)).inc()
+    LATENCY.labels(view, method).observe(duration)
+    QUERIES.labels(view).observe(queries.count)
+    if queries.seconds:
+        QUERY_TIME.labels(view).inc(queries.seconds)
+    size = response_size(response)
+    if size is not None:
+        RESPONSE_SIZE.labels(view).observe(size)
+    cache_counters.sync()
+
+
+@lru_cache(maxsize=8)
+def _networks(cidrs: tuple[str, ...]) -> tuple:
+    return tuple(ipaddress.ip_network(cidr, strict=False) for cidr in cidrs)
+
+
+def may_scrape(request: HttpRequest) -> bool:
+    """
+    With `METRICS_TOKEN` set, whether the request carries it; otherwise
+    whether it comes from `METRICS_ALLOWED_NETWORKS`.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        return hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(),
+            f"Bearer {token}".encode(),
+        )
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    networks = _networks(
+        tuple(getattr(settings, "METRICS_ALLOWED_NETWORKS", ()))
+    )
+    return any(address in network for network in networks)
+
+
+@require_safe
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Prometheus text exposition, summed over workers in multiprocess."""
+    if not may_scrape(request):
+        status = 401 if getattr(settings, "METRICS_TOKEN", "") else 403
+        return HttpResponse(status=status)
+
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
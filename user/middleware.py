@@ -0,0 +1,285 @@
+import logging
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.http import HttpRequest, HttpResponse
+from rest_framework.permissions import SAFE_METHODS
+
+from user.authentication import JWTAuthentication
+from user.metrics import (
+    DB_READS,
+    IN_PROGRESS,
+    QueryCounter,
+    record_request,
+)
+from user.perf import (
+    RequestProfile,
+    SlowQuery,
+    activate,
+    current_profile,
+    deactivate,
+    observe_queries,
+)
+from user.replicas import (
+    ReplicaSet,
+    ais_pinned,
+    is_pinned,
+    replica_reads,
+    replica_weights,
+)
+
+logger = logging.getLogger("user.perf")
+
+
+def explain(query: SlowQuery) -> str:
+    """The database's plan for a slow SELECT, or an empty string."""
+    if query.many or not query.sql.lstrip().upper().startswith("SELECT"):
+        return ""
+    connection = connections[query.alias]
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {query.sql}", query.params)
+            return "\n".join(
+                " ".join(str(column) for column in row)
+                for row in cursor.fetchall()
+            )
+    except DatabaseError as error:
+        return f"EXPLAIN failed: {error}"
+
+
+class _ProfiledRun:
+    __slots__ = ("profile", "total", "allocations")
+
+    def __init__(self, profile: RequestProfile) -> None:
+        self.profile = profile
+        self.total = 0.0
+        self.allocations: list = []
+
+
+class PerformanceMiddleware:
+    """
+    Time requests when `PERF_INSTRUMENTATION` is on: SQL through
+    `user.perf.observe_queries()`, the view, authentication,
+    serialization and rendering through `user.perf.timed()` and the
+    template response hooks. Timings are sent in a `Server-Timing`
+    header and requests slower than `PERF_SLOW_REQUEST_MS` are logged
+    with their slowest queries and the plans of those. A
+    `PERF_TRACEMALLOC_SAMPLE_RATE` fraction of requests also records peak
+    memory allocated, and the top allocation sites of slow ones.
+
+    When the setting is off the middleware removes itself from the stack.
+    It runs sync or async, like the handler it wraps, so async views are
+    not pushed to a thread under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        if not getattr(settings, "PERF_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.slow_request = (
+            getattr(settings, "PERF_SLOW_REQUEST_MS", 500) / 1000
+        )
+        self.slow_queries = getattr(settings, "PERF_SLOW_QUERIES", 3)
+        self.sample_rate = getattr(
+            settings, "PERF_TRACEMALLOC_SAMPLE_RATE", 0.0
+        )
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.is_async:
+            return self.__acall__(request)
+        with self.profiled() as run:
+            response = self.get_response(request)
+        response["Server-Timing"] = run.profile.server_timing()
+        if run.total >= self.slow_request:
+            self.log_slow_request(request, response, run)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        with self.profiled() as run:
+            response = await self.get_response(request)
+        response["Server-Timing"] = run.profile.server_timing()
+        if run.total >= self.slow_request:
+            # Plans are queried through the sync ORM.
+            await sync_to_async(self.log_slow_request)(request, response, run)
+        return response
+
+    @contextmanager
+    def profiled(self) -> Iterator[_ProfiledRun]:
+        run = _ProfiledRun(RequestProfile(self.slow_queries))
+        profile = run.profile
+        # tracemalloc is process wide: only sample when nobody else is.
+        tracing = (
+            self.sample_rate > 0
+            and random.random() < self.sample_rate
+            and not tracemalloc.is_tracing()
+        )
+        if tracing:
+            tracemalloc.start()
+
+        token = activate(profile)
+        started = time.perf_counter()
+        try:
+            with observe_queries(profile):
+                yield run
+            profile.stop("view")
+            run.total = time.perf_counter() - started
+            profile.durations["total"] = run.total
+
+            if tracing:
+                profile.peak_memory = tracemalloc.get_traced_memory()[1]
+                if run.total >= self.slow_request:
+                    run.allocations = tracemalloc.take_snapshot().statistics(
+                        "lineno"
+                    )[:5]
+        finally:
+            deactivate(token)
+            if tracing:
+                tracemalloc.stop()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_profile().start("view")
+
+    def process_template_response(self, request, response):
+        profile = current_profile()
+        profile.stop("view")
+        profile.start("render")
+        response.add_post_render_callback(
+            lambda rendered: profile.stop("render")
+        )
+        return response
+
+    def log_slow_request(
+            self,
+            request: HttpRequest,
+            response: HttpResponse,
+            run: _ProfiledRun,
+    ) -> None:
+        lines = [
+            f"Slow request {request.method} {request.get_full_path()} "
+            f"{response.status_code}: {response['Server-Timing']}"
+        ]
+        for query in run.profile.slowest_queries():
+            # The statement without its parameters, which carry password
+            # hashes, emails and tokens.
+            lines.append(
+                f"{query.duration * 1000:.2f} ms [{query.alias}] {query.sql}"
+            )
+            plan = explain(query)
+            if plan:
+                lines.append(plan)
+        for statistic in run.allocations:
+            lines.append(f"Allocated {statistic}")
+        logger.warning("\n".join(lines))
+
+
+class MetricsMiddleware:
+    """
+    Record Prometheus request metrics (see `user.metrics`) unless
+    `METRICS_ENABLED` is off. Queries are only counted per request; the
+    shared metrics are updated once, after the response. Sync or async
+    like `PerformanceMiddleware`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        if not getattr(settings, "METRICS_ENABLED", True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with self.counting() as queries:
+            response = self.get_response(request)
+        record_request(
+            request, response, time.perf_counter() - started, queries
+        )
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        started = time.perf_counter()
+        with self.counting() as queries:
+            response = await self.get_response(request)
+        record_request(
+            request, response, time.perf_counter() - started, queries
+        )
+        return response
+
+    @contextmanager
+    def counting(self) -> Iterator[QueryCounter]:
+        queries = QueryCounter()
+        IN_PROGRESS.inc()
+        try:
+            with observe_queries(queries):
+                yield queries
+        finally:
+            IN_PROGRESS.dec()
+
+
+class ReplicaMiddleware:
+    """
+    Let the reads of GET, HEAD and OPTIONS requests go to the read
+    replicas (see `user.replicas`), unless the access token's user is
+    pinned to the primary by a recent write. Removed from the stack when
+    `DATABASE_REPLICAS` is empty. Sync or async like the others.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.replicas = ReplicaSet(
+            replica_weights(),
+            retry_after=getattr(settings, "REPLICA_RETRY_AFTER", 30.0),
+        )
+        if not self.replicas:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.authentication = JWTAuthentication()
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.is_async:
+            return self.__acall__(request)
+        if request.method not in SAFE_METHODS:
+            return self.get_response(request)
+        if is_pinned(self.authentication.user_id(request)):
+            DB_READS.labels("default").inc()
+            return self.get_response(request)
+        with replica_reads(self.replicas):
+            return self.get_response(request)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if request.method not in SAFE_METHODS:
+            return await self.get_response(request)
+        if await ais_pinned(self.authentication.user_id(request)):
+            DB_READS.labels("default").inc()
+            return await self.get_response(request)
+        with replica_reads(self.replicas):
+            return await self.get_response(request)
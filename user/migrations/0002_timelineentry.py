@@ -0,0 +1,30 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+                ('posts', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='user.posts')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['owner', '-created_at'], name='user_timeli_owner_i_3aba9c_idx'), models.Index(fields=['owner', 'author'], name='user_timeli_owner_i_38d870_idx')],
+                'unique_together': {('owner', 'posts')},
+            },
+        ),
+    ]
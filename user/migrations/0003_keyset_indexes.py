@@ -0,0 +1,21 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['-created_at', '-id'], name='user_commen_created_1d4a10_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='posts',
+            index=models.Index(fields=['-created_at', '-id'], name='user_posts_created_63a2c2_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PostHashtag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_hashtags', to='user.hashtag')),
+                ('posts', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_hashtags', to='user.posts')),
+            ],
+            options={
+                'unique_together': {('hashtag', 'posts')},
+            },
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='posts', through='user.PostHashtag', to='user.hashtag'),
+        ),
+    ]
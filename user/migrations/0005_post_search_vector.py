@@ -0,0 +1,45 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:05
+
+from django.db import migrations
+
+FORWARD_SQL = [
+    "ALTER TABLE user_posts ADD COLUMN search_vector tsvector",
+    "UPDATE user_posts "
+    "SET search_vector = to_tsvector('pg_catalog.english', content)",
+    "CREATE INDEX user_posts_search_vector_idx "
+    "ON user_posts USING gin (search_vector)",
+    "CREATE TRIGGER user_posts_search_vector_update "
+    "BEFORE INSERT OR UPDATE OF content ON user_posts "
+    "FOR EACH ROW EXECUTE FUNCTION tsvector_update_trigger("
+    "search_vector, 'pg_catalog.english', content)",
+]
+
+REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS user_posts_search_vector_update ON user_posts",
+    "ALTER TABLE user_posts DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            # SQLite uses an FTS5 table, see user.search.
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_hashtag_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_on_postgresql(FORWARD_SQL),
+            run_on_postgresql(REVERSE_SQL),
+        ),
+    ]
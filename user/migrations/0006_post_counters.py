@@ -0,0 +1,37 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0005_post_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='posts',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='PostCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('like_count', models.IntegerField(default=0)),
+                ('comment_count', models.IntegerField(default=0)),
+                ('posts', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shards', to='user.posts')),
+            ],
+            options={
+                'unique_together': {('posts', 'shard')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0006_post_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['follower', '-id'], name='user_follow_followe_7d4441_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['followed', '-id'], name='user_follow_followe_aff30d_idx'),
+        ),
+    ]
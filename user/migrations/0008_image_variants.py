@@ -0,0 +1,23 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0007_follow_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posts',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.2 on 2026-10-18 02:46
+
+from django.db import migrations, models
+import user.models
+import user.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='posts',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=user.storage.media_storage, upload_to=user.models.posts_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=user.storage.media_storage, upload_to=user.models.profile_image_file_path),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('ref_count', 0)), fields=['updated_at'], name='user_mediablob_orphan_idx')],
+            },
+        ),
+    ]
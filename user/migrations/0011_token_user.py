@@ -0,0 +1,28 @@
+# Generated by Django 4.2.2 on 2026-10-18 03:35
+
+from django.db import migrations
+import user.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0010_profile_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenUser',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('user.user',),
+            managers=[
+                ('objects', user.models.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-18 05:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0012_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='timelineentry',
+            name='user_timeli_owner_i_3aba9c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='posts',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='user_posts_user_id_e5bd98_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['owner', '-created_at', '-posts'], name='user_timeli_owner_i_5833b9_idx'),
+        ),
+    ]
@@ -6,11 +6,13 @@ from django.contrib.auth.models import (
     AbstractUser,
     BaseUserManager,
 )
-from django.db import models
+from django.db import DEFAULT_DB_ALIAS, models
+from django.db.models.functions import Coalesce
 from django.utils.text import slugify
 from django.utils.translation import gettext as _
 
 from api_service import settings
+from user.storage import media_storage
 
 
 class UserManager(BaseUserManager):
@@ -55,6 +57,26 @@ class UserManager(BaseUserManager):
 
         return self._create_user(email, password, **extra_fields)
 
+    def with_follow_counts(self) -> models.QuerySet:
+        """Annotate `following_count` and `followers_count` subqueries."""
+        def count(lookup: str) -> Coalesce:
+            follows = Follow.objects.filter(
+                **{lookup: models.OuterRef("pk")}
+            ).values(lookup)
+            return Coalesce(
+                models.Subquery(
+                    follows.annotate(
+                        total=models.Count("id")
+                    ).values("total")
+                ),
+                0
+            )
+
+        return self.get_queryset().annotate(
+            following_count=count("follower"),
+            followers_count=count("followed"),
+        )
+
 
 class User(AbstractUser):
     username = None
@@ -66,6 +88,35 @@ class User(AbstractUser):
     objects = UserManager()
 
 
+class TokenUser(User):
+    """
+    The user of a JWT request, built from the token's user id alone.
+
+    Every other field is deferred and filled, all at once, from the row
+    authentication already looked up, so views that only use `id` never
+    load the user and those that need more do not query again.
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_values(cls, values: dict) -> "TokenUser":
+        user = cls.from_db(DEFAULT_DB_ALIAS, ["id"], [values["id"]])
+        user._row = values
+        return user
+
+    def refresh_from_db(self, using=None, fields=None) -> None:
+        row = self.__dict__.pop("_row", None)
+        # Deferred fields are loaded with `fields` set; a plain refresh
+        # still goes to the database.
+        if row is not None and fields is not None and using is None:
+            for attname in self.get_deferred_fields():
+                setattr(self, attname, row[attname])
+            return
+        super().refresh_from_db(using, fields)
+
+
 def profile_image_file_path(instance, filename: str) -> str:
     _, extension = os.path.splitext(filename)
 
@@ -88,9 +139,43 @@ class Profile(models.Model):
     bio = models.TextField(blank=True, null=True)
     avatar = models.ImageField(
         upload_to=profile_image_file_path,
+        storage=media_storage,
         null=True,
         blank=True
     )
+    avatar_variants = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """Never write back avatar variants, see `Posts.save`."""
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "avatar_variants"
+            ]
+        super().save(*args, **kwargs)
+
+
+class MediaBlob(models.Model):
+    """A content-addressed file and the number of rows referencing it."""
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["updated_at"],
+                condition=models.Q(ref_count=0),
+                name="user_mediablob_orphan_idx",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return self.name
 
 
 class Follow(models.Model):
@@ -108,29 +193,108 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ("follower", "followed")
+        indexes = [
+            models.Index(fields=["follower", "-id"]),
+            models.Index(fields=["followed", "-id"]),
+        ]
 
     def __str__(self) -> str:
         return f"{self.follower} follows {self.followed}"
 
 
+class Hashtag(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self) -> str:
+        return f"#{self.name}"
+
+
 class Posts(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     content = models.TextField()
     image = models.ImageField(
         upload_to=posts_image_file_path,
+        storage=media_storage,
         null=True,
         blank=True
     )
+    image_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     hashtags = models.CharField(max_length=255, null=True, blank=True)
+    tags = models.ManyToManyField(
+        Hashtag,
+        through="PostHashtag",
+        related_name="posts",
+        blank=True
+    )
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"]),
+            models.Index(fields=["user", "-created_at", "-id"]),
+        ]
 
     def __str__(self) -> str:
         return self.content[:50]
 
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Never write back counters, they are only changed with F(), nor
+        image variants, which are recorded by the image pipeline.
+        """
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in (
+                    "like_count", "comment_count", "image_variants"
+                )
+            ]
+        super().save(*args, **kwargs)
+
+
+class PostHashtag(models.Model):
+    posts = models.ForeignKey(
+        Posts,
+        related_name="post_hashtags",
+        on_delete=models.CASCADE
+    )
+    hashtag = models.ForeignKey(
+        Hashtag,
+        related_name="post_hashtags",
+        on_delete=models.CASCADE
+    )
+
+    class Meta:
+        unique_together = ("hashtag", "posts")
+
+    def __str__(self) -> str:
+        return f"{self.hashtag} on {self.posts_id}"
+
+
+class PostCounterShard(models.Model):
+    """Slice of a post's engagement counters, used in sharded mode."""
+
+    posts = models.ForeignKey(
+        Posts,
+        related_name="counter_shards",
+        on_delete=models.CASCADE
+    )
+    shard = models.PositiveSmallIntegerField()
+    like_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("posts", "shard")
+
+    def __str__(self) -> str:
+        return f"Counter shard {self.shard} of {self.posts_id}"
+
 
 class Like(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -153,6 +317,50 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["-created_at", "-id"])]
 
     def __str__(self) -> str:
         return self.content[:50]
+
+
+class TimelineEntry(models.Model):
+    """Materialized home timeline row: `posts` shown in `owner`'s feed."""
+
+    owner = models.ForeignKey(
+        User,
+        related_name="timeline",
+        on_delete=models.CASCADE
+    )
+    posts = models.ForeignKey(
+        Posts,
+        related_name="timeline_entries",
+        on_delete=models.CASCADE
+    )
+    author = models.ForeignKey(
+        User,
+        related_name="+",
+        on_delete=models.CASCADE
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ("owner", "posts")
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["owner", "-created_at", "-posts"]),
+            models.Index(fields=["owner", "author"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.posts_id} in timeline of {self.owner_id}"
+
+
+class RevokedToken(models.Model):
+    """A revoked JWT, kept until the token would have expired anyway."""
+
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return self.jti
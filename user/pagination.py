@@ -0,0 +1,280 @@
+import binascii
+import json
+from base64 import b64decode, b64encode
+from datetime import date, datetime
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class AnnotationField:
+    """Cursor values of annotated columns are stored as plain JSON."""
+
+    def __init__(self, name: str) -> None:
+        self.attname = name
+
+    @staticmethod
+    def to_python(value: Any) -> Any:
+        if not isinstance(value, (int, float, str)):
+            raise ValueError(value)
+        return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a fixed, unique ordering.
+
+    The cursor is an opaque token holding the ordering values of the last
+    row of the previous page, so every page is a single indexed range scan
+    with no OFFSET and no COUNT(*).
+    """
+
+    ordering = ("-id",)
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_ordering(self, view) -> tuple:
+        """Views may override the ordering via `get_keyset_ordering()`."""
+        get_keyset_ordering = getattr(view, "get_keyset_ordering", None)
+        ordering = get_keyset_ordering() if get_keyset_ordering else None
+        return ordering or self.ordering
+
+    def set_ordering(self, ordering: tuple) -> None:
+        self.fields = [field.lstrip("-") for field in ordering]
+        self.descending = ordering[0].startswith("-")
+        if any(field.startswith("-") != self.descending for field in ordering):
+            raise ValueError("Keyset ordering must use a single direction.")
+
+    @property
+    def max_page_size(self) -> int:
+        return getattr(settings, "PAGINATION_MAX_PAGE_SIZE", 100)
+
+    def get_page_size(self, request: Request) -> int:
+        page_size = api_settings.PAGE_SIZE or 20
+        requested = request.query_params.get(self.page_size_query_param)
+        if requested:
+            try:
+                page_size = int(requested)
+            except ValueError:
+                pass
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate_queryset(
+            self, queryset: QuerySet, request: Request, view=None
+    ) -> list:
+        queryset = self.seek(queryset, request, view)
+        return self.finish(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(
+            self, queryset: QuerySet, request: Request, view=None
+    ) -> list:
+        """`paginate_queryset()` for async views, with the async ORM."""
+        queryset = self.seek(queryset, request, view)
+        return self.finish(
+            [row async for row in queryset[:self.page_size + 1]]
+        )
+
+    def paginate_merged(
+            self, querysets: list[QuerySet], request: Request, view=None
+    ) -> list:
+        """
+        `paginate_queryset()` over the union of `querysets`, which share
+        the ordering columns. Each one is seeked and cut to a page on its
+        own, so each stays an index range scan, and the pages are merged.
+        """
+        return self.merge([
+            list(self.seek(queryset, request, view)[:self.page_size + 1])
+            for queryset in querysets
+        ])
+
+    async def apaginate_merged(
+            self, querysets: list[QuerySet], request: Request, view=None
+    ) -> list:
+        """`paginate_merged()` for async views, with the async ORM."""
+        pages = []
+        for queryset in querysets:
+            queryset = self.seek(queryset, request, view)
+            pages.append(
+                [row async for row in queryset[:self.page_size + 1]]
+            )
+        return self.merge(pages)
+
+    def merge(self, pages: list[list]) -> list:
+        """`finish()` the union of seeked pages; equal positions once."""
+        rows = {}
+        for page in pages:
+            for row in page:
+                position = tuple(
+                    row[field] if isinstance(row, dict)
+                    else getattr(row, field)
+                    for field in self.fields
+                )
+                rows.setdefault(position, row)
+        ordered = sorted(rows, reverse=self.descending != self.reverse)
+        return self.finish(
+            [rows[position] for position in ordered[:self.page_size + 1]]
+        )
+
+    def seek(
+            self, queryset: QuerySet, request: Request, view=None
+    ) -> QuerySet:
+        """The queryset ordered and filtered to start after the cursor."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.set_ordering(self.get_ordering(view))
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor["r"])
+        # Walking backwards flips both the ordering and the comparison.
+        descending = self.descending != self.reverse
+
+        order = [f"-{f}" if descending else f for f in self.fields]
+        queryset = queryset.order_by(*order)
+        if self.cursor:
+            queryset = queryset.filter(
+                self.seek_filter(self.cursor["p"], descending)
+            )
+        return queryset
+
+    def finish(self, rows: list) -> list:
+        """The page of `seek()`'s first `page_size + 1` rows."""
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = (
+            has_more if self.reverse else self.cursor is not None
+        )
+        return rows
+
+    def seek_filter(self, position: list, descending: bool) -> Q:
+        """Row-value comparison `(a, b, ...) < (x, y, ...)` spelled as Q."""
+        lookup = "lt" if descending else "gt"
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.fields, position):
+            condition |= Q(**equal, **{f"{field}__{lookup}": value})
+            equal[field] = value
+        return condition
+
+    def get_model_field(self, name: str):
+        """Model field for `name`, or a stand-in for annotations."""
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return AnnotationField(name)
+
+    def get_position(self, instance: Any) -> list:
+        """Ordering values of a model instance or a `.values()` row."""
+        position = []
+        for field in self.fields:
+            attname = self.get_model_field(field).attname
+            if isinstance(instance, dict):
+                value = instance[attname]
+            else:
+                value = getattr(instance, attname)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            position.append(value)
+        return position
+
+    def encode_cursor(self, position: list, reverse: bool) -> str:
+        payload = json.dumps({"p": position, "r": int(reverse)})
+        token = b64encode(payload.encode("ascii"), altchars=b"-_")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, token.decode("ascii")
+        )
+
+    def decode_cursor(self, request: Request) -> Optional[dict]:
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+
+        try:
+            payload = json.loads(b64decode(token.encode("ascii"), b"-_"))
+            values = payload["p"]
+            if len(values) != len(self.fields):
+                raise ValueError(token)
+            position = [
+                self.get_model_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (
+                TypeError, ValueError, KeyError, binascii.Error,
+                ValidationError,
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {"p": position, "r": bool(payload.get("r"))}
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data: list) -> dict:
+        return {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {
+                    "type": "string", "nullable": True, "format": "uri"
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view) -> list:
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class CreatedAtKeysetPagination(KeysetPagination):
+    """Newest first, for models ordered by `created_at`."""
+
+    ordering = ("-created_at", "-id")
@@ -0,0 +1,166 @@
+"""
+Per-request performance measurements, collected by `PerformanceMiddleware`.
+
+While a request is profiled, `timed(phase)` blocks add their duration to
+the request's profile and every SQL statement is timed. Outside a
+profiled request `timed()` returns a shared no-op context manager, so
+instrumented code costs a context variable lookup.
+
+SQL is observed through `observe_queries()`. Wrappers from
+`connection.execute_wrapper()` belong to one connection object, and under
+ASGI the queries of an async view run in `sync_to_async` threads on other
+objects than the middleware's. So every connection gets one permanent
+wrapper when it connects, calling the observers in a context variable,
+which does follow the request into those threads.
+"""
+import heapq
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import partial
+from itertools import count
+from typing import Any, Callable, ContextManager, Iterator, Optional
+
+_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "request_profile", default=None
+)
+_no_op = nullcontext()
+_query_observers: ContextVar[tuple] = ContextVar(
+    "query_observers", default=()
+)
+
+
+class SlowQuery:
+    __slots__ = ("duration", "sql", "params", "many", "alias")
+
+    def __init__(
+            self, duration: float, sql: str, params: Any, many: bool,
+            alias: str
+    ) -> None:
+        self.duration = duration
+        self.sql = sql
+        self.params = params
+        self.many = many
+        self.alias = alias
+
+
+class RequestProfile:
+    """Phase durations, query statistics and the slowest queries."""
+
+    def __init__(self, slow_queries: int = 3) -> None:
+        self.durations: dict[str, float] = defaultdict(float)
+        self.query_count = 0
+        self.query_time = 0.0
+        self.peak_memory: Optional[int] = None
+        self.slow_queries = slow_queries
+        self._slowest: list[tuple[float, int, SlowQuery]] = []
+        self._order = count()
+        self._open: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        # Nested blocks of the same phase are counted once.
+        if name in self._open:
+            yield
+            return
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def start(self, name: str) -> None:
+        self._open.setdefault(name, time.perf_counter())
+
+    def stop(self, name: str) -> None:
+        started = self._open.pop(name, None)
+        if started is not None:
+            self.durations[name] += time.perf_counter() - started
+
+    def __call__(self, execute, sql, params, many, context):
+        """`execute_wrapper()` hook timing every statement."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.query_count += 1
+            self.query_time += duration
+            if self.slow_queries:
+                entry = (
+                    duration,
+                    next(self._order),
+                    SlowQuery(
+                        duration,
+                        sql,
+                        params,
+                        many,
+                        context["connection"].alias,
+                    ),
+                )
+                if len(self._slowest) < self.slow_queries:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    heapq.heappushpop(self._slowest, entry)
+
+    def slowest_queries(self) -> list[SlowQuery]:
+        return [entry[2] for entry in sorted(self._slowest, reverse=True)]
+
+    def server_timing(self) -> str:
+        """The `Server-Timing` header value, durations in milliseconds."""
+        metrics = [
+            f"{name};dur={duration * 1000:.2f}"
+            for name, duration in self.durations.items()
+        ]
+        metrics.append(
+            f'db;dur={self.query_time * 1000:.2f};'
+            f'desc="{self.query_count} queries"'
+        )
+        if self.peak_memory is not None:
+            metrics.append(f'mem;desc="{self.peak_memory // 1024} KiB peak"')
+        return ", ".join(metrics)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _profile.get()
+
+
+def activate(profile: RequestProfile):
+    """Make `profile` current, returning a token for `deactivate()`."""
+    return _profile.set(profile)
+
+
+def deactivate(token) -> None:
+    _profile.reset(token)
+
+
+def timed(name: str) -> ContextManager:
+    """Add the block's duration to phase `name` of the current request."""
+    profile = _profile.get()
+    return _no_op if profile is None else profile.phase(name)
+
+
+@contextmanager
+def observe_queries(observer: Callable) -> Iterator[None]:
+    """
+    Call `observer`, an `execute_wrapper()` hook, for the SQL run by the
+    block, including in threads the block's context is copied to.
+    """
+    token = _query_observers.set(_query_observers.get() + (observer,))
+    try:
+        yield
+    finally:
+        _query_observers.reset(token)
+
+
+def _dispatch_query(execute, sql, params, many, context):
+    observers = _query_observers.get()
+    for observer in reversed(observers):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_observers(connection) -> None:
+    if _dispatch_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_dispatch_query)
@@ -0,0 +1,135 @@
+"""
+Cache of serialized posts, comments and profiles.
+
+Representations are stored per object under `(model, pk, updated_at)`, so
+any `save()` makes the old entry unreachable and nothing has to be
+invalidated. Fields that change without touching `updated_at` (counters
+updated with F(), image variants recorded by the image pipeline) are
+listed in the serializer's `volatile_fields` and rendered on every read.
+Entries live in a per-process LRU and, with RENDER_CACHE_SHARED_ALIAS
+set, in that Django cache too.
+"""
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Model
+
+
+class RenderCache:
+    def __init__(
+            self,
+            max_entries: int = 10_000,
+            shared_alias: Optional[str] = None,
+            shared_timeout: Optional[int] = 3600,
+    ) -> None:
+        self.max_entries = max_entries
+        self.shared_alias = shared_alias
+        self.shared_timeout = shared_timeout
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_many(self, keys: list[str]) -> dict[str, dict]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                data = self._entries.get(key)
+                if data is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = data
+
+        missing = [key for key in keys if key not in found]
+        if missing and self.shared_alias:
+            shared = caches[self.shared_alias].get_many(missing)
+            self._store(shared)
+            found.update(shared)
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, entries: dict[str, dict]) -> None:
+        if not entries:
+            return
+        self._store(entries)
+        if self.shared_alias:
+            caches[self.shared_alias].set_many(
+                entries, timeout=self.shared_timeout
+            )
+
+    def _store(self, entries: dict[str, dict]) -> None:
+        with self._lock:
+            for key, data in entries.items():
+                self._entries[key] = data
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+render_cache = RenderCache(
+    max_entries=getattr(settings, "RENDER_CACHE_MAX_ENTRIES", 10_000),
+    shared_alias=getattr(settings, "RENDER_CACHE_SHARED_ALIAS", None),
+    shared_timeout=getattr(settings, "RENDER_CACHE_TIMEOUT", 3600),
+)
+
+
+def render_key(
+        model: type[Model],
+        pk: Any,
+        updated_at: Optional[datetime],
+        variant: str = "",
+) -> Optional[str]:
+    """
+    Cache key of an object's representation, None for unsaved objects.
+    `variant` separates different renderings of the same object, such as
+    those of other serializers or with absolute URLs for another host.
+    """
+    if pk is None or updated_at is None:
+        return None
+    return "render:{}:{}:{}:{:x}".format(
+        model._meta.label_lower,
+        pk,
+        updated_at.isoformat(),
+        zlib.crc32(variant.encode()),
+    )
+
+
+def render_many(
+        items: list,
+        keys: list[Optional[str]],
+        render: Callable[[Any, list], dict],
+        stable: list,
+        volatile: list,
+        names: list[str],
+) -> list[dict]:
+    """
+    Representations of `items`: the `stable` fields come from the cache
+    when possible, `volatile` ones are always rendered, and the result
+    follows the order of `names`.
+    """
+    cached = render_cache.get_many([key for key in keys if key])
+    rendered = {}
+    representations = []
+    for item, key in zip(items, keys):
+        data = cached.get(key)
+        if data is None:
+            data = render(item, stable)
+            if key:
+                rendered[key] = data
+        data = {**data, **render(item, volatile)}
+        representations.append(
+            {name: data[name] for name in names if name in data}
+        )
+    render_cache.set_many(rendered)
+    return representations
@@ -0,0 +1,244 @@
+"""
+Read replicas with read-your-writes.
+
+`ReplicaRouter` sends every write to `default`. The reads of a request
+that `ReplicaMiddleware` lets read from replicas go to one alias of
+`DATABASE_REPLICAS` (`{alias: weight}`), picked by weight on its first
+read and kept for the rest of the request, so one request reads one
+snapshot. Other reads (unsafe methods, management commands, transactions
+on `default`, sessions) go to `default`.
+
+Replicas lag behind the primary, so a user who just posted, liked,
+commented or followed might not see it there. These writes pin their
+author to the primary for `REPLICA_STICKY_SECONDS` after the commit, in
+the `REPLICA_PIN_CACHE_ALIAS` cache, and send the rest of the current
+request to the primary. A per-process cache would only pin within one
+worker, so `check_pin_cache` fails the system checks when replicas are
+configured with one.
+
+A replica that fails to connect is skipped for `REPLICA_RETRY_AFTER`
+seconds; the read goes to another replica, or to the primary.
+"""
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    DatabaseError,
+    connections,
+    transaction,
+)
+
+logger = logging.getLogger("user.replicas")
+
+PIN_KEY = "replica-pin:{}"
+# Sessions are read right after being written (login redirects).
+PRIMARY_APPS = frozenset({"sessions"})
+
+
+def replica_weights() -> dict[str, float]:
+    return getattr(settings, "DATABASE_REPLICAS", {})
+
+
+class ReplicaSet:
+    """
+    Replica aliases picked at random by weight, skipping those that
+    failed to connect in the last `retry_after` seconds.
+    """
+
+    def __init__(
+            self,
+            weights: dict[str, float],
+            retry_after: float = 30.0,
+    ) -> None:
+        self.weights = {
+            alias: weight for alias, weight in weights.items() if weight > 0
+        }
+        self.retry_after = retry_after
+        self._down_until: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.weights)
+
+    def available(self) -> list[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                alias for alias in self.weights
+                if self._down_until.get(alias, 0.0) <= now
+            ]
+
+    def choose(self, exclude: frozenset = frozenset()) -> Optional[str]:
+        candidates = [
+            alias for alias in self.available() if alias not in exclude
+        ]
+        if not candidates:
+            return None
+        return random.choices(
+            candidates, weights=[self.weights[alias] for alias in candidates]
+        )[0]
+
+    def mark_down(self, alias: str) -> None:
+        from user.metrics import DB_REPLICA_UNAVAILABLE
+
+        with self._lock:
+            self._down_until[alias] = time.monotonic() + self.retry_after
+        DB_REPLICA_UNAVAILABLE.labels(alias).inc()
+
+    def connect(self) -> Optional[str]:
+        """A replica with an open connection, None if none is available."""
+        failed = frozenset()
+        while (alias := self.choose(failed)) is not None:
+            try:
+                connections[alias].ensure_connection()
+            except DatabaseError as error:
+                logger.warning("Replica %s is unavailable: %s", alias, error)
+                self.mark_down(alias)
+                failed |= {alias}
+            else:
+                return alias
+        return None
+
+
+class _Reads:
+    """Where the reads of the current request go."""
+
+    __slots__ = ("replicas", "alias", "resolved")
+
+    def __init__(self, replicas: ReplicaSet) -> None:
+        self.replicas = replicas
+        self.alias: Optional[str] = None
+        self.resolved = False
+
+    def route(self) -> str:
+        if not self.resolved:
+            self.alias = self.replicas.connect()
+            self.resolved = True
+        return self.alias or DEFAULT_DB_ALIAS
+
+
+_reads: ContextVar[Optional[_Reads]] = ContextVar(
+    "replica_reads", default=None
+)
+
+
+@contextmanager
+def replica_reads(replicas: ReplicaSet) -> Iterator[_Reads]:
+    """Let the reads of the block go to `replicas`."""
+    from user.metrics import DB_READS
+
+    reads = _Reads(replicas)
+    token = _reads.set(reads)
+    try:
+        yield reads
+    finally:
+        _reads.reset(token)
+        if reads.resolved:
+            DB_READS.labels(reads.alias or DEFAULT_DB_ALIAS).inc()
+
+
+def read_from_primary() -> None:
+    """Send the remaining reads of the current request to the primary."""
+    reads = _reads.get()
+    if reads is not None:
+        reads.alias = None
+        reads.resolved = True
+
+
+def _pins():
+    return caches[getattr(settings, "REPLICA_PIN_CACHE_ALIAS", "default")]
+
+
+def pin_user(user_id: Optional[int]) -> None:
+    """
+    Send the reads of `user_id` to the primary for `REPLICA_STICKY_SECONDS`
+    after the current transaction commits, and those of the current
+    request from now on.
+    """
+    if not replica_weights():
+        return
+    read_from_primary()
+    window = getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+    if user_id is not None and window > 0:
+        transaction.on_commit(
+            lambda: _pins().set(PIN_KEY.format(user_id), 1, window)
+        )
+
+
+def is_pinned(user_id: Optional[int]) -> bool:
+    return user_id is not None and bool(
+        _pins().get(PIN_KEY.format(user_id))
+    )
+
+
+async def ais_pinned(user_id: Optional[int]) -> bool:
+    return user_id is not None and bool(
+        await _pins().aget(PIN_KEY.format(user_id))
+    )
+
+
+# Backends whose entries no other worker sees.
+PROCESS_LOCAL_CACHES = frozenset({
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+})
+
+
+def check_pin_cache(app_configs, **kwargs) -> list[checks.CheckMessage]:
+    """With replicas, pins must be kept in a cache shared by the workers."""
+    if not replica_weights():
+        return []
+    alias = getattr(settings, "REPLICA_PIN_CACHE_ALIAS", "default")
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend is None:
+        return [checks.Error(
+            f"REPLICA_PIN_CACHE_ALIAS {alias!r} is not in CACHES.",
+            id="user.E001",
+        )]
+    if backend in PROCESS_LOCAL_CACHES:
+        return [checks.Error(
+            f"REPLICA_PIN_CACHE_ALIAS {alias!r} uses {backend}, which "
+            "other workers do not see: a user's next read may go to a "
+            "lagging replica.",
+            hint="Point REPLICA_PIN_CACHE_ALIAS at a cache shared by every "
+                 "worker, e.g. Redis or Memcached.",
+            id="user.E002",
+        )]
+    return []
+
+
+class ReplicaRouter:
+    """Routes reads as described above and every write to `default`."""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        reads = _reads.get()
+        if reads is None:
+            return None
+        if (
+            model._meta.app_label in PRIMARY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return reads.route()
+
+    def db_for_write(self, model, **hints) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        databases = {DEFAULT_DB_ALIAS, *replica_weights()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, **hints):
+        # Replicas get the schema through replication.
+        return False if db in replica_weights() else None
@@ -0,0 +1,138 @@
+"""
+Revoked JWTs, by `jti`.
+
+Revocations are `RevokedToken` rows kept until the token would have
+expired anyway. Every process holds the unexpired ones in a hash set and
+fetches the rows revoked since its last sync at most once every
+`TOKEN_REVOCATION_SYNC_INTERVAL` seconds, so checking a token is a set
+lookup, and a query per interval rather than per request. Rows are
+fetched by `revoked_at` with a margin rather than by id, since ids of
+concurrent transactions are not committed in order.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from user.models import RevokedToken
+
+SYNC_MARGIN = timedelta(minutes=1)
+PRUNE_INTERVAL = 60.0
+
+
+class RevocationList:
+    def __init__(self, sync_interval: float = 1.0) -> None:
+        self.sync_interval = sync_interval
+        # jti -> expiry timestamp.
+        self._expiry: dict[str, float] = {}
+        self._synced_at: Optional[datetime] = None
+        self._next_sync = 0.0
+        self._next_prune = 0.0
+        # Bumped by `clear()`, so a sync running meanwhile is discarded.
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Forget everything; the next check reloads all revocations."""
+        with self._lock:
+            self._expiry.clear()
+            self._synced_at = None
+            self._next_sync = 0.0
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def is_revoked(self, jti: str) -> bool:
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        return jti in self._expiry
+
+    async def ais_revoked(self, jti: str) -> bool:
+        """`is_revoked()` that only leaves the event loop to sync."""
+        if time.monotonic() >= self._next_sync:
+            await sync_to_async(self.sync)()
+        return jti in self._expiry
+
+    def revoke(self, jti: str, expires_at: datetime) -> None:
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=jti, expires_at=expires_at)],
+            ignore_conflicts=True,
+        )
+        with self._lock:
+            self._expiry[jti] = expires_at.timestamp()
+
+    def sync(self, force: bool = False) -> None:
+        """Fetch revocations made by other processes since the last sync."""
+        with self._lock:
+            monotonic = time.monotonic()
+            if not force and monotonic < self._next_sync:
+                return
+            # Other threads keep using the current set meanwhile.
+            self._next_sync = monotonic + self.sync_interval
+            since = self._synced_at
+            generation = self._generation
+
+        now = timezone.now()
+        rows = RevokedToken.objects.using(DEFAULT_DB_ALIAS).filter(
+            expires_at__gt=now
+        )
+        if since is not None:
+            rows = rows.filter(revoked_at__gte=since - SYNC_MARGIN)
+        fetched = {
+            jti: expires_at.timestamp()
+            for jti, expires_at in rows.values_list("jti", "expires_at")
+        }
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._expiry.update(fetched)
+            if self._synced_at is None or self._synced_at < now:
+                self._synced_at = now
+            if monotonic >= self._next_prune:
+                self._next_prune = monotonic + PRUNE_INTERVAL
+                cutoff = now.timestamp()
+                self._expiry = {
+                    jti: expiry
+                    for jti, expiry in self._expiry.items()
+                    if expiry > cutoff
+                }
+
+
+revocations = RevocationList(
+    sync_interval=getattr(settings, "TOKEN_REVOCATION_SYNC_INTERVAL", 1.0)
+)
+
+
+def revoke_token(token: Token) -> None:
+    revocations.revoke(
+        token[api_settings.JTI_CLAIM], datetime_from_epoch(token["exp"])
+    )
+
+
+def is_revoked(token: Token) -> bool:
+    return revocations.is_revoked(token[api_settings.JTI_CLAIM])
+
+
+async def ais_revoked(token: Token) -> bool:
+    return await revocations.ais_revoked(token[api_settings.JTI_CLAIM])
+
+
+def purge_expired(batch_size: int = 1000) -> int:
+    """Delete revocations of tokens that have expired, return how many."""
+    expired = RevokedToken.objects.filter(expires_at__lte=timezone.now())
+    purged = 0
+    while True:
+        ids = list(expired.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return purged
+        purged += RevokedToken.objects.filter(id__in=ids).delete()[0]
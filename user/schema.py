@@ -0,0 +1,42 @@
+"""
+OpenAPI documentation of the plain Django views.
+
+drf_spectacular only collects DRF views from the URL conf, so it leaves
+out `register/` and `token/`, which are async function views (see
+`user.async_views`). `document_function_views`, a preprocessing hook,
+adds them back, described by the DRF views they answer like.
+
+It also registers `JWTAuthenticationScheme`, so the DRF views, which
+authenticate with `user.authentication.JWTAuthentication`, keep
+simplejwt's `jwtAuth` bearer scheme. The module is imported by
+`UserConfig.ready()` for the extension to be known before any schema is
+generated.
+"""
+from django.urls import get_script_prefix, reverse
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from user.views import CreateUserView
+
+
+class JWTAuthenticationScheme(SimpleJWTScheme):
+    target_class = "user.authentication.JWTAuthentication"
+
+
+class TokenObtainView(TokenObtainPairView):
+    serializer_class = TokenObtainPairSerializer
+
+
+FUNCTION_VIEWS = {
+    "user:create": CreateUserView,
+    "user:token_obtain_pair": TokenObtainView,
+}
+
+
+def document_function_views(endpoints: list[tuple]) -> list[tuple]:
+    for url_name, view in FUNCTION_VIEWS.items():
+        # Schema paths start at the root of the URL conf.
+        path = "/" + reverse(url_name)[len(get_script_prefix()):]
+        endpoints.append((path, path[1:], "POST", view.as_view()))
+    return endpoints
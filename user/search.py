@@ -0,0 +1,129 @@
+"""
+Full-text search over post content.
+
+PostgreSQL keeps a `search_vector` tsvector column on `user_posts`,
+maintained by a trigger and covered by a GIN index (see migration 0005).
+SQLite mirrors the content into an FTS5 table kept in sync by triggers.
+Other backends fall back to a plain `icontains` scan.
+"""
+from django.db import connections
+from django.db.models import BooleanField, FloatField, QuerySet, Value
+from django.db.models.expressions import RawSQL
+
+from user.models import Posts
+
+SEARCH_CONFIG = "pg_catalog.english"
+FTS_TABLE = "user_posts_fts"
+
+SQLITE_FTS_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, content='user_posts', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON user_posts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content)
+        VALUES (new.id, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON user_posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF content ON user_posts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content)
+        VALUES (new.id, new.content);
+    END
+    """,
+]
+
+
+def ensure_sqlite_search_index(sender, using: str, **kwargs) -> None:
+    """
+    Create the FTS5 table and triggers after migrations on SQLite.
+
+    SQLite migrations rebuild `user_posts` when altering it, which drops
+    its triggers, so they are (re)created here instead of in a migration.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master "
+            "WHERE type = 'trigger' AND name LIKE %s",
+            [f"{FTS_TABLE}_%"],
+        )
+        triggers_existed = cursor.fetchone()[0] == 3
+        for statement in SQLITE_FTS_SQL:
+            cursor.execute(statement)
+        if not triggers_existed:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+            )
+
+
+def _fts5_query(text: str) -> str:
+    """Quote every term so user input cannot use FTS5 query syntax."""
+    terms = text.split()
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+
+
+def search_posts(queryset: QuerySet[Posts], text: str) -> QuerySet[Posts]:
+    """
+    Restrict `queryset` to posts matching `text`, annotated with `rank`
+    (higher is more relevant).
+    """
+    vendor = connections[queryset.db].vendor
+
+    if vendor == "postgresql":
+        # ts_rank() is a float4: widened to the double the cursor holds,
+        # keyset comparisons with it repeat or skip the boundary row.
+        return queryset.annotate(
+            rank=RawSQL(
+                "ts_rank(user_posts.search_vector, "
+                "websearch_to_tsquery(%s, %s))::double precision",
+                [SEARCH_CONFIG, text],
+                output_field=FloatField(),
+            )
+        ).filter(
+            RawSQL(
+                "user_posts.search_vector @@ websearch_to_tsquery(%s, %s)",
+                [SEARCH_CONFIG, text],
+                output_field=BooleanField(),
+            )
+        )
+
+    if vendor == "sqlite":
+        match = _fts5_query(text)
+        if not match:
+            return queryset.none()
+        # bm25() is lower-is-better, negate it so rank sorts like ts_rank.
+        return queryset.annotate(
+            rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s "
+                f"AND {FTS_TABLE}.rowid = user_posts.id",
+                [match],
+                output_field=FloatField(),
+            )
+        ).filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                [match],
+            )
+        )
+
+    return queryset.filter(content__icontains=text).annotate(
+        rank=Value(0.0, output_field=FloatField())
+    )
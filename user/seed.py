@@ -0,0 +1,474 @@
+"""
+Bulk loading of users, posts, follows and likes for capacity tests.
+
+Rows are buffered per model and written `batch_size` at a time with
+`bulk_create()`, or with `COPY` through a staging table on PostgreSQL.
+Neither runs model signals, so after loading, the hashtag index,
+counters, timelines and follow cache have to be rebuilt (`seed_data`
+does this unless told not to).
+
+Passwords are hashed once per distinct value: users loaded with the same
+password share one hash, salt included. That is fine for test data and
+is what makes loading many users fast, but never load real accounts
+this way.
+"""
+import csv
+import io
+import json
+import random
+import string
+from datetime import timedelta
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection, models, transaction
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from user.follow_cache import follow_graph
+from user.models import Follow, Like, Posts, User
+
+RECORD_TYPES = ("user", "post", "follow", "like")
+SEED_HASHTAGS = 50
+
+Row = tuple
+
+
+def copy_supported() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def _copy_value(value: Any) -> str:
+    """A CSV field for `COPY`: quoted, so only an empty field is NULL."""
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+class BulkWriter:
+    """
+    Buffer rows of `columns` (attnames) for one model and insert them in
+    batches, ignoring rows that violate a unique constraint.
+
+    Other concrete fields get their defaults, computed once; `auto_now`
+    and `auto_now_add` fields missing from a row are set to the time the
+    writer was created, while values given for them are kept.
+    """
+
+    def __init__(
+            self,
+            model: type[models.Model],
+            columns: Iterable[str],
+            batch_size: int = 5000,
+            copy: Optional[bool] = None,
+            prepare: Optional[Callable[[list[Row]], list[Row]]] = None,
+    ) -> None:
+        self.model = model
+        self.batch_size = batch_size
+        self.copy = copy_supported() if copy is None else copy
+        self.prepare = prepare
+        self.written = 0
+        self.skipped = 0
+        self.rows: list[Row] = []
+
+        now = timezone.now()
+        self.columns = list(columns)
+        self.defaults = []
+        for field in model._meta.concrete_fields:
+            if field.primary_key or field.attname in self.columns:
+                continue
+            self.columns.append(field.attname)
+            if getattr(field, "auto_now", False) or getattr(
+                    field, "auto_now_add", False
+            ):
+                self.defaults.append(now)
+            elif self.copy and isinstance(field, models.JSONField):
+                self.defaults.append(json.dumps(field.get_default()))
+            else:
+                self.defaults.append(field.get_default())
+        self.defaults = tuple(self.defaults)
+        self.fields = [
+            model._meta.get_field(column) for column in self.columns
+        ]
+
+    def add(self, row: Row) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        rows, self.rows = self.rows, []
+        if self.prepare is not None:
+            prepared = self.prepare(rows)
+            self.skipped += len(rows) - len(prepared)
+            rows = prepared
+        if not rows:
+            return
+
+        rows = [row + self.defaults for row in rows]
+        if self.copy:
+            self._copy(rows)
+        else:
+            self._bulk_create(rows)
+        self.written += len(rows)
+
+    def _bulk_create(self, rows: list[Row]) -> None:
+        model = self.model
+        columns = self.columns
+        objs = [model(**dict(zip(columns, row))) for row in rows]
+        # bulk_create() would overwrite the given timestamps with now; a
+        # raw insert, as loaddata does, writes the instances' values as
+        # they are.
+        batch_size = max(connection.ops.bulk_batch_size(self.fields, objs), 1)
+        with transaction.atomic():
+            for start in range(0, len(objs), batch_size):
+                model._base_manager._insert(
+                    objs[start:start + batch_size],
+                    fields=self.fields,
+                    raw=True,
+                    on_conflict=OnConflict.IGNORE,
+                )
+
+    def _copy(self, rows: list[Row]) -> None:
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        columns = ", ".join(quote(column) for column in self.columns)
+        data = io.StringIO(
+            "".join(
+                ",".join(map(_copy_value, row)) + "\n" for row in rows
+            )
+        )
+        # COPY cannot skip conflicting rows, INSERT ... SELECT can.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMPORARY TABLE seed_staging ON COMMIT DROP AS "
+                f"SELECT {columns} FROM {table} WITH NO DATA"
+            )
+            cursor.copy_expert(
+                f"COPY seed_staging ({columns}) FROM STDIN WITH (FORMAT csv)",
+                data,
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT {columns} FROM seed_staging ON CONFLICT DO NOTHING"
+            )
+
+
+def rebuild_derived_data(stdout: Optional[TextIO] = None) -> None:
+    """Do what the signals skipped by bulk writes would have done."""
+    for command in (
+            "backfill_hashtags", "reconcile_counters", "rebuild_timelines"
+    ):
+        call_command(command, stdout=stdout or io.StringIO())
+    follow_graph.clear()
+
+
+def password_hasher() -> Callable[[Optional[str]], str]:
+    """`make_password`, called once per distinct password."""
+    return lru_cache(maxsize=None)(make_password)
+
+
+class Loader:
+    """
+    Write `user`, `post`, `follow` and `like` records, which refer to
+    users by email and to posts by id. References are resolved per
+    batch, after flushing pending users; records referring to unknown
+    users or posts are skipped.
+    """
+
+    def __init__(
+            self, batch_size: int = 5000, copy: Optional[bool] = None
+    ) -> None:
+        self.hash_password = password_hasher()
+        self.user_ids: dict[str, int] = {}
+        self.writers = {
+            "user": BulkWriter(
+                User, ("email", "password"), batch_size, copy
+            ),
+            "post": BulkWriter(
+                Posts,
+                ("user_id", "content", "hashtags", "created_at", "updated_at"),
+                batch_size,
+                copy,
+                self._resolve_posts,
+            ),
+            "follow": BulkWriter(
+                Follow,
+                ("follower_id", "followed_id"),
+                batch_size,
+                copy,
+                self._resolve_follows,
+            ),
+            "like": BulkWriter(
+                Like,
+                ("user_id", "posts_id"),
+                batch_size,
+                copy,
+                self._resolve_likes,
+            ),
+        }
+
+    def add(self, record_type: str, data: dict) -> None:
+        """Queue one record; raises ValueError if it is malformed."""
+        if record_type not in self.writers:
+            raise ValueError(f"Unknown record type {record_type!r}.")
+        try:
+            row = getattr(self, f"_{record_type}_row")(data)
+        except KeyError as error:
+            raise ValueError(f"{record_type} record without {error}.")
+        self.writers[record_type].add(row)
+
+    def close(self) -> dict[str, tuple[int, int]]:
+        """Flush everything, returning (written, skipped) per type."""
+        for writer in self.writers.values():
+            writer.flush()
+        return {
+            record_type: (writer.written, writer.skipped)
+            for record_type, writer in self.writers.items()
+        }
+
+    def _user_row(self, data: dict) -> Row:
+        email = User.objects.normalize_email(data["email"])
+        return email, self.hash_password(data.get("password") or None)
+
+    def _post_row(self, data: dict) -> Row:
+        created_at = data.get("created_at") or None
+        if created_at is not None:
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(f"Invalid created_at {data['created_at']}")
+            if timezone.is_naive(created_at):
+                created_at = timezone.make_aware(created_at)
+        created_at = created_at or timezone.now()
+        return (
+            User.objects.normalize_email(data["user"]),
+            data["content"],
+            data.get("hashtags") or None,
+            created_at,
+            created_at,
+        )
+
+    def _follow_row(self, data: dict) -> Row:
+        return (
+            User.objects.normalize_email(data["follower"]),
+            User.objects.normalize_email(data["followed"]),
+        )
+
+    def _like_row(self, data: dict) -> Row:
+        return User.objects.normalize_email(data["user"]), int(data["post"])
+
+    def _resolve_emails(self, emails: set[str]) -> dict[str, int]:
+        missing = emails - self.user_ids.keys()
+        if missing:
+            self.writers["user"].flush()
+            self.user_ids.update(
+                User.objects.filter(email__in=missing).values_list(
+                    "email", "id"
+                )
+            )
+        return self.user_ids
+
+    def _resolve_posts(self, rows: list[Row]) -> list[Row]:
+        ids = self._resolve_emails({row[0] for row in rows})
+        return [
+            (ids[row[0]], *row[1:]) for row in rows if row[0] in ids
+        ]
+
+    def _resolve_follows(self, rows: list[Row]) -> list[Row]:
+        ids = self._resolve_emails({email for row in rows for email in row})
+        return [
+            (ids[follower], ids[followed])
+            for follower, followed in rows
+            if follower in ids and followed in ids and follower != followed
+        ]
+
+    def _resolve_likes(self, rows: list[Row]) -> list[Row]:
+        ids = self._resolve_emails({row[0] for row in rows})
+        self.writers["post"].flush()
+        post_ids = set(
+            Posts.objects.filter(
+                id__in={row[1] for row in rows}
+            ).values_list("id", flat=True)
+        )
+        return [
+            (ids[email], post_id)
+            for email, post_id in rows
+            if email in ids and post_id in post_ids
+        ]
+
+
+def read_records(
+        source: TextIO, file_format: str, record_type: Optional[str] = None
+) -> Iterator[tuple[str, dict]]:
+    """
+    Yield (type, data) records from a CSV file with a header row, which
+    holds records of `record_type`, or from NDJSON lines shaped like the
+    export: `{"type": ..., "data": {...}}`.
+    """
+    if file_format == "csv":
+        if record_type is None:
+            raise ValueError("CSV input needs a record type.")
+        for data in csv.DictReader(source):
+            yield record_type, data
+        return
+
+    for number, line in enumerate(source, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            yield record_type or record["type"], record["data"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError(f"Line {number} is not a record.")
+
+
+def load_records(
+        records: Iterable[tuple[str, dict]],
+        batch_size: int = 5000,
+        copy: Optional[bool] = None,
+) -> dict[str, tuple[int, int]]:
+    loader = Loader(batch_size, copy)
+    for record_type, data in records:
+        loader.add(record_type, data)
+    return loader.close()
+
+
+def _power_law(count: int, exponent: float) -> list[float]:
+    """Zipf weights: rank `r` gets `1 / r ** exponent`."""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def _spread(total: float, parts: int, rng: random.Random) -> Iterator[int]:
+    """`parts` random non-negative counts averaging `total / parts`."""
+    mean = total / parts if parts else 0
+    for _ in range(parts):
+        yield int(rng.expovariate(1 / mean)) if mean else 0
+
+
+def _chunks(items: list, size: int) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def seed_graph(
+        users: int,
+        posts_per_user: float = 10,
+        follows_per_user: float = 20,
+        likes: int = 0,
+        exponent: float = 1.0,
+        days: int = 30,
+        password: str = "password",
+        domain: str = "seed.example",
+        batch_size: int = 5000,
+        copy: Optional[bool] = None,
+        seed: Optional[int] = None,
+        log: Callable[[str], None] = lambda message: None,
+) -> dict[str, int]:
+    """
+    Generate a synthetic social graph and return how many rows of each
+    kind were written.
+
+    Users `user<n>@<domain>` are ranked by popularity: the chance of
+    being followed, and of a user's posts being liked, falls off as
+    `1 / rank ** exponent`, which gives the power-law follower counts of
+    real networks. Post, follow and like counts per user are
+    exponentially distributed around the given means; post times are
+    spread over the last `days` days. Users that already exist are
+    reused.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    counts = {}
+
+    emails = [f"user{number}@{domain}" for number in range(users)]
+    writer = BulkWriter(User, ("email", "password"), batch_size, copy)
+    hashed = make_password(password)
+    for email in emails:
+        writer.add((email, hashed))
+    writer.flush()
+    rank = {}
+    for chunk in _chunks(emails, batch_size):
+        rank.update(
+            User.objects.filter(email__in=chunk).values_list("email", "id")
+        )
+    user_ids = [rank[email] for email in emails if email in rank]
+    counts["users"] = len(user_ids)
+    log(f"Users: {len(user_ids)}")
+    if not user_ids:
+        return counts
+
+    popularity = _power_law(len(user_ids), exponent)
+    cum_popularity = list(accumulate(popularity))
+    writer = BulkWriter(
+        Follow, ("follower_id", "followed_id"), batch_size, copy
+    )
+    for follower_id, count in zip(
+            user_ids, _spread(follows_per_user * users, users, rng)
+    ):
+        followed = set(
+            rng.choices(user_ids, cum_weights=cum_popularity, k=count)
+        )
+        followed.discard(follower_id)
+        for followed_id in followed:
+            writer.add((follower_id, followed_id))
+    writer.flush()
+    counts["follows"] = writer.written
+    log(f"Follows: {writer.written}")
+
+    writer = BulkWriter(
+        Posts,
+        ("user_id", "content", "hashtags", "created_at", "updated_at"),
+        batch_size,
+        copy,
+    )
+    seconds = days * 24 * 3600
+    for user_id, count in zip(
+            user_ids, _spread(posts_per_user * users, users, rng)
+    ):
+        for _ in range(count):
+            tag = f"topic{rng.randrange(SEED_HASHTAGS)}"
+            words = " ".join(
+                "".join(rng.choices(string.ascii_lowercase, k=6))
+                for _ in range(8)
+            )
+            created_at = now - timedelta(seconds=rng.uniform(0, seconds))
+            writer.add(
+                (user_id, f"{words} #{tag}", tag, created_at, created_at)
+            )
+    writer.flush()
+    counts["posts"] = writer.written
+    log(f"Posts: {writer.written}")
+    if not likes or not writer.written:
+        return counts
+
+    # A post is as likely to be liked as its author is to be followed.
+    weight = dict(zip(user_ids, popularity))
+    post_ids = []
+    post_weights = []
+    for chunk in _chunks(user_ids, batch_size):
+        for post_id, user_id in Posts.objects.filter(
+                user_id__in=chunk
+        ).values_list("id", "user_id").iterator(chunk_size=batch_size):
+            post_ids.append(post_id)
+            post_weights.append(weight[user_id])
+    cum_post_weights = list(accumulate(post_weights))
+
+    writer = BulkWriter(Like, ("user_id", "posts_id"), batch_size, copy)
+    for user_id, count in zip(user_ids, _spread(likes, users, rng)):
+        liked = set(
+            rng.choices(
+                post_ids,
+                cum_weights=cum_post_weights,
+                k=min(count, len(post_ids)),
+            )
+        )
+        for post_id in liked:
+            writer.add((user_id, post_id))
+    writer.flush()
+    counts["likes"] = writer.written
+    log(f"Likes: {writer.written}")
+    return counts
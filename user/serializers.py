@@ -1,6 +1,17 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
+from django.core.files.storage import default_storage
+from django.db.models import Model
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import UntypedToken
 
+from user.follow_cache import follow_graph
 from user.models import (
     User,
     Profile,
@@ -9,20 +20,39 @@ from user.models import (
     Like,
     Comment
 )
+from user.perf import timed
+from user.render_cache import render_key, render_many
+from user.revocation import is_revoked, revoke_token
 
 
 class UserSerializer(serializers.ModelSerializer):
-    following = serializers.StringRelatedField(many=True, read_only=True)
-    followers = serializers.StringRelatedField(many=True, read_only=True)
+    following_count = serializers.SerializerMethodField()
+    followers_count = serializers.SerializerMethodField()
 
     class Meta:
         model = get_user_model()
         fields = (
-            "id", "email", "password", "is_staff", "following", "followers"
+            "id",
+            "email",
+            "password",
+            "is_staff",
+            "following_count",
+            "followers_count",
         )
         read_only_fields = ("is_staff",)
         extra_kwargs = {"password": {"write_only": True, "min_length": 5}}
 
+    def get_following_count(self, obj: User) -> int:
+        """Uses the `with_follow_counts()` annotation when present."""
+        if hasattr(obj, "following_count"):
+            return obj.following_count
+        return len(follow_graph.following_ids(obj.id))
+
+    def get_followers_count(self, obj: User) -> int:
+        if hasattr(obj, "followers_count"):
+            return obj.followers_count
+        return follow_graph.followers_count(obj.id)
+
     def create(self, validated_data: dict) -> User:
         """Create a new user with encrypted password and return it"""
         return get_user_model().objects.create_user(**validated_data)
@@ -66,10 +96,132 @@ class AuthTokenSerializer(serializers.Serializer):
         return attrs
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Refuses revoked refresh tokens and revokes rotated ones."""
+
+    def validate(self, attrs: dict) -> dict:
+        refresh = self.token_class(attrs["refresh"])
+        if is_revoked(refresh):
+            raise TokenError(_("Token is blacklisted"))
+
+        data = super().validate(attrs)
+        if (
+                api_settings.ROTATE_REFRESH_TOKENS
+                and api_settings.BLACKLIST_AFTER_ROTATION
+        ):
+            revoke_token(refresh)
+        return data
+
+
+class TokenVerifySerializer(jwt_serializers.TokenVerifySerializer):
+    def validate(self, attrs: dict) -> dict:
+        if is_revoked(UntypedToken(attrs["token"])):
+            raise serializers.ValidationError("Token is blacklisted")
+        return super().validate(attrs)
+
+
+def render_variant(serializer_class: type, context: dict) -> str:
+    """Renderings differ per serializer and per host of absolute URLs."""
+    request = context.get("request")
+    host = request.build_absolute_uri("/") if request else ""
+    return f"{serializer_class.__name__}:{host}"
+
+
+class RenderCacheListSerializer(serializers.ListSerializer):
+    """Look a whole page up in the render cache with one `get_many()`."""
+
+    def to_representation(self, data) -> list:
+        iterable = data.all() if hasattr(data, "all") else data
+        return self.child.to_representations(list(iterable))
+
+
+class RenderCacheMixin:
+    """
+    Serve representations from `render_cache`; only `volatile_fields`,
+    which change without bumping `updated_at`, are rendered every time.
+    """
+
+    volatile_fields: tuple[str, ...] = ()
+
+    def to_representation(self, instance: Model) -> dict:
+        return self.to_representations([instance])[0]
+
+    def to_representations(self, instances: list[Model]) -> list[dict]:
+        with timed("serialize"):
+            return self._render_cached(instances)
+
+    def _render_cached(self, instances: list[Model]) -> list[dict]:
+        fields = list(self._readable_fields)
+        if not getattr(settings, "RENDER_CACHE_ENABLED", True):
+            return [self._render(instance, fields) for instance in instances]
+
+        variant = render_variant(type(self), self.context)
+        keys = [
+            render_key(
+                type(instance), instance.pk, instance.updated_at, variant
+            )
+            for instance in instances
+        ]
+        return render_many(
+            instances,
+            keys,
+            self._render,
+            [
+                field for field in fields
+                if field.field_name not in self.volatile_fields
+            ],
+            [
+                field for field in fields
+                if field.field_name in self.volatile_fields
+            ],
+            [field.field_name for field in fields],
+        )
+
+    def _render(self, instance: Model, fields: list) -> dict:
+        """`Serializer.to_representation()` restricted to `fields`."""
+        data = {}
+        for field in fields:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            if isinstance(attribute, PKOnlyObject):
+                check_for_none = attribute.pk
+            else:
+                check_for_none = attribute
+            data[field.field_name] = (
+                None if check_for_none is None
+                else field.to_representation(attribute)
+            )
+        return data
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Render recorded image variant paths as (absolute) media URLs."""
+
+    def to_representation(self, variants: dict) -> dict:
+        request = self.context.get("request")
+        urls = {}
+        for variant, files in variants.items():
+            if variant == "source":
+                continue
+            urls[variant] = {}
+            for extension, name in files.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[variant][extension] = url
+        return urls
+
+
+class ProfileSerializer(RenderCacheMixin, serializers.ModelSerializer):
+    avatar_variants = ImageVariantsField()
+    volatile_fields = ("avatar_variants",)
+
     class Meta:
         model = Profile
-        fields = ["id", "name", "bio", "avatar"]
+        fields = ["id", "name", "bio", "avatar", "avatar_variants"]
+        list_serializer_class = RenderCacheListSerializer
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -78,12 +230,76 @@ class FollowSerializer(serializers.ModelSerializer):
         fields = ["id", "follower", "followed", "created_at"]
 
 
-class PostSerializer(serializers.ModelSerializer):
+class FollowerSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="follower.id")
+    email = serializers.EmailField(source="follower.email")
+    followed_at = serializers.DateTimeField(source="created_at")
+
+    class Meta:
+        model = Follow
+        fields = ["id", "email", "followed_at"]
+
+
+class FollowingSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="followed.id")
+    email = serializers.EmailField(source="followed.email")
+    followed_at = serializers.DateTimeField(source="created_at")
+
+    class Meta:
+        model = Follow
+        fields = ["id", "email", "followed_at"]
+
+
+def validate_bulk_size(ids: list[int]) -> None:
+    if len(ids) > settings.BULK_MAX_ITEMS:
+        raise serializers.ValidationError(
+            f"Ensure this field has no more than "
+            f"{settings.BULK_MAX_ITEMS} elements."
+        )
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    followed = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        validators=[validate_bulk_size],
+    )
+
+
+class BulkLikeSerializer(serializers.Serializer):
+    posts = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        validators=[validate_bulk_size],
+    )
+
+
+class BulkResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    status = serializers.ChoiceField(
+        choices=["created", "exists", "not_found", "invalid"]
+    )
+
+
+class PostSerializer(RenderCacheMixin, serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+    like_count = serializers.SerializerMethodField()
+    comment_count = serializers.SerializerMethodField()
+    volatile_fields = ("image_variants", "like_count", "comment_count")
+
     class Meta:
         model = Posts
         fields = [
-            "id", "content", "image", "created_at", "updated_at", "hashtags"
+            "id", "content", "image", "image_variants", "created_at",
+            "updated_at", "hashtags", "like_count", "comment_count",
         ]
+        list_serializer_class = RenderCacheListSerializer
+
+    def get_like_count(self, obj: Posts) -> int:
+        return obj.like_count + getattr(obj, "shard_like_count", 0)
+
+    def get_comment_count(self, obj: Posts) -> int:
+        return obj.comment_count + getattr(obj, "shard_comment_count", 0)
 
 
 class LikeSerializer(serializers.ModelSerializer):
@@ -92,7 +308,13 @@ class LikeSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class LikeStateSerializer(serializers.Serializer):
+    liked = serializers.BooleanField()
+    like_count = serializers.IntegerField()
+
+
+class CommentSerializer(RenderCacheMixin, serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = "__all__"
+        list_serializer_class = RenderCacheListSerializer
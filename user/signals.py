@@ -0,0 +1,157 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from user.counters import change_counter
+from user.follow_cache import invalidate_follow
+from user.hashtags import index_hashtags
+from user.images import schedule_variants
+from user.media import (
+    release_media,
+    remember_stored_media,
+    update_media_references,
+)
+from user.metrics import CONNECTIONS_OPENED
+from user.perf import install_query_observers
+from user.replicas import pin_user
+from user.models import (
+    Comment,
+    Follow,
+    Like,
+    Posts,
+    Profile,
+    TokenUser,
+    User,
+)
+from user.timeline import fan_out_post, backfill_follow, prune_follow
+from user.user_cache import invalidate_user
+
+
+@receiver(post_save, sender=Posts)
+def fan_out_new_post(
+        sender, instance: Posts, created: bool, **kwargs
+) -> None:
+    if created:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Posts)
+def index_post_hashtags(
+        sender, instance: Posts, update_fields=None, **kwargs
+) -> None:
+    if update_fields and not {"content", "hashtags"} & set(update_fields):
+        return
+    index_hashtags([instance])
+
+
+@receiver(post_save, sender=Posts)
+@receiver(post_save, sender=Profile)
+def generate_image_variants(sender, instance, **kwargs) -> None:
+    schedule_variants(instance)
+
+
+@receiver(pre_save, sender=Posts)
+@receiver(pre_save, sender=Profile)
+def remember_media(sender, instance, update_fields=None, **kwargs) -> None:
+    remember_stored_media(instance, update_fields)
+
+
+@receiver(post_save, sender=Posts)
+@receiver(post_save, sender=Profile)
+def count_media_references(
+        sender, instance, created: bool, **kwargs
+) -> None:
+    update_media_references(instance, created)
+
+
+@receiver(post_delete, sender=Posts)
+@receiver(post_delete, sender=Profile)
+def release_deleted_media(sender, instance, **kwargs) -> None:
+    release_media(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_graph(sender, instance: Follow, **kwargs) -> None:
+    invalidate_follow(instance.follower_id, instance.followed_id)
+
+
+@receiver(post_save, sender=Posts)
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Posts)
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Follow)
+def pin_writer_to_primary(sender, instance, **kwargs) -> None:
+    pin_user(
+        instance.follower_id if sender is Follow else instance.user_id
+    )
+
+
+# Saves through `request.user` are sent by the proxy model.
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=TokenUser)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=TokenUser)
+def invalidate_cached_user(sender, instance: User, **kwargs) -> None:
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(
+        sender, instance: Follow, created: bool, **kwargs
+) -> None:
+    if created:
+        backfill_follow(instance.follower_id, instance.followed_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance: Follow, **kwargs) -> None:
+    prune_follow(instance.follower_id, instance.followed_id)
+
+
+def _deleted_with_post(instance: Like | Comment, origin) -> bool:
+    """Cascade deletes from the post itself need no counter update."""
+    return isinstance(origin, Posts) and origin.id == instance.posts_id
+
+
+@receiver(post_save, sender=Like)
+def count_like(sender, instance: Like, created: bool, **kwargs) -> None:
+    if created:
+        change_counter(instance.posts_id, "like_count", 1)
+
+
+@receiver(post_delete, sender=Like)
+def uncount_like(sender, instance: Like, origin=None, **kwargs) -> None:
+    if not _deleted_with_post(instance, origin):
+        change_counter(instance.posts_id, "like_count", -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(
+        sender, instance: Comment, created: bool, **kwargs
+) -> None:
+    if created:
+        change_counter(instance.posts_id, "comment_count", 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(
+        sender, instance: Comment, origin=None, **kwargs
+) -> None:
+    if not _deleted_with_post(instance, origin):
+        change_counter(instance.posts_id, "comment_count", -1)
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs) -> None:
+    # Checkouts of pooled connections are not new connections.
+    if not getattr(connection, "reused_from_pool", False):
+        CONNECTIONS_OPENED.labels(connection.alias).inc()
+
+
+@receiver(connection_created)
+def observe_connection(sender, connection, **kwargs) -> None:
+    install_query_observers(connection)
@@ -0,0 +1,129 @@
+"""
+Content-addressed storage for post images and avatars.
+
+Uploads are hashed while they are streamed to disk and stored once, under
+their SHA-256 digest, so a file uploaded many times takes the space of
+one. `user.media` counts the rows referencing every blob and deletes the
+blobs nobody references any more.
+"""
+import hashlib
+import os
+import tempfile
+from typing import Union
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import (
+    FileSystemStorage,
+    Storage,
+    default_storage,
+)
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+BLOB_DIRECTORY = "blobs"
+CHUNK_SIZE = 64 * 1024
+
+
+def blob_name(digest: str, extension: str) -> str:
+    """`blobs/ab/cd/abcd...ef.jpg`, fanned out to keep directories small."""
+    return "/".join(
+        [BLOB_DIRECTORY, digest[:2], digest[2:4], digest + extension.lower()]
+    )
+
+
+def is_blob_name(name: str) -> bool:
+    return name.startswith(BLOB_DIRECTORY + "/")
+
+
+class HashingFileUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream every upload to a temporary file, never into memory, and hash
+    it on the way so the storage does not have to read it again.
+    """
+
+    def new_file(self, *args, **kwargs) -> None:
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> None:
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size: int) -> File:
+        file = super().file_complete(file_size)
+        file.content_digest = self.hasher.hexdigest()
+        return file
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Store files under their digest; saving a known file is a no-op."""
+
+    def get_available_name(self, name: str, max_length=None) -> str:
+        # The final name is only known once the content is hashed.
+        return name
+
+    def _save(self, name: str, content: File) -> str:
+        # `user.models` imports this module for the field storage.
+        from user.media import touch_blob
+
+        _, extension = os.path.splitext(name)
+        digest = getattr(content, "content_digest", None)
+        if digest and hasattr(content, "temporary_file_path"):
+            source, owned = content.temporary_file_path(), False
+            size = content.size
+        else:
+            source, digest, size = self._spool(content)
+            owned = True
+
+        name = blob_name(digest, extension)
+        # Mark the blob as recently used before looking for it on disk, so
+        # it cannot be collected while this upload is being saved.
+        touch_blob(name, size)
+        path = self.path(name)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                file_move_safe(source, path)
+                owned = False
+                if self.file_permissions_mode is not None:
+                    os.chmod(path, self.file_permissions_mode)
+            except FileExistsError:
+                # The same file was stored concurrently.
+                pass
+
+        if owned:
+            os.remove(source)
+        return name
+
+    def _spool(self, content: File) -> tuple[str, str, int]:
+        """
+        Copy `content` to a temporary file in chunks, hashing it. Like the
+        upload handler's files, it lives in FILE_UPLOAD_TEMP_DIR, outside
+        MEDIA_ROOT, where the media views cannot serve it.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(
+                dir=settings.FILE_UPLOAD_TEMP_DIR,
+                suffix=".upload",
+                delete=False,
+        ) as spool:
+            for chunk in content.chunks(CHUNK_SIZE):
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                hasher.update(chunk)
+                spool.write(chunk)
+                size += len(chunk)
+        return spool.name, hasher.hexdigest(), size
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def media_storage() -> Union[ContentAddressedStorage, Storage]:
+    """Storage of post images and avatars, see MEDIA_CONTENT_ADDRESSED."""
+    if getattr(settings, "MEDIA_CONTENT_ADDRESSED", True):
+        return content_addressed_storage
+    return default_storage
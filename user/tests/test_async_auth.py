@@ -0,0 +1,212 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth.hashers import identify_hasher
+from django.contrib.auth.signals import user_login_failed
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from user.hashing import HashingBusy, HashingPool, pool
+from user.models import User
+from user.tests.test_metrics import sample
+from user.tests.test_posts_api import create_test_user
+
+REGISTER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token_obtain_pair")
+
+
+def iterations(encoded: str) -> int:
+    return identify_hasher(encoded).decode(encoded)["iterations"]
+
+
+class AsyncAuthViewTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+
+    def test_register(self) -> None:
+        response = self.client.post(
+            REGISTER_URL,
+            {"email": "new@EXAMPLE.com", "password": "password"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["email"], "new@example.com")
+        self.assertNotIn("password", response.json())
+        user = User.objects.get(email="new@example.com")
+        self.assertTrue(user.check_password("password"))
+
+        response = self.client.post(
+            REGISTER_URL, {"email": "new@example.com", "password": "password"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json())
+
+    def test_obtain_token_pair(self) -> None:
+        create_test_user("test@example.com", "password")
+
+        response = self.client.post(
+            TOKEN_URL,
+            {"email": "test@example.com", "password": "password"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {"refresh", "access"})
+        for data in (
+                {"email": "test@example.com", "password": "wrong"},
+                {"email": "nobody@example.com", "password": "password"},
+        ):
+            response = self.client.post(TOKEN_URL, data, format="json")
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post(TOKEN_URL, {}, format="json")
+        self.assertEqual(
+            response.json()["password"], ["This field is required."]
+        )
+        self.assertEqual(self.client.get(TOKEN_URL).status_code, 405)
+
+    def test_bodies_of_the_wrong_type_are_refused(self) -> None:
+        create_test_user("test@example.com", "password")
+
+        for url in (REGISTER_URL, TOKEN_URL):
+            for data in (
+                    {"email": "test@example.com", "password": ["password"]},
+                    {"email": {"address": "test"}, "password": "password"},
+            ):
+                response = self.client.post(url, data, format="json")
+                self.assertEqual(response.status_code, 400, (url, data))
+
+    def test_login_goes_through_the_authentication_backends(self) -> None:
+        user = create_test_user("test@example.com", "password")
+        failures = []
+        user_login_failed.connect(
+            lambda **kwargs: failures.append(kwargs["credentials"]),
+            weak=False,
+            dispatch_uid="test_login_failures",
+        )
+        self.addCleanup(
+            user_login_failed.disconnect, dispatch_uid="test_login_failures"
+        )
+
+        response = self.client.post(
+            TOKEN_URL,
+            {"email": "test@example.com", "password": "wrong"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0]["email"], "test@example.com")
+
+        data = {"email": "test@example.com", "password": "password"}
+        with override_settings(AUTHENTICATION_BACKENDS=[
+            "django.contrib.auth.backends.RemoteUserBackend"
+        ]):
+            response = self.client.post(TOKEN_URL, data, format="json")
+        self.assertEqual(response.status_code, 401)
+
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        response = self.client.post(TOKEN_URL, data, format="json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_rehashes_to_the_tuned_hasher(self) -> None:
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            user = create_test_user("test@example.com", "password")
+        self.assertEqual(iterations(user.password), 1000)
+
+        with override_settings(PASSWORD_HASH_ITERATIONS=2000):
+            response = self.client.post(
+                TOKEN_URL,
+                {"email": "test@example.com", "password": "password"},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertEqual(iterations(user.password), 2000)
+
+    def test_full_queue_is_refused(self) -> None:
+        with mock.patch.object(pool, "call", side_effect=HashingBusy):
+            response = self.client.post(
+                TOKEN_URL,
+                {"email": "test@example.com", "password": "password"},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+    async def test_served_asynchronously(self) -> None:
+        requests = sample(
+            "http_requests_total",
+            view="user:create",
+            method="POST",
+            status="201",
+        )
+
+        response = await self.async_client.post(
+            REGISTER_URL,
+            {"email": "async@example.com", "password": "password"},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sample(
+                "http_requests_total",
+                view="user:create",
+                method="POST",
+                status="201",
+            ),
+            requests + 1,
+        )
+
+
+    def test_views_are_documented(self) -> None:
+        def body(operation: dict, *path: str) -> dict:
+            for key in path:
+                operation = operation[key]
+            return operation["content"]["application/json"]["schema"]
+
+        response = self.client.get(reverse("schema"), {"format": "json"})
+
+        paths = response.json()["paths"]
+        register = paths[REGISTER_URL]["post"]
+        self.assertEqual(
+            body(register, "requestBody"),
+            {"$ref": "#/components/schemas/User"},
+        )
+        self.assertEqual(
+            body(register, "responses", "201"),
+            {"$ref": "#/components/schemas/User"},
+        )
+        token = paths[TOKEN_URL]["post"]
+        self.assertEqual(
+            body(token, "requestBody"),
+            {"$ref": "#/components/schemas/TokenObtainPair"},
+        )
+        self.assertEqual(
+            body(token, "responses", "200"),
+            {"$ref": "#/components/schemas/TokenObtainPair"},
+        )
+
+
+class HashingPoolTests(TestCase):
+    def test_jobs_beyond_the_cap_are_refused(self) -> None:
+        hashing_pool = HashingPool(workers=1, max_pending=1)
+        release = threading.Event()
+        rejected = sample("password_hashing_rejected_total")
+        try:
+            running = hashing_pool.submit(release.wait)
+            with self.assertRaises(HashingBusy):
+                hashing_pool.submit(release.wait)
+            release.set()
+            running.result()
+
+            self.assertEqual(hashing_pool.submit(len, "abc").result(), 3)
+        finally:
+            release.set()
+            hashing_pool.shutdown()
+        self.assertEqual(
+            sample("password_hashing_rejected_total"), rejected + 1
+        )
@@ -0,0 +1,121 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import Comment, Follow, Posts, Profile
+from user.revocation import revocations, revoke_token
+from user.tests.test_posts_api import create_test_user
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self) -> None:
+        revocations.clear()
+        self.user = create_test_user("test@example.com", "password")
+        self.other = create_test_user("other@example.com", "password")
+        Follow.objects.create(follower=self.user, followed=self.other)
+        self.post = Posts.objects.create(
+            user=self.user, content="Mine #summer"
+        )
+        Posts.objects.create(user=self.other, content="Theirs")
+        for number in range(3):
+            Comment.objects.create(
+                user=self.other, posts=self.post, content=f"Comment {number}"
+            )
+        self.profile = Profile.objects.create(user=self.user, name="Test")
+        self.token = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def tearDown(self) -> None:
+        revocations.clear()
+
+    def assert_same_responses(self, name: str, *args, query="") -> None:
+        sync_path = reverse(f"user:{name}", args=args)
+        async_path = reverse(f"user-async:{name}", args=args)
+
+        sync_response = self.client.get(sync_path + query)
+        async_response = self.client.get(async_path + query)
+
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        expected = sync_response.json()
+        for link in ("next", "previous"):
+            if expected.get(link):
+                expected[link] = expected[link].replace(sync_path, async_path)
+        self.assertEqual(async_response.json(), expected)
+
+    def test_answers_like_the_sync_views(self) -> None:
+        self.assert_same_responses("posts-list")
+        self.assert_same_responses("posts-list", query="?page_size=1")
+        self.assert_same_responses("posts-list", query="?hashtags=summer")
+        self.assert_same_responses("posts-list", query="?content=summer")
+        self.assert_same_responses("posts-detail", self.post.id)
+        self.assert_same_responses("posts-comments", self.post.id)
+        self.assert_same_responses(
+            "posts-comments", self.post.id, query="?page_size=2"
+        )
+        self.assert_same_responses("profile-list")
+        self.assert_same_responses("profile-detail", self.profile.id)
+
+    def test_pages_follow_the_cursor(self) -> None:
+        url = reverse("user-async:posts-comments", args=[self.post.id])
+
+        first = self.client.get(url, {"page_size": 2}).json()
+        second = self.client.get(first["next"]).json()
+
+        self.assertEqual(
+            [
+                comment["content"]
+                for comment in first["results"] + second["results"]
+            ],
+            ["Comment 2", "Comment 1", "Comment 0"],
+        )
+        self.assertIsNone(second["next"])
+        self.assertEqual(
+            self.client.get(url, {"cursor": "invalid"}).status_code, 404
+        )
+
+    def test_not_found(self) -> None:
+        stranger = create_test_user("stranger@example.com", "password")
+        hidden = Posts.objects.create(user=stranger, content="Hidden")
+
+        for name, pk in (
+                ("posts-detail", hidden.id),
+                ("posts-comments", hidden.id),
+                ("posts-comments", hidden.id + 1),
+                ("profile-detail", self.profile.id + 1),
+        ):
+            response = self.client.get(
+                reverse(f"user-async:{name}", args=[pk])
+            )
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json(), {"detail": "Not found."})
+
+    def test_authentication_and_permissions(self) -> None:
+        anonymous = APIClient()
+        response = anonymous.get(reverse("user-async:posts-list"))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("Bearer", response["WWW-Authenticate"])
+        self.assertEqual(
+            anonymous.get(reverse("user-async:profile-list")).status_code, 200
+        )
+
+        revoke_token(self.token)
+        response = self.client.get(reverse("user-async:posts-list"))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_not_valid")
+
+    def test_read_only(self) -> None:
+        response = self.client.post(reverse("user-async:posts-list"))
+
+        self.assertEqual(response.status_code, 405)
+        self.assertIn("GET", response["Allow"])
+
+    async def test_served_asynchronously(self) -> None:
+        response = await self.async_client.get(
+            reverse("user-async:posts-detail", args=[self.post.id]),
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["content"], "Mine #summer")
@@ -0,0 +1,92 @@
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from user.authentication import JWTAuthentication
+from user.models import Posts, Profile, TokenUser
+from user.tests.test_posts_api import create_test_user
+from user.user_cache import user_cache
+
+MANAGE_URL = reverse("user:manage")
+POSTS_URL = reverse("user:posts-list")
+
+
+class JWTAuthenticationTests(TransactionTestCase):
+    def setUp(self) -> None:
+        user_cache.clear()
+        self.user = create_test_user("test@example.com", "password")
+        self.token = AccessToken.for_user(self.user)
+        self.authentication = JWTAuthentication()
+
+    def tearDown(self) -> None:
+        user_cache.clear()
+
+    def client_for(self, token: AccessToken) -> APIClient:
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def test_cached_user_resolves_without_queries(self) -> None:
+        self.authentication.get_user(self.token)
+
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(self.token)
+            self.assertIsInstance(user, TokenUser)
+            self.assertEqual(user, self.user)
+            self.assertEqual(user.email, "test@example.com")
+            self.assertFalse(user.is_staff)
+
+    def test_deactivation_and_deletion_revoke_access(self) -> None:
+        self.authentication.get_user(self.token)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    def test_updates_through_the_api_are_seen(self) -> None:
+        client = self.client_for(self.token)
+
+        response = client.patch(MANAGE_URL, {"email": "new@example.com"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            client.get(MANAGE_URL).data["email"], "new@example.com"
+        )
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("password"))
+
+    def test_token_user_owns_what_it_creates(self) -> None:
+        other = create_test_user("other@example.com", "password")
+        profile = Profile.objects.create(user=other, name="Other")
+        client = self.client_for(self.token)
+
+        response = client.post(POSTS_URL, {"content": "Mine"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            Posts.objects.get(id=response.data["id"]).user_id, self.user.id
+        )
+        response = client.patch(
+            reverse("user:profile-detail", args=[profile.id]),
+            {"name": "Changed"},
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_schema_documents_the_bearer_scheme(self) -> None:
+        response = APIClient().get(reverse("schema"), {"format": "json"})
+
+        schema = response.json()
+        self.assertEqual(
+            schema["components"]["securitySchemes"]["jwtAuth"],
+            {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"},
+        )
+        self.assertIn(
+            {"jwtAuth": []}, schema["paths"][POSTS_URL]["get"]["security"]
+        )
@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase
+
+from user.benchmark import (
+    ENDPOINTS,
+    Fixture,
+    compare,
+    route_names,
+    run_benchmarks,
+    uncovered_routes,
+)
+from user.concurrency import run_benchmarks as run_concurrency_benchmarks
+from user.models import Comment, Follow, Profile
+from user.row_serializers import UserRowSerializer
+from user.seed import rebuild_derived_data, seed_graph
+
+
+def endpoint(name: str):
+    return next(item for item in ENDPOINTS if item.name == name)
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self) -> None:
+        seed_graph(10, posts_per_user=2, follows_per_user=3, seed=1)
+
+    def test_every_route_is_benchmarked(self) -> None:
+        self.assertIn("posts-like", route_names())
+        self.assertEqual(uncovered_routes(ENDPOINTS), set())
+
+    def test_reports_metrics_and_leaves_data_unchanged(self) -> None:
+        follows = Follow.objects.count()
+
+        results = run_benchmarks(
+            3, [endpoint("GET posts-list"), endpoint("POST follow-list")]
+        )
+
+        result = results["POST follow-list"]
+        self.assertEqual(
+            set(result),
+            {"queries", "p50_ms", "p95_ms", "p99_ms", "rps", "peak_kib"},
+        )
+        self.assertGreater(result["queries"], 0)
+        self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        # Only the fixture's own follow was added.
+        self.assertEqual(Follow.objects.count(), follows + 1)
+
+    def test_extra_queries_are_a_regression(self) -> None:
+        users = [endpoint("GET users")]
+        fixture = Fixture()
+        baseline = run_benchmarks(2, users, fixture=fixture)
+
+        def following_count(self, row: dict) -> int:
+            return Follow.objects.filter(follower_id=row["id"]).count()
+
+        with mock.patch.object(
+                UserRowSerializer, "get_following_count", following_count
+        ):
+            results = run_benchmarks(2, users, fixture=fixture)
+
+        regressions = compare(results, baseline, max_slowdown=100)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("GET users", regressions[0])
+        self.assertEqual(compare(baseline, baseline), [])
+
+
+class ConcurrencyBenchmarkTests(TransactionTestCase):
+    def test_compares_sync_and_async_views(self) -> None:
+        seed_graph(10, posts_per_user=2, follows_per_user=3, seed=1)
+        rebuild_derived_data()
+
+        results = run_concurrency_benchmarks(
+            workers=2,
+            concurrency=2,
+            requests=6,
+            names=["posts-comments", "profile-detail"],
+        )
+
+        self.assertEqual(set(results), {"posts-comments", "profile-detail"})
+        for modes in results.values():
+            self.assertEqual(set(modes), {"sync", "async"})
+            for result in modes.values():
+                self.assertEqual(result["errors"], 0)
+                self.assertGreater(result["rps"], 0)
+        # The comments and profile it added are gone.
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Profile.objects.exists())
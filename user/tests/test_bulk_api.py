@@ -0,0 +1,112 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.models import Follow, Like, Posts, TimelineEntry
+from user.tests.test_follow_api import create_test_follow
+from user.tests.test_posts_api import create_test_user
+
+BULK_FOLLOW_URL = reverse("user:follow-bulk")
+BULK_LIKE_URL = reverse("user:like-bulk")
+
+
+def outcomes(response) -> dict[int, str]:
+    return {item["id"]: item["status"] for item in response.data}
+
+
+class BulkFollowApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+        self.others = [
+            create_test_user(f"user{i}@example.com", "password")
+            for i in range(3)
+        ]
+
+    def test_bulk_follow_reports_each_item(self) -> None:
+        create_test_follow(follower=self.user, followed=self.others[0])
+        ids = [other.id for other in self.others]
+
+        response = self.client.post(
+            BULK_FOLLOW_URL,
+            {"followed": ids + [self.user.id, 9999, ids[1]]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(outcomes(response), {
+            ids[0]: "exists",
+            ids[1]: "created",
+            ids[2]: "created",
+            self.user.id: "invalid",
+            9999: "not_found",
+        })
+        self.assertEqual(Follow.objects.filter(follower=self.user).count(), 3)
+
+    def test_bulk_follow_backfills_timeline(self) -> None:
+        post = Posts.objects.create(user=self.others[1], content="Hello")
+
+        self.client.post(
+            BULK_FOLLOW_URL, {"followed": [self.others[1].id]}, format="json"
+        )
+
+        self.assertTrue(
+            TimelineEntry.objects.filter(owner=self.user, posts=post).exists()
+        )
+
+    def test_bulk_follow_limit(self) -> None:
+        with self.settings(BULK_MAX_ITEMS=2):
+            response = self.client.post(
+                BULK_FOLLOW_URL, {"followed": [1, 2, 3]}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BulkLikeApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+        self.posts = [
+            Posts.objects.create(user=self.user, content=f"Post {i}")
+            for i in range(3)
+        ]
+
+    def test_bulk_like(self) -> None:
+        Like.objects.create(user=self.user, posts=self.posts[0])
+        ids = [post.id for post in self.posts]
+
+        response = self.client.post(
+            BULK_LIKE_URL, {"posts": ids + [9999]}, format="json"
+        )
+
+        self.assertEqual(outcomes(response), {
+            ids[0]: "exists",
+            ids[1]: "created",
+            ids[2]: "created",
+            9999: "not_found",
+        })
+        self.assertEqual(Like.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(
+            list(Posts.objects.order_by("id").values_list(
+                "like_count", flat=True
+            )),
+            [1, 1, 1],
+        )
+
+    def test_bulk_like_updates_counters_once(self) -> None:
+        ids = [post.id for post in self.posts]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(BULK_LIKE_URL, {"posts": ids}, format="json")
+
+        updates = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1)
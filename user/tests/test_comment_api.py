@@ -57,4 +57,27 @@ class CommentsApiTests(TestCase):
         response = self.client.get(COMMENTS_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_get_comments_of_a_post(self):
+        other_post = Posts.objects.create(user=self.user, content="Other")
+        Comment.objects.create(
+            user=self.user, posts=self.post, content="Test comment"
+        )
+        Comment.objects.create(
+            user=self.user, posts=other_post, content="Other comment"
+        )
+
+        response = self.client.get(
+            reverse("user:posts-comments", args=[self.post.id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [comment["content"] for comment in response.data["results"]],
+            ["Test comment"],
+        )
+        response = self.client.get(
+            reverse("user:posts-comments", args=[other_post.id + 1])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
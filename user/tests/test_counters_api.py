@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.models import Comment, Like, PostCounterShard, Posts
+from user.tests.test_posts_api import create_test_user
+
+LIKE_URL = reverse("user:like-list")
+COMMENTS_URL = reverse("user:comment-list")
+
+
+class PostCountersApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.other = create_test_user("other@example.com", "password")
+        self.client.force_authenticate(self.user)
+        self.post = Posts.objects.create(user=self.user, content="Post")
+
+    def get_counts(self) -> tuple[int, int]:
+        response = self.client.get(
+            reverse("user:posts-detail", kwargs={"pk": self.post.id})
+        )
+        return response.data["like_count"], response.data["comment_count"]
+
+    def test_likes_and_comments_update_counts(self) -> None:
+        like = self.client.post(
+            LIKE_URL, {"user": self.user.id, "posts": self.post.id}
+        )
+        self.client.post(
+            COMMENTS_URL,
+            {"user": self.user.id, "posts": self.post.id, "content": "Nice"}
+        )
+        Like.objects.create(user=self.other, posts=self.post)
+
+        self.assertEqual(self.get_counts(), (2, 1))
+
+        response = self.client.delete(
+            reverse("user:like-detail", kwargs={"pk": like.data["id"]})
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_counts(), (1, 1))
+
+    def test_post_update_does_not_overwrite_counts(self) -> None:
+        stale = Posts.objects.get(id=self.post.id)
+        Like.objects.create(user=self.other, posts=self.post)
+
+        stale.content = "Edited"
+        stale.save()
+
+        self.assertEqual(self.get_counts(), (1, 0))
+
+    def test_counts_never_go_negative(self) -> None:
+        like = Like.objects.create(user=self.other, posts=self.post)
+        Posts.objects.filter(id=self.post.id).update(like_count=0)
+
+        like.delete()
+
+        self.assertEqual(self.get_counts(), (0, 0))
+
+    @override_settings(POST_COUNTER_SHARDS=4)
+    def test_sharded_counts(self) -> None:
+        Like.objects.create(user=self.user, posts=self.post)
+        like = Like.objects.create(user=self.other, posts=self.post)
+        Comment.objects.create(user=self.user, posts=self.post, content="Hi")
+
+        self.assertTrue(PostCounterShard.objects.exists())
+        self.assertEqual(self.get_counts(), (2, 1))
+
+        like.delete()
+        self.assertEqual(self.get_counts(), (1, 1))
+
+    @override_settings(POST_COUNTER_SHARDS=4)
+    def test_reconcile_repairs_drift_and_folds_shards(self) -> None:
+        Like.objects.create(user=self.other, posts=self.post)
+        Posts.objects.filter(id=self.post.id).update(comment_count=7)
+
+        out = StringIO()
+        call_command("reconcile_counters", batch_size=1, stdout=out)
+
+        self.assertIn("repaired 1", out.getvalue())
+        self.assertFalse(PostCounterShard.objects.exists())
+        self.assertEqual(self.get_counts(), (1, 0))
+
+    def test_deleting_post_with_engagement(self) -> None:
+        Like.objects.create(user=self.other, posts=self.post)
+        Comment.objects.create(user=self.other, posts=self.post, content="x")
+
+        self.post.delete()
+
+        self.assertFalse(Posts.objects.exists())
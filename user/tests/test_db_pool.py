@@ -0,0 +1,201 @@
+import gc
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from user.db_pool import (
+    ConnectionPool,
+    PoolMetrics,
+    PoolTimeout,
+    close_pools,
+)
+from user.tests.test_metrics import sample
+
+
+def connect() -> sqlite3.Connection:
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connections_are_reused(self) -> None:
+        pool = ConnectionPool(max_size=2)
+
+        first, reused = pool.checkout(connect)
+        self.assertFalse(reused)
+        pool.release(first)
+        second, reused = pool.checkout(connect)
+
+        self.assertTrue(reused)
+        self.assertIs(second, first)
+        self.assertEqual((pool.size, pool.in_use, pool.idle), (1, 1, 0))
+
+    def test_checkouts_wait_for_a_connection(self) -> None:
+        pool = ConnectionPool(
+            max_size=1,
+            timeout=0.05,
+            metrics=PoolMetrics.for_alias("pool-test"),
+        )
+        timeouts = sample("db_pool_timeouts_total", alias="pool-test")
+        raw, _ = pool.checkout(connect)
+
+        with self.assertRaises(PoolTimeout):
+            pool.checkout(connect)
+        self.assertEqual(
+            sample("db_pool_timeouts_total", alias="pool-test"),
+            timeouts + 1,
+        )
+
+        pool.timeout = 5
+        taken = []
+        waiter = threading.Thread(
+            target=lambda: taken.append(pool.checkout(connect))
+        )
+        waiter.start()
+        time.sleep(0.05)
+        pool.release(raw)
+        waiter.join()
+        self.assertEqual(taken, [(raw, True)])
+
+    def test_released_connections_are_rolled_back(self) -> None:
+        pool = ConnectionPool()
+        raw, _ = pool.checkout(connect)
+        raw.execute("CREATE TABLE item (id INTEGER)")
+        raw.commit()
+        raw.execute("INSERT INTO item VALUES (1)")
+
+        pool.release(raw)
+
+        self.assertFalse(raw.in_transaction)
+        raw, _ = pool.checkout(connect)
+        self.assertEqual(raw.execute("SELECT * FROM item").fetchall(), [])
+
+    def test_connections_are_recycled(self) -> None:
+        pool = ConnectionPool(max_uses=2)
+        raw, _ = pool.checkout(connect)
+        pool.release(raw)
+        self.assertIs(pool.checkout(connect)[0], raw)
+        pool.release(raw)
+
+        self.assertIsNot(pool.checkout(connect)[0], raw)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            raw.execute("SELECT 1")
+
+    def test_broken_connections_are_replaced_on_checkout(self) -> None:
+        pool = ConnectionPool(health_check_after=0)
+        raw, _ = pool.checkout(connect)
+        pool.release(raw)
+        raw.close()
+
+        replacement, reused = pool.checkout(connect)
+
+        self.assertIsNot(replacement, raw)
+        self.assertFalse(reused)
+        self.assertEqual(pool.size, 1)
+
+    def test_idle_connections_beyond_min_size_are_closed(self) -> None:
+        pool = ConnectionPool(min_size=1, max_size=3, max_idle=0)
+        pool.fill(connect)
+        self.assertEqual(pool.idle, 1)
+        connections = [pool.checkout(connect)[0] for _ in range(3)]
+
+        for raw in connections:
+            pool.release(raw)
+
+        self.assertEqual((pool.size, pool.idle), (1, 1))
+
+
+class PooledBackendTests(SimpleTestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.handler = ConnectionHandler({
+            "default": {"ENGINE": "django.db.backends.sqlite3"},
+            "pooled": {
+                "ENGINE": "user.db_backends.sqlite3",
+                "NAME": os.path.join(directory.name, "pooled.sqlite3"),
+                "POOL": {"MAX_SIZE": 2, "TIMEOUT": 5},
+            }
+        })
+        self.addCleanup(close_pools)
+        self.addCleanup(self.handler.close_all)
+
+    def query(self) -> None:
+        connection = self.handler["pooled"]
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        connection.close()
+
+    def test_close_returns_the_connection(self) -> None:
+        connection = self.handler["pooled"]
+        connection.ensure_connection()
+        raw = connection.connection
+        self.assertFalse(connection.reused_from_pool)
+
+        connection.close()
+        self.assertEqual(connection.pool.idle, 1)
+        connection.ensure_connection()
+
+        self.assertIs(connection.connection, raw)
+        self.assertTrue(connection.reused_from_pool)
+
+    def test_threads_share_the_pool(self) -> None:
+        created = sample(
+            "db_pool_connections_created_total", alias="pooled"
+        )
+        errors = []
+
+        def work() -> None:
+            try:
+                for _ in range(20):
+                    self.query()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(
+            sample("db_pool_connections_created_total", alias="pooled")
+            - created,
+            2,
+        )
+        self.assertEqual(
+            sample("db_pool_connections", alias="pooled", state="in_use"), 0
+        )
+
+    def test_connections_of_ended_threads_are_freed(self) -> None:
+        thread = threading.Thread(
+            target=lambda: self.handler["pooled"].ensure_connection()
+        )
+        thread.start()
+        thread.join()
+        gc.collect()
+
+        self.query()
+        pool = self.handler["pooled"].pool
+        self.assertEqual(pool.in_use, 0)
+        self.assertEqual(pool.size, 1)
+
+    def test_pools_are_closed_before_the_test_database_is_dropped(
+            self,
+    ) -> None:
+        self.query()
+        connection = self.handler["pooled"]
+        pool = connection.pool
+        self.assertEqual(pool.idle, 1)
+
+        connection.creation._destroy_test_db(
+            connection.settings_dict["NAME"], verbosity=0
+        )
+
+        self.assertEqual(pool.size, 0)
+        self.assertFalse(os.path.exists(connection.settings_dict["NAME"]))
@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.models import Comment, Follow, Like, Posts, Profile
+from user.tests.test_posts_api import create_test_user
+
+EXPORT_URL = reverse("user:export")
+
+
+def read_lines(content: bytes) -> list[dict]:
+    return [json.loads(line) for line in content.splitlines()]
+
+
+class ExportApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.other = create_test_user("other@example.com", "password")
+        self.client.force_authenticate(self.user)
+
+        Profile.objects.create(user=self.user, name="Test")
+        self.post = Posts.objects.create(user=self.user, content="Mine")
+        other_post = Posts.objects.create(user=self.other, content="Theirs")
+        Comment.objects.create(
+            user=self.user, posts=other_post, content="Nice"
+        )
+        Like.objects.create(user=self.user, posts=other_post)
+        Follow.objects.create(follower=self.user, followed=self.other)
+        Follow.objects.create(follower=self.other, followed=self.user)
+
+    def export(self, **params) -> list[dict]:
+        response = self.client.get(EXPORT_URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return read_lines(b"".join(response.streaming_content))
+
+    def test_export_contains_all_user_data(self) -> None:
+        records = self.export()
+
+        self.assertEqual(records[0]["type"], "export")
+        self.assertEqual(
+            [record["type"] for record in records[1:]],
+            ["profile", "post", "comment", "like", "following", "follower"],
+        )
+        post = self.client.get(
+            reverse("user:posts-detail", kwargs={"pk": self.post.id})
+        )
+        self.assertEqual(records[2]["data"], json.loads(post.content))
+
+    def test_since_only_exports_newer_changes(self) -> None:
+        exported_at = self.export()[0]["data"]["exported_at"]
+        self.post.content = "Edited"
+        self.post.save()
+
+        records = self.export(since=exported_at)
+
+        self.assertEqual(
+            [record["type"] for record in records], ["export", "post"]
+        )
+        self.assertEqual(records[1]["data"]["content"], "Edited")
+
+    def test_invalid_since(self) -> None:
+        response = self.client.get(EXPORT_URL, {"since": "yesterday"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_requires_authentication(self) -> None:
+        response = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_command_writes_ndjson_file(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export.ndjson")
+            call_command(
+                "export_user_data",
+                "test@example.com",
+                output=path,
+                stdout=StringIO(),
+            )
+            with open(path, "rb") as export:
+                records = read_lines(export.read())
+
+        self.assertEqual(len(records), 7)
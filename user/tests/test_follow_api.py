@@ -55,3 +55,61 @@ class FollowApiTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Follow.objects.count(), 0)
+
+
+class FollowGraphApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+        self.others = [
+            create_test_user(f"user{i}@example.com", "password")
+            for i in range(3)
+        ]
+        for other in self.others:
+            create_test_follow(follower=other, followed=self.user)
+        create_test_follow(follower=self.user, followed=self.others[0])
+
+    def test_user_list_returns_counts(self) -> None:
+        response = self.client.get(reverse("user:users"))
+
+        counts = {
+            item["id"]: (item["following_count"], item["followers_count"])
+            for item in response.data["results"]
+        }
+        self.assertEqual(counts[self.user.id], (1, 3))
+        self.assertEqual(counts[self.others[0].id], (1, 1))
+        self.assertEqual(counts[self.others[1].id], (1, 0))
+
+    def test_user_list_query_count_is_constant(self) -> None:
+        for i in range(5):
+            extra = create_test_user(f"extra{i}@example.com", "password")
+            create_test_follow(follower=extra, followed=self.user)
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse("user:users"))
+
+    def test_followers_list_is_paginated(self) -> None:
+        url = reverse("user:user-followers", kwargs={"pk": self.user.id})
+
+        first = self.client.get(url, {"page_size": 2})
+        second = self.client.get(first.data["next"])
+
+        emails = [
+            item["email"]
+            for item in first.data["results"] + second.data["results"]
+        ]
+        self.assertEqual(
+            emails, [other.email for other in reversed(self.others)]
+        )
+
+    def test_following_list(self) -> None:
+        url = reverse("user:user-following", kwargs={"pk": self.user.id})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]],
+            [self.others[0].id],
+        )
@@ -0,0 +1,106 @@
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.follow_cache import FollowGraphCache, follow_graph
+from user.models import Follow
+from user.tests.test_follow_api import create_test_follow
+from user.tests.test_posts_api import create_test_user
+
+
+class FollowGraphCacheTests(TransactionTestCase):
+    def setUp(self) -> None:
+        follow_graph.clear()
+        self.alice = create_test_user("alice@example.com", "password")
+        self.bob = create_test_user("bob@example.com", "password")
+        self.carol = create_test_user("carol@example.com", "password")
+        create_test_follow(follower=self.alice, followed=self.bob)
+
+    def tearDown(self) -> None:
+        follow_graph.clear()
+
+    def test_reads_are_served_from_memory(self) -> None:
+        follow_graph.is_following(self.alice.id, self.bob.id)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follow_graph.is_following(self.alice.id, self.bob.id)
+            )
+            self.assertFalse(
+                follow_graph.is_following(self.alice.id, self.carol.id)
+            )
+            self.assertEqual(
+                list(follow_graph.following_ids(self.alice.id)),
+                [self.bob.id],
+            )
+
+    def test_stale_entries_do_not_refuse_a_follow(self) -> None:
+        self.assertTrue(follow_graph.is_following(self.alice.id, self.bob.id))
+        # An unfollow handled by another worker, invisible to this cache.
+        Follow.objects.filter(follower=self.alice)._raw_delete("default")
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        data = {"follower": self.alice.id, "followed": self.bob.id}
+
+        response = client.post(reverse("user:follow-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = client.post(reverse("user:follow-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_follow_signals_invalidate(self) -> None:
+        self.assertEqual(follow_graph.followers_count(self.carol.id), 0)
+        self.assertFalse(
+            follow_graph.is_following(self.alice.id, self.carol.id)
+        )
+
+        follow = create_test_follow(follower=self.alice, followed=self.carol)
+        self.assertTrue(
+            follow_graph.is_following(self.alice.id, self.carol.id)
+        )
+        self.assertEqual(follow_graph.followers_count(self.carol.id), 1)
+
+        follow.delete()
+        self.assertFalse(
+            follow_graph.is_following(self.alice.id, self.carol.id)
+        )
+        self.assertEqual(follow_graph.followers_count(self.carol.id), 0)
+
+    def test_lru_eviction_respects_memory_cap(self) -> None:
+        cache = FollowGraphCache(max_ids=4)
+        create_test_follow(follower=self.bob, followed=self.carol)
+
+        cache.following_ids(self.alice.id)
+        cache.following_ids(self.bob.id)
+        cache.following_ids(self.carol.id)
+
+        self.assertLessEqual(cache.size, 4)
+        with self.assertNumQueries(1):
+            cache.following_ids(self.alice.id)
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+    )
+    def test_shared_invalidation_reaches_other_processes(self) -> None:
+        caches["default"].clear()
+        other_process = FollowGraphCache(
+            shared_alias="default", sync_interval=0
+        )
+        self.assertTrue(
+            other_process.is_following(self.alice.id, self.bob.id)
+        )
+
+        Follow.objects.filter(follower=self.alice).delete()
+        FollowGraphCache(shared_alias="default").invalidate(
+            self.alice.id, self.bob.id
+        )
+
+        self.assertFalse(
+            other_process.is_following(self.alice.id, self.bob.id)
+        )
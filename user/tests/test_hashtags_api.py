@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from user.hashtags import parse_hashtags
+from user.models import Posts, PostHashtag
+from user.tests.test_posts_api import create_test_user
+
+POST_URL = reverse("user:posts-list")
+
+
+class ParseHashtagsTests(TestCase):
+    def test_field_and_content_tags_are_normalized(self) -> None:
+        tags = parse_hashtags("#Summer, beach", "Sunny #DAY at the #beach")
+
+        self.assertEqual(tags, {"summer", "beach", "day"})
+
+    def test_empty_input(self) -> None:
+        self.assertEqual(parse_hashtags(None, ""), set())
+
+
+class HashtagFilterApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+        self.summer = Posts.objects.create(
+            user=self.user, content="Hot", hashtags="#Summer"
+        )
+        self.summer_beach = Posts.objects.create(
+            user=self.user, content="At the #beach", hashtags="summer"
+        )
+        self.sum = Posts.objects.create(
+            user=self.user, content="Maths", hashtags="#Sum"
+        )
+
+    def get_ids(self, query: str) -> set[int]:
+        response = self.client.get(f"{POST_URL}?{query}")
+        return {item["id"] for item in response.data["results"]}
+
+    def test_filter_is_exact(self) -> None:
+        self.assertEqual(self.get_ids("hashtags=Sum"), {self.sum.id})
+
+    def test_filter_any(self) -> None:
+        self.assertEqual(
+            self.get_ids("hashtags=beach,sum"),
+            {self.summer_beach.id, self.sum.id},
+        )
+
+    def test_filter_all(self) -> None:
+        self.assertEqual(
+            self.get_ids("hashtags=summer,beach&hashtags_match=all"),
+            {self.summer_beach.id},
+        )
+
+    def test_update_reindexes_post(self) -> None:
+        self.sum.hashtags = "#winter"
+        self.sum.save()
+
+        self.assertEqual(self.get_ids("hashtags=sum"), set())
+        self.assertEqual(self.get_ids("hashtags=winter"), {self.sum.id})
+
+    def test_backfill_command(self) -> None:
+        PostHashtag.objects.all().delete()
+
+        call_command("backfill_hashtags", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            self.get_ids("hashtags=summer"),
+            {self.summer.id, self.summer_beach.id},
+        )
@@ -0,0 +1,119 @@
+import io
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.images import render_variants
+from user.models import Posts
+from user.tests.test_posts_api import create_test_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(size: tuple[int, int] = (2000, 1000)) -> bytes:
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    Image.new("RGB", size, "red").save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+class RenderVariantsTests(SimpleTestCase):
+    def test_variants_are_resized_and_stripped(self) -> None:
+        variants = render_variants(make_image(), 40_000_000, 80)
+
+        self.assertEqual(set(variants), {"thumbnail", "medium"})
+        for data in variants["thumbnail"].values():
+            with Image.open(io.BytesIO(data)) as image:
+                self.assertEqual(image.size, (320, 160))
+                self.assertEqual(len(image.getexif()), 0)
+        with Image.open(io.BytesIO(variants["medium"]["jpeg"])) as image:
+            self.assertEqual(image.size, (1080, 540))
+
+    def test_decompression_bombs_are_rejected(self) -> None:
+        with self.assertRaises(Image.DecompressionBombError):
+            render_variants(make_image(), 100_000, 80)
+
+    def test_images_just_over_the_limit_are_rejected(self) -> None:
+        # Pillow itself only warns below twice the limit.
+        with self.assertRaises(Image.DecompressionBombError):
+            render_variants(make_image(), 1_500_000, 80)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE_SYNC=True)
+class ImagePipelineApiTests(TestCase):
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+
+    def test_upload_records_variant_urls(self) -> None:
+        upload = SimpleUploadedFile(
+            "photo.jpg", make_image(), content_type="image/jpeg"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("user:posts-list"),
+                {"content": "Photo", "image": upload},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        detail = self.client.get(
+            reverse("user:posts-detail", kwargs={"pk": response.data["id"]})
+        )
+        variants = detail.data["image_variants"]
+        self.assertEqual(set(variants), {"thumbnail", "medium"})
+        self.assertTrue(
+            variants["thumbnail"]["webp"].startswith("http://testserver/")
+        )
+
+    def test_backfill_command(self) -> None:
+        post = Posts.objects.create(
+            user=self.user,
+            content="Photo",
+            image=SimpleUploadedFile("photo.jpg", make_image()),
+        )
+        self.assertEqual(post.image_variants, {})
+
+        call_command("generate_image_variants", stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants["source"], post.image.name)
+
+    def test_forced_backfill_replaces_variant_files(self) -> None:
+        post = Posts.objects.create(
+            user=self.user,
+            content="Photo",
+            image=SimpleUploadedFile("photo.jpg", make_image()),
+        )
+        call_command("generate_image_variants", stdout=StringIO())
+        post.refresh_from_db()
+        name = post.image_variants["medium"]["jpeg"]
+        with default_storage.open(name) as stored:
+            before = stored.read()
+
+        with self.settings(IMAGE_VARIANT_QUALITY=20):
+            call_command(
+                "generate_image_variants", "--force", stdout=StringIO()
+            )
+
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants["medium"]["jpeg"], name)
+        with default_storage.open(name) as stored:
+            self.assertLess(len(stored.read()), len(before))
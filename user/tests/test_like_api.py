@@ -5,7 +5,7 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from user.models import Like, User, Posts
+from user.models import Follow, Like, User, Posts
 from user.tests.test_posts_api import create_test_user, create_test_post
 
 LIKE_URL = reverse("user:like-list")
@@ -75,12 +75,51 @@ class LikeApiTests(TestCase):
         response = self.client.get(LIKE_URL)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], like.id)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["id"], like.id)
         created_at_str = datetime.isoformat(
             post.created_at
         ).replace("+00:00", "Z")
         self.assertEqual(
-            response.data[0]["created_at"][:19],
+            response.data["results"][0]["created_at"][:19],
             created_at_str[:19]
         )
+
+
+class LikeToggleApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.author = create_test_user("author@example.com", "password")
+        self.user = create_test_user("test@example.com", "password")
+        self.post = Posts.objects.create(user=self.author, content="Post")
+        Follow.objects.create(follower=self.user, followed=self.author)
+        self.url = reverse("user:posts-like", kwargs={"pk": self.post.id})
+        self.client.force_authenticate(self.user)
+
+    def test_like_is_idempotent(self) -> None:
+        first = self.client.put(self.url)
+        second = self.client.put(self.url)
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.data, {"liked": True, "like_count": 1})
+        self.assertEqual(second.data, {"liked": True, "like_count": 1})
+        self.assertEqual(Like.objects.filter(user=self.user).count(), 1)
+
+    def test_unlike_is_idempotent(self) -> None:
+        create_test_like(self.user, self.post, date.today())
+        create_test_like(self.author, self.post, date.today())
+
+        first = self.client.delete(self.url)
+        second = self.client.delete(self.url)
+
+        self.assertEqual(first.data, {"liked": False, "like_count": 1})
+        self.assertEqual(second.data, {"liked": False, "like_count": 1})
+        self.assertFalse(Like.objects.filter(user=self.user).exists())
+
+    def test_like_missing_post(self) -> None:
+        url = reverse("user:posts-like", kwargs={"pk": self.post.id + 1})
+
+        response = self.client.put(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Like.objects.exists())
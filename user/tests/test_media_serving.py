@@ -0,0 +1,109 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from user.media_views import parse_range
+from user.storage import content_addressed_storage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+DATA = bytes(range(256)) * 4
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self) -> None:
+        self.assertEqual(parse_range("bytes=0-99", 1024), (0, 99))
+        self.assertEqual(parse_range("bytes=1000-", 1024), (1000, 1023))
+        self.assertEqual(parse_range("bytes=1000-5000", 1024), (1000, 1023))
+        self.assertEqual(parse_range("bytes=-24", 1024), (1000, 1023))
+        self.assertIsNone(parse_range("bytes=0-1,5-6", 1024))
+        self.assertIsNone(parse_range("bytes=9-1", 1024))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=1024-", 1024)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ServeMediaTests(TestCase):
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        self.blob = content_addressed_storage.save(
+            "file.bin", ContentFile(DATA)
+        )
+        self.url = f"/media/{self.blob}"
+
+    def test_full_response_with_validators(self) -> None:
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), DATA)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_not_modified(self) -> None:
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_range_request(self) -> None:
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), DATA[10:20])
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(response["Content-Length"], "10")
+
+    def test_stale_if_range_sends_whole_file(self) -> None:
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"stale"'
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_unsatisfiable_range(self) -> None:
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+
+    def test_mutable_names_get_short_max_age(self) -> None:
+        name = default_storage.save("uploads/file.bin", ContentFile(DATA))
+
+        with self.settings(MEDIA_CACHE_MAX_AGE=60):
+            response = self.client.get(f"/media/{name}")
+
+        self.assertEqual(response["Cache-Control"], "public, max-age=60")
+
+    def test_missing_and_escaping_paths(self) -> None:
+        self.assertEqual(self.client.get("/media/missing").status_code, 404)
+        self.assertEqual(self.client.get("/media/blobs").status_code, 404)
+        self.assertIn(
+            self.client.get("/media/../manage.py").status_code, (400, 404)
+        )
+
+    @override_settings(MEDIA_SENDFILE="x-accel-redirect")
+    def test_accel_redirect(self) -> None:
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media/{self.blob}"
+        )
+        self.assertEqual(response.content, b"")
+
+    @override_settings(MEDIA_SENDFILE="x-sendfile")
+    def test_sendfile(self) -> None:
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            response["X-Sendfile"], content_addressed_storage.path(self.blob)
+        )
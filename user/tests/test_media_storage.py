@@ -0,0 +1,117 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.models import MediaBlob, Posts
+from user.storage import blob_name, content_addressed_storage
+from user.tests.test_images import make_image
+from user.tests.test_posts_api import create_test_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    MEDIA_BLOB_GRACE_PERIOD=0,
+    IMAGE_PIPELINE_SYNC=True,
+)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+        self.image = make_image()
+        self.name = blob_name(
+            hashlib.sha256(self.image).hexdigest(), ".jpg"
+        )
+
+    def upload(self) -> Posts:
+        upload = SimpleUploadedFile(
+            "Photo.JPG", self.image, content_type="image/jpeg"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("user:posts-list"),
+                {"content": "Photo", "image": upload},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return Posts.objects.get(id=response.data["id"])
+
+    def test_storage_names_files_by_digest(self) -> None:
+        name = content_addressed_storage.save(
+            "uploads/posts/photo.jpg", ContentFile(self.image)
+        )
+
+        self.assertEqual(name, self.name)
+        with content_addressed_storage.open(name) as stored:
+            self.assertEqual(stored.read(), self.image)
+
+    def test_content_is_spooled_outside_media_root(self) -> None:
+        with tempfile.TemporaryDirectory() as spool:
+            with self.settings(FILE_UPLOAD_TEMP_DIR=spool):
+                content_addressed_storage.save(
+                    "photo.jpg", ContentFile(self.image)
+                )
+            self.assertEqual(os.listdir(spool), [])
+
+        self.assertFalse(
+            os.path.exists(os.path.join(MEDIA_ROOT, "blobs", "tmp"))
+        )
+
+    def test_identical_uploads_share_one_blob(self) -> None:
+        first = self.upload()
+        second = self.upload()
+
+        self.assertEqual(first.image.name, self.name)
+        self.assertEqual(second.image.name, self.name)
+        self.assertEqual(second.image_variants, first.image_variants)
+        self.assertEqual(MediaBlob.objects.get(name=self.name).ref_count, 2)
+        directory = os.path.dirname(content_addressed_storage.path(self.name))
+        self.assertEqual(
+            [name for name in os.listdir(directory) if name != "variants"],
+            [os.path.basename(self.name)],
+        )
+
+    def test_blob_is_deleted_with_its_last_reference(self) -> None:
+        first = self.upload()
+        second = self.upload()
+        path = content_addressed_storage.path(self.name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaBlob.objects.filter(name=self.name).exists())
+
+    def test_command_collects_unreferenced_blobs(self) -> None:
+        name = content_addressed_storage.save(
+            "photo.jpg", ContentFile(self.image)
+        )
+        post = Posts.objects.create(user=self.user, content="Photo")
+        Posts.objects.filter(id=post.id).update(image=name)
+
+        call_command("collect_media_blobs", "--recount", stdout=StringIO())
+        self.assertTrue(content_addressed_storage.exists(name))
+
+        Posts.objects.filter(id=post.id).update(image="")
+        call_command("collect_media_blobs", "--recount", stdout=StringIO())
+        self.assertFalse(content_addressed_storage.exists(name))
@@ -0,0 +1,131 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from prometheus_client.values import MultiProcessValue
+from rest_framework.test import APIClient
+
+from user.models import Posts
+from user.tests.test_posts_api import create_test_user
+
+METRICS_URL = reverse("metrics")
+POSTS_URL = reverse("user:posts-list")
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+        Posts.objects.create(user=self.user, content="Hello")
+
+    def test_requests_are_recorded_per_view(self) -> None:
+        view = {"view": "user:posts-list"}
+        requests = sample(
+            "http_requests_total", method="GET", status="200", **view
+        )
+        observed = sample(
+            "http_request_duration_seconds_count", method="GET", **view
+        )
+        queries = sample("db_queries_per_request_sum", **view)
+
+        self.client.get(POSTS_URL)
+
+        self.assertEqual(
+            sample("http_requests_total", method="GET", status="200", **view),
+            requests + 1,
+        )
+        self.assertEqual(
+            sample(
+                "http_request_duration_seconds_count", method="GET", **view
+            ),
+            observed + 1,
+        )
+        self.assertGreater(
+            sample("db_queries_per_request_sum", **view), queries
+        )
+        self.assertGreater(
+            sample("http_response_size_bytes_count", **view), 0
+        )
+
+    def test_unresolved_paths_share_one_label(self) -> None:
+        self.client.get("/no/such/page/")
+
+        self.assertGreater(
+            sample(
+                "http_requests_total",
+                view="<unresolved>",
+                method="GET",
+                status="404",
+            ),
+            0,
+        )
+
+    def test_exposition(self) -> None:
+        self.client.get(POSTS_URL)
+
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response["Content-Type"])
+        self.assertIn(
+            b'http_requests_total{method="GET",status="200",'
+            b'view="user:posts-list"}',
+            response.content,
+        )
+        self.assertIn(b"cache_lookups_total", response.content)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self) -> None:
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 401)
+
+        response = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer secreT"
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_only_allowed_networks_scrape_without_token(self) -> None:
+        response = self.client.get(METRICS_URL, REMOTE_ADDR="203.0.113.7")
+        self.assertEqual(response.status_code, 403)
+
+        with self.settings(METRICS_ALLOWED_NETWORKS=["203.0.113.0/24"]):
+            response = self.client.get(
+                METRICS_URL, REMOTE_ADDR="203.0.113.7"
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+
+    def test_multiprocess_values_are_summed(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.dict(
+                    os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}
+            ):
+                for pid in (101, 102):
+                    value_class = MultiProcessValue(lambda: pid)
+                    value_class(
+                        "counter",
+                        "worker_requests",
+                        "worker_requests_total",
+                        ("view",),
+                        ("user:users",),
+                        "",
+                    ).inc(2)
+
+                response = self.client.get(METRICS_URL)
+
+        self.assertIn(
+            b'worker_requests_total{view="user:users"} 4.0',
+            response.content,
+        )
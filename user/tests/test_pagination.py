@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.models import Posts, Comment
+from user.tests.test_posts_api import create_test_user
+
+POST_URL = reverse("user:posts-list")
+COMMENTS_URL = reverse("user:comment-list")
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+        self.posts = [
+            Posts.objects.create(user=self.user, content=f"Post {i}")
+            for i in range(5)
+        ]
+
+    def collect_pages(self, url: str) -> list[list[int]]:
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([item["id"] for item in response.data["results"]])
+            url = response.data["next"]
+        return pages
+
+    def test_pages_walk_feed_newest_first(self) -> None:
+        pages = self.collect_pages(f"{POST_URL}?page_size=2")
+
+        expected = [post.id for post in reversed(self.posts)]
+        self.assertEqual(pages, [expected[:2], expected[2:4], expected[4:]])
+
+    def test_ties_on_created_at_are_broken_by_id(self) -> None:
+        Posts.objects.update(created_at=self.posts[0].created_at)
+
+        pages = self.collect_pages(f"{POST_URL}?page_size=2")
+
+        ids = [post_id for page in pages for post_id in page]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(ids), len(self.posts))
+
+    def test_previous_link_returns_to_prior_page(self) -> None:
+        first = self.client.get(f"{POST_URL}?page_size=2")
+        second = self.client.get(first.data["next"])
+
+        previous = self.client.get(second.data["previous"])
+
+        self.assertEqual(previous.data["results"], first.data["results"])
+
+    def test_page_size_is_capped(self) -> None:
+        with self.settings(PAGINATION_MAX_PAGE_SIZE=3):
+            response = self.client.get(f"{POST_URL}?page_size=50")
+
+        self.assertEqual(len(response.data["results"]), 3)
+
+    def test_invalid_cursor(self) -> None:
+        response = self.client.get(f"{COMMENTS_URL}?cursor=garbage")
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_comments_are_paginated(self) -> None:
+        for i in range(3):
+            Comment.objects.create(
+                user=self.user, posts=self.posts[0], content=f"Comment {i}"
+            )
+
+        pages = self.collect_pages(f"{COMMENTS_URL}?page_size=2")
+
+        self.assertEqual([len(page) for page in pages], [2, 1])
@@ -0,0 +1,109 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import Posts, User
+from user.perf import RequestProfile, activate, deactivate, timed
+from user.tests.test_posts_api import create_test_user
+
+POSTS_URL = reverse("user:posts-list")
+
+
+def timings(header: str) -> dict[str, str]:
+    return {
+        metric.split(";")[0]: metric for metric in header.split(", ")
+    }
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self) -> None:
+        self.user = create_test_user("test@example.com", "password")
+        Posts.objects.create(user=self.user, content="Hello")
+
+    def get_posts(self):
+        # Middleware is loaded by the first request of each client.
+        client = APIClient()
+        token = RefreshToken.for_user(self.user).access_token
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client.get(POSTS_URL)
+
+    def test_disabled_by_default(self) -> None:
+        response = self.get_posts()
+
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(PERF_INSTRUMENTATION=True)
+    def test_server_timing_header(self) -> None:
+        response = self.get_posts()
+
+        metrics = timings(response["Server-Timing"])
+        self.assertEqual(
+            set(metrics),
+            {"auth", "view", "serialize", "render", "total", "db"},
+        )
+        self.assertRegex(metrics["db"], r'^db;dur=[\d.]+;desc="\d+ queries"$')
+
+    @override_settings(
+        PERF_INSTRUMENTATION=True,
+        PERF_SLOW_REQUEST_MS=0,
+        PERF_TRACEMALLOC_SAMPLE_RATE=1.0,
+    )
+    def test_slow_requests_are_logged_with_plans(self) -> None:
+        with self.assertLogs("user.perf", "WARNING") as logs:
+            response = self.get_posts()
+
+        self.assertIn("mem", timings(response["Server-Timing"]))
+        message = logs.output[0]
+        self.assertIn(f"Slow request GET {POSTS_URL} 200", message)
+        self.assertIn("SELECT", message)
+        # SQLite's EXPLAIN QUERY PLAN rows.
+        self.assertRegex(message, r"SCAN|SEARCH")
+        self.assertIn("Allocated", message)
+
+    @override_settings(PERF_INSTRUMENTATION=True, PERF_SLOW_REQUEST_MS=0)
+    def test_query_parameters_are_not_logged(self) -> None:
+        with self.assertLogs("user.perf", "WARNING") as logs:
+            response = self.client.post(
+                reverse("user:create"),
+                {"email": "secret@example.com", "password": "hunter22"},
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 201)
+        hashed = User.objects.get(email="secret@example.com").password
+        self.assertIn("INSERT", logs.output[0])
+        self.assertNotIn("secret@example.com", logs.output[0])
+        self.assertNotIn(hashed, logs.output[0])
+
+    @override_settings(PERF_INSTRUMENTATION=True, PERF_SLOW_REQUEST_MS=0)
+    async def test_async_views(self) -> None:
+        with self.assertLogs("user.perf", "WARNING"):
+            response = await self.async_client.post(
+                reverse("user:token_obtain_pair"),
+                {"email": "test@example.com", "password": "password"},
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            timings(response["Server-Timing"])["db"], r'desc="[1-9]\d* '
+        )
+
+
+class TimedTests(TestCase):
+    def test_nested_phases_are_counted_once(self) -> None:
+        profile = RequestProfile()
+        token = activate(profile)
+        try:
+            with timed("serialize"):
+                with timed("serialize"):
+                    pass
+        finally:
+            deactivate(token)
+
+        self.assertEqual(list(profile.durations), ["serialize"])
+        self.assertGreater(profile.durations["serialize"], 0)
+
+    def test_no_op_outside_requests(self) -> None:
+        self.assertIs(timed("serialize"), timed("auth"))
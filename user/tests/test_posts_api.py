@@ -86,19 +86,20 @@ class PostApiTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["id"], post.id)
-        self.assertEqual(response.data[0]["content"], post.content)
-        self.assertEqual(response.data[0]["image"], None)
+        self.assertEqual(len(response.data["results"]), 1)
+        result = response.data["results"][0]
+        self.assertEqual(result["id"], post.id)
+        self.assertEqual(result["content"], post.content)
+        self.assertEqual(result["image"], None)
         created_at_str = datetime.isoformat(
             post.created_at
         ).replace("+00:00", "Z")
-        self.assertEqual(response.data[0]["created_at"], created_at_str)
+        self.assertEqual(result["created_at"], created_at_str)
         updated_at_str = datetime.isoformat(
             post.updated_at
         ).replace("+00:00", "Z")
-        self.assertEqual(response.data[0]["updated_at"], updated_at_str)
-        self.assertEqual(response.data[0]["hashtags"], post.hashtags)
+        self.assertEqual(result["updated_at"], updated_at_str)
+        self.assertEqual(result["hashtags"], post.hashtags)
 
     def test_update_post(self) -> None:
         user = create_test_user("test@example.com", "password")
@@ -31,3 +31,17 @@ class ProfileModelTests(TestCase):
         user.delete()
 
         self.assertEqual(Profile.objects.count(), 0)
+
+    def test_save_keeps_recorded_avatar_variants(self):
+        user = create_test_user("test@example.com", "password")
+        profile = create_test_profile(user, "Test User", "This is a test bio")
+        Profile.objects.filter(pk=profile.pk).update(
+            avatar_variants={"source": "avatar.jpg"}
+        )
+
+        profile.bio = "Updated"
+        profile.save()
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.bio, "Updated")
+        self.assertEqual(profile.avatar_variants, {"source": "avatar.jpg"})
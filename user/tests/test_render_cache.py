@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from user.models import Like, Posts
+from user.render_cache import RenderCache, render_cache
+from user.serializers import PostSerializer
+from user.tests.test_posts_api import create_test_user
+
+POSTS_URL = reverse("user:posts-list")
+
+
+class RenderCacheTests(SimpleTestCase):
+    def test_least_recently_used_entries_are_evicted(self) -> None:
+        cache = RenderCache(max_entries=2)
+        cache.set_many({"a": {"id": 1}, "b": {"id": 2}})
+        cache.get_many(["a"])
+        cache.set_many({"c": {"id": 3}})
+
+        self.assertEqual(cache.get_many(["a", "b", "c"]).keys(), {"a", "c"})
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            },
+            "render": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "render-cache-tests",
+            },
+        }
+    )
+    def test_entries_are_shared_between_processes(self) -> None:
+        RenderCache(shared_alias="render").set_many({"a": {"id": 1}})
+
+        other = RenderCache(shared_alias="render")
+
+        self.assertEqual(other.get_many(["a", "b"]), {"a": {"id": 1}})
+
+
+class RenderCacheApiTests(TestCase):
+    def setUp(self) -> None:
+        render_cache.clear()
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.other = create_test_user("other@example.com", "password")
+        self.client.force_authenticate(self.user)
+        self.posts = [
+            Posts.objects.create(user=self.user, content=f"Post {number}")
+            for number in range(3)
+        ]
+
+    @override_settings(FAST_SERIALIZATION=False)
+    def test_list_only_serializes_misses(self) -> None:
+        first = self.client.get(POSTS_URL).data["results"]
+
+        rendered = []
+        render = PostSerializer._render
+
+        def spy(serializer, instance, fields):
+            rendered.append({field.field_name for field in fields})
+            return render(serializer, instance, fields)
+
+        with mock.patch.object(PostSerializer, "_render", spy):
+            second = self.client.get(POSTS_URL).data["results"]
+
+        self.assertEqual(second, first)
+        self.assertEqual(list(second[0]), list(PostSerializer.Meta.fields))
+        # Only the volatile fields were rendered again.
+        self.assertEqual(
+            rendered, [set(PostSerializer.volatile_fields)] * len(second)
+        )
+
+    def test_saved_changes_replace_cached_representation(self) -> None:
+        self.client.get(POSTS_URL)
+        post = self.posts[0]
+        post.content = "Edited"
+        post.save()
+
+        results = self.client.get(POSTS_URL).data["results"]
+
+        edited = next(item for item in results if item["id"] == post.id)
+        self.assertEqual(edited["content"], "Edited")
+
+    def test_counters_are_not_served_from_cache(self) -> None:
+        post = self.posts[0]
+        url = reverse("user:posts-detail", kwargs={"pk": post.id})
+        self.client.get(url)
+
+        Like.objects.create(user=self.other, posts=post)
+
+        self.assertEqual(self.client.get(url).data["like_count"], 1)
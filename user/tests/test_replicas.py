@@ -0,0 +1,222 @@
+from collections import Counter
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, connections, router, transaction
+from django.test import (
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import Posts
+from user.replicas import (
+    ReplicaRouter,
+    ReplicaSet,
+    check_pin_cache,
+    pin_user,
+    replica_reads,
+)
+from user.revocation import revocations
+from user.tests.test_metrics import sample
+from user.tests.test_posts_api import create_test_user
+
+POSTS_URL = reverse("user:posts-list")
+LIKES_URL = reverse("user:like-list")
+
+
+class ReplicaSetTests(SimpleTestCase):
+    def test_replicas_are_chosen_by_weight(self) -> None:
+        replicas = ReplicaSet({"a": 3, "b": 1, "c": 0})
+
+        chosen = Counter(replicas.choose() for _ in range(4000))
+
+        self.assertEqual(set(chosen), {"a", "b"})
+        self.assertAlmostEqual(chosen["a"] / 4000, 0.75, delta=0.05)
+
+    def test_replicas_marked_down_are_skipped(self) -> None:
+        replicas = ReplicaSet({"a": 1, "b": 1}, retry_after=60)
+
+        replicas.mark_down("a")
+
+        self.assertEqual(replicas.available(), ["b"])
+        self.assertEqual({replicas.choose() for _ in range(50)}, {"b"})
+        replicas.retry_after = 0
+        replicas.mark_down("b")
+        self.assertEqual(replicas.available(), ["b"])
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Requests against a "replica" alias mirroring the test database and a
+    "broken" one whose file cannot be opened. They are added after the
+    test case guarded the configured aliases, and are not flushed.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        connections.settings["replica"] = {**connections.settings["default"]}
+        connections.settings["broken"] = {
+            **connections.settings["default"],
+            "NAME": "/nonexistent/directory/broken.sqlite3",
+        }
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        for alias in ("replica", "broken"):
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        cache.clear()
+        revocations.clear()
+        author = create_test_user("author@example.com", "password")
+        self.post = Posts.objects.create(user=author, content="Hello")
+        self.user = create_test_user("reader@example.com", "password")
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION="Bearer "
+            f"{RefreshToken.for_user(self.user).access_token}"
+        )
+
+    def get_posts(self) -> tuple[list, list]:
+        """Queries of a feed request on the replica and the primary."""
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            with CaptureQueriesContext(connection) as primary:
+                response = self.client.get(POSTS_URL)
+        self.assertEqual(response.status_code, 200)
+        return replica.captured_queries, primary.captured_queries
+
+    @override_settings(DATABASE_REPLICAS={"replica": 1})
+    def test_safe_requests_read_from_a_replica(self) -> None:
+        routed = sample("db_read_routes_total", alias="replica")
+
+        replica, primary = self.get_posts()
+
+        self.assertTrue(replica)
+        self.assertFalse(
+            [query for query in primary if "user_posts" in query["sql"]]
+        )
+        self.assertEqual(
+            sample("db_read_routes_total", alias="replica"), routed + 1
+        )
+
+    @override_settings(DATABASE_REPLICAS={"replica": 1})
+    def test_writers_read_from_the_primary(self) -> None:
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            response = self.client.post(
+                LIKES_URL, {"user": self.user.id, "posts": self.post.id}
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(replica.captured_queries)
+
+        replica, primary = self.get_posts()
+        self.assertFalse(replica)
+        self.assertTrue(primary)
+
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            Posts.objects.create(user=self.user, content="Mine")
+        cache.clear()
+        replica, primary = self.get_posts()
+        self.assertTrue(replica)
+
+    @override_settings(DATABASE_REPLICAS={"replica": 1})
+    def test_access_tokens_are_verified_once(self) -> None:
+        verify = authentication.JWTAuthentication.get_validated_token
+
+        with mock.patch.object(
+                authentication.JWTAuthentication,
+                "get_validated_token",
+                autospec=True,
+                side_effect=verify,
+        ) as verified:
+            self.get_posts()
+
+        self.assertEqual(verified.call_count, 1)
+
+    @override_settings(DATABASE_REPLICAS={"broken": 1}, REPLICA_RETRY_AFTER=60)
+    def test_unavailable_replicas_fall_back_to_the_primary(self) -> None:
+        failures = sample("db_replica_unavailable_total", alias="broken")
+
+        with self.assertLogs("user.replicas", "WARNING") as logs:
+            for _ in range(2):
+                self.assertTrue(self.get_posts()[1])
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(
+            sample("db_replica_unavailable_total", alias="broken"),
+            failures + 1,
+        )
+        with self.assertLogs("user.replicas", "WARNING"):
+            replicas = ReplicaSet({"broken": 1, "replica": 1})
+            self.assertEqual(
+                [replicas.connect() for _ in range(5)], ["replica"] * 5
+            )
+
+    @override_settings(DATABASE_REPLICAS={"replica": 1})
+    def test_router(self) -> None:
+        self.assertIsNone(ReplicaRouter().db_for_read(Posts))
+        with replica_reads(ReplicaSet({"replica": 1})):
+            self.assertEqual(Posts.objects.all().db, "replica")
+            self.assertEqual(router.db_for_write(Posts), "default")
+            with transaction.atomic():
+                self.assertEqual(Posts.objects.all().db, "default")
+            pin_user(self.user.id)
+            self.assertEqual(Posts.objects.all().db, "default")
+
+        self.assertFalse(router.allow_migrate("replica", "user"))
+        self.assertIsNot(router.allow_migrate("default", "user"), False)
+
+    @override_settings(DATABASE_REPLICAS={"replica": 1})
+    async def test_async_requests_read_from_a_replica(self) -> None:
+        routed = sample("db_read_routes_total", alias="replica")
+
+        response = await self.async_client.get(
+            reverse("user-async:posts-list"),
+            headers={
+                "Authorization": "Bearer "
+                f"{RefreshToken.for_user(self.user).access_token}"
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sample("db_read_routes_total", alias="replica"), routed + 1
+        )
+
+
+class PinCacheCheckTests(SimpleTestCase):
+    def test_replicas_need_a_shared_pin_cache(self) -> None:
+        caches = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            },
+            "shared": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://localhost:6379",
+            },
+        }
+
+        with override_settings(CACHES=caches, DATABASE_REPLICAS={}):
+            self.assertEqual(check_pin_cache(None), [])
+        with override_settings(
+                CACHES=caches, DATABASE_REPLICAS={"replica": 1}
+        ):
+            self.assertEqual(
+                [error.id for error in check_pin_cache(None)], ["user.E002"]
+            )
+            with self.settings(REPLICA_PIN_CACHE_ALIAS="missing"):
+                self.assertEqual(
+                    [error.id for error in check_pin_cache(None)],
+                    ["user.E001"],
+                )
+            with self.settings(REPLICA_PIN_CACHE_ALIAS="shared"):
+                self.assertEqual(check_pin_cache(None), [])
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.models import RevokedToken
+from user.revocation import RevocationList, revocations
+from user.tests.test_posts_api import create_test_user
+
+MANAGE_URL = reverse("user:manage")
+REFRESH_URL = reverse("user:token_refresh")
+VERIFY_URL = reverse("user:token_verify")
+
+
+class TokenRevocationTests(TestCase):
+    def setUp(self) -> None:
+        revocations.clear()
+        self.user = create_test_user("test@example.com", "password")
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}"
+        )
+
+    def tearDown(self) -> None:
+        revocations.clear()
+
+    def test_logout_revokes_refresh_and_access_tokens(self) -> None:
+        response = self.client.post(MANAGE_URL, {"refresh": str(self.refresh)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(MANAGE_URL).status_code, 401)
+        response = self.client.post(
+            REFRESH_URL, {"refresh": str(self.refresh)}
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(VERIFY_URL, {"token": str(self.refresh)})
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_refresh_token_on_logout(self) -> None:
+        response = self.client.post(MANAGE_URL, {"refresh": "invalid"})
+
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(TOKEN_REVOCATION_CHECK_ACCESS=False)
+    def test_access_checks_can_be_turned_off(self) -> None:
+        self.client.post(MANAGE_URL)
+
+        self.assertEqual(self.client.get(MANAGE_URL).status_code, 200)
+
+    # simplejwt's modules keep the settings object they imported.
+    @mock.patch.object(api_settings, "ROTATE_REFRESH_TOKENS", True)
+    @mock.patch.object(api_settings, "BLACKLIST_AFTER_ROTATION", True)
+    def test_rotated_refresh_tokens_are_revoked(self) -> None:
+        client = APIClient()
+
+        response = client.post(REFRESH_URL, {"refresh": str(self.refresh)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("refresh", response.data)
+        response = client.post(REFRESH_URL, {"refresh": str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_checks_are_answered_from_memory(self) -> None:
+        other_process = RevocationList(sync_interval=60)
+        self.assertFalse(other_process.is_revoked(self.refresh["jti"]))
+
+        self.client.post(MANAGE_URL, {"refresh": str(self.refresh)})
+        with self.assertNumQueries(0):
+            self.assertFalse(other_process.is_revoked(self.refresh["jti"]))
+
+        other_process.sync(force=True)
+        with self.assertNumQueries(0):
+            self.assertTrue(other_process.is_revoked(self.refresh["jti"]))
+
+    def test_purge_deletes_expired_revocations(self) -> None:
+        RevokedToken.objects.create(
+            jti="expired", expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        RevokedToken.objects.create(
+            jti="live", expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        out = StringIO()
+
+        call_command("purge_revoked_tokens", stdout=out)
+
+        self.assertIn("Deleted 1 expired revocations.", out.getvalue())
+        self.assertEqual(
+            list(RevokedToken.objects.values_list("jti", flat=True)),
+            ["live"],
+        )
@@ -0,0 +1,155 @@
+import datetime
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from user.models import Comment, Like, Posts, Profile, User
+from user.renderers import ORJSONRenderer
+from user.row_serializers import (
+    CommentRowSerializer,
+    PostRowSerializer,
+    ProfileRowSerializer,
+    UserRowSerializer,
+)
+from user.serializers import (
+    CommentSerializer,
+    PostSerializer,
+    ProfileSerializer,
+    UserSerializer,
+)
+from user.tests.test_images import make_image
+from user.tests.test_posts_api import create_test_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    def test_output_matches_json_renderer(self) -> None:
+        data = {
+            "text": "Zażółć\u2028gęślą",
+            "at": datetime.datetime(
+                2023, 6, 1, 12, 30, 5, 1234, tzinfo=datetime.timezone.utc
+            ),
+            "day": datetime.date(2023, 6, 1),
+            "price": Decimal("1.50"),
+            1: [None, True, 1.25],
+        }
+
+        self.assertEqual(
+            ORJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_indented_output_uses_json_encoder(self) -> None:
+        rendered = ORJSONRenderer().render(
+            {"a": 1}, "application/json; indent=4"
+        )
+
+        self.assertEqual(rendered, b'{\n    "a": 1\n}')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PIPELINE_ENABLED=False)
+class RowSerializerTests(TestCase):
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        self.user = create_test_user("test@example.com", "password")
+        self.other = create_test_user("other@example.com", "password")
+        self.post = Posts.objects.create(
+            user=self.user,
+            content="Photo",
+            hashtags="#summer",
+            image=SimpleUploadedFile("photo.jpg", make_image((20, 10))),
+        )
+        Posts.objects.filter(id=self.post.id).update(
+            image_variants={
+                "source": self.post.image.name,
+                "thumbnail": {"webp": "blobs/variants/photo-thumbnail.webp"},
+            }
+        )
+        Posts.objects.create(user=self.other, content="Text only")
+        Like.objects.create(user=self.other, posts=self.post)
+        Comment.objects.create(
+            user=self.other, posts=self.post, content="Nice"
+        )
+        Profile.objects.create(user=self.user, name="Test", bio=None)
+        Profile.objects.create(
+            user=self.other,
+            name="Other",
+            bio="Bio",
+            avatar=SimpleUploadedFile("avatar.jpg", make_image((10, 10))),
+        )
+        self.context = {
+            "request": Request(APIRequestFactory().get("/api/user/"))
+        }
+
+    def assert_same_output(
+            self, serializer_class, row_serializer_class, queryset
+    ) -> None:
+        expected = serializer_class(
+            queryset, many=True, context=self.context
+        ).data
+        row_serializer = row_serializer_class(context=self.context)
+        rows = queryset.values(
+            *row_serializer.columns, *queryset.query.annotation_select
+        )
+
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            with self.subTest(renderer=type(renderer).__name__):
+                self.assertEqual(
+                    renderer.render(
+                        row_serializer.to_representations(list(rows))
+                    ),
+                    JSONRenderer().render(expected),
+                )
+
+    def test_posts(self) -> None:
+        self.assert_same_output(
+            PostSerializer, PostRowSerializer, Posts.objects.order_by("id")
+        )
+
+    def test_profiles(self) -> None:
+        self.assert_same_output(
+            ProfileSerializer,
+            ProfileRowSerializer,
+            Profile.objects.order_by("id"),
+        )
+
+    def test_comments(self) -> None:
+        self.assert_same_output(
+            CommentSerializer,
+            CommentRowSerializer,
+            Comment.objects.order_by("id"),
+        )
+
+    def test_users(self) -> None:
+        self.assert_same_output(
+            UserSerializer,
+            UserRowSerializer,
+            User.objects.with_follow_counts().order_by("id"),
+        )
+
+    @override_settings(RENDER_CACHE_ENABLED=False)
+    def test_posts_without_render_cache(self) -> None:
+        self.test_posts()
+
+    def test_list_endpoint_output_is_unchanged(self) -> None:
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse("user:posts-list")
+
+        fast = client.get(url)
+        with self.settings(FAST_SERIALIZATION=False):
+            slow = client.get(url)
+
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(len(fast.data["results"]), 1)
@@ -0,0 +1,72 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from user.models import Posts, User
+from user.tests.test_follow_api import create_test_follow
+from user.tests.test_posts_api import create_test_user
+
+POST_URL = reverse("user:posts-list")
+
+
+class PostSearchApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("test@example.com", "password")
+        self.client.force_authenticate(self.user)
+
+    def search(self, query: str) -> list[int]:
+        response = self.client.get(POST_URL, {"content": query})
+        return [item["id"] for item in response.data["results"]]
+
+    def create_post(self, content: str, user: User = None) -> Posts:
+        return Posts.objects.create(user=user or self.user, content=content)
+
+    def test_search_matches_whole_words(self) -> None:
+        beach = self.create_post("A day at the beach")
+        self.create_post("Beachball tournament")
+
+        self.assertEqual(self.search("beach"), [beach.id])
+
+    def test_results_are_ranked_by_relevance(self) -> None:
+        once = self.create_post("Coffee and a long walk in the park")
+        twice = self.create_post("Coffee, more coffee")
+
+        self.assertEqual(self.search("coffee"), [twice.id, once.id])
+
+    def test_index_follows_updates_and_deletes(self) -> None:
+        post = self.create_post("Original text")
+        post.content = "Rewritten text"
+        post.save()
+
+        self.assertEqual(self.search("original"), [])
+        self.assertEqual(self.search("rewritten"), [post.id])
+
+        post.delete()
+        self.assertEqual(self.search("rewritten"), [])
+
+    def test_search_is_scoped_to_feed(self) -> None:
+        stranger = create_test_user("stranger@example.com", "password")
+        friend = create_test_user("friend@example.com", "password")
+        create_test_follow(follower=self.user, followed=friend)
+        self.create_post("Secret plans", user=stranger)
+        friends_post = self.create_post("Secret recipe", user=friend)
+
+        self.assertEqual(self.search("secret"), [friends_post.id])
+
+    def test_search_results_page_with_cursor(self) -> None:
+        posts = [self.create_post(f"Match number {i}") for i in range(5)]
+
+        seen = []
+        url = f"{POST_URL}?content=match&page_size=2"
+        while url:
+            response = self.client.get(url)
+            seen += [item["id"] for item in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertCountEqual(seen, [post.id for post in posts])
+
+    def test_user_input_is_not_fts_syntax(self) -> None:
+        self.create_post("Quoted text")
+
+        self.assertEqual(self.search('"quoted OR ('), [])
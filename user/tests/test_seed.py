@@ -0,0 +1,172 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from user.models import Follow, Like, Posts, TimelineEntry, User
+from user.seed import Loader, seed_graph
+
+
+class SeedGraphTests(TestCase):
+    def test_generates_power_law_graph(self) -> None:
+        counts = seed_graph(
+            200,
+            posts_per_user=2,
+            follows_per_user=10,
+            likes=1000,
+            seed=1,
+        )
+
+        self.assertEqual(counts["users"], 200)
+        self.assertEqual(User.objects.count(), 200)
+        self.assertEqual(Follow.objects.count(), counts["follows"])
+        self.assertEqual(Posts.objects.count(), counts["posts"])
+        self.assertEqual(Like.objects.count(), counts["likes"])
+        self.assertGreater(counts["likes"], 500)
+
+        followers = list(
+            User.objects.annotate(total=Count("followers")).order_by(
+                "-total"
+            ).values_list("email", "total")
+        )
+        self.assertEqual(followers[0][0], "user0@seed.example")
+        self.assertGreater(followers[0][1], 10 * followers[100][1])
+
+    def test_users_share_one_password_hash(self) -> None:
+        with mock.patch(
+                "user.seed.make_password", return_value="hash"
+        ) as make_password:
+            seed_graph(20, posts_per_user=0, follows_per_user=0)
+
+        make_password.assert_called_once_with("password")
+        self.assertEqual(
+            set(User.objects.values_list("password", flat=True)), {"hash"}
+        )
+
+    def test_seeding_again_reuses_users(self) -> None:
+        seed_graph(10, posts_per_user=0, follows_per_user=2, seed=1)
+        counts = seed_graph(10, posts_per_user=0, follows_per_user=0)
+
+        self.assertEqual(counts["users"], 10)
+        self.assertEqual(User.objects.count(), 10)
+
+
+class LoaderTests(TestCase):
+    def test_keeps_given_timestamps(self) -> None:
+        created_at = datetime(2020, 1, 2, tzinfo=timezone.utc)
+        loader = Loader()
+        loader.add("user", {"email": "test@example.com", "password": "pw"})
+        loader.add(
+            "post",
+            {
+                "user": "test@example.com",
+                "content": "Old",
+                "created_at": created_at.isoformat(),
+            },
+        )
+        loader.close()
+
+        post = Posts.objects.get()
+        self.assertEqual(post.created_at, created_at)
+        self.assertEqual(post.updated_at, created_at)
+        self.assertTrue(Posts._meta.get_field("created_at").auto_now_add)
+        self.assertTrue(User.objects.get().check_password("pw"))
+
+    def test_skips_unknown_references(self) -> None:
+        loader = Loader()
+        loader.add("user", {"email": "test@example.com"})
+        loader.add(
+            "follow",
+            {"follower": "test@example.com", "followed": "x@example.com"},
+        )
+        loader.add("like", {"user": "test@example.com", "post": 1})
+
+        counts = loader.close()
+
+        self.assertEqual(counts["follow"], (0, 1))
+        self.assertEqual(counts["like"], (0, 1))
+        self.assertFalse(User.objects.get().has_usable_password())
+
+    def test_rejects_unknown_record_type(self) -> None:
+        with self.assertRaises(ValueError):
+            Loader().add("comment", {})
+
+
+class SeedDataCommandTests(TestCase):
+    def write(self, directory: str, name: str, content: str) -> str:
+        path = os.path.join(directory, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_loads_files_and_rebuilds_derived_data(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            users = self.write(
+                directory,
+                "users.csv",
+                "email,password\na@example.com,pw\nb@example.com,pw\n",
+            )
+            records = self.write(
+                directory,
+                "records.ndjson",
+                "\n".join(
+                    json.dumps(record)
+                    for record in [
+                        {
+                            "type": "post",
+                            "data": {
+                                "user": "a@example.com",
+                                "content": "Hi #seed",
+                            },
+                        },
+                        {
+                            "type": "follow",
+                            "data": {
+                                "follower": "b@example.com",
+                                "followed": "a@example.com",
+                            },
+                        },
+                    ]
+                ),
+            )
+            call_command(
+                "seed_data", users, "--type", "user", stdout=StringIO()
+            )
+            call_command("seed_data", records, stdout=StringIO())
+
+            post = Posts.objects.get()
+            likes = self.write(
+                directory,
+                "likes.csv",
+                f"user,post\na@example.com,{post.id}\n"
+                f"b@example.com,{post.id}\n",
+            )
+            call_command(
+                "seed_data", likes, "--type", "like", stdout=StringIO()
+            )
+
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 2)
+        self.assertEqual(
+            list(post.tags.values_list("name", flat=True)), ["seed"]
+        )
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list("owner__email", flat=True)),
+            {"a@example.com", "b@example.com"},
+        )
+
+    def test_csv_needs_type(self) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write(directory, "users.csv", "email\n")
+            with self.assertRaises(CommandError):
+                call_command("seed_data", path, stdout=StringIO())
+
+    def test_needs_input(self) -> None:
+        with self.assertRaises(CommandError):
+            call_command("seed_data", stdout=StringIO())
@@ -0,0 +1,124 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.models import Comment, Like, Posts, TimelineEntry
+from user.tests.test_follow_api import create_test_follow
+from user.tests.test_posts_api import create_test_user
+
+POST_URL = reverse("user:posts-list")
+
+
+def result_ids(response) -> list[int]:
+    return [item["id"] for item in response.data["results"]]
+
+
+class TimelineApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_test_user("reader@example.com", "password")
+        self.author = create_test_user("author@example.com", "password")
+        self.client.force_authenticate(self.user)
+
+    def test_new_post_fans_out_to_followers(self) -> None:
+        create_test_follow(follower=self.user, followed=self.author)
+        post = Posts.objects.create(user=self.author, content="Hello")
+
+        self.assertTrue(
+            TimelineEntry.objects.filter(owner=self.user, posts=post).exists()
+        )
+        response = self.client.get(POST_URL)
+        self.assertEqual(result_ids(response), [post.id])
+
+    def test_follow_backfills_and_unfollow_prunes(self) -> None:
+        post = Posts.objects.create(user=self.author, content="Earlier")
+
+        follow = create_test_follow(follower=self.user, followed=self.author)
+        response = self.client.get(POST_URL)
+        self.assertEqual(result_ids(response), [post.id])
+
+        response = self.client.delete(
+            reverse("user:follow-detail", kwargs={"pk": follow.id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(
+            TimelineEntry.objects.filter(owner=self.user).exists()
+        )
+        self.assertEqual(self.client.get(POST_URL).data["results"], [])
+
+    def test_unfollowed_posts_are_not_in_feed(self) -> None:
+        Posts.objects.create(user=self.author, content="Not followed")
+
+        response = self.client.get(POST_URL)
+
+        self.assertEqual(response.data["results"], [])
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=0)
+    def test_high_follower_author_is_merged_on_read(self) -> None:
+        create_test_follow(follower=self.user, followed=self.author)
+        post = Posts.objects.create(user=self.author, content="Viral")
+
+        self.assertFalse(
+            TimelineEntry.objects.filter(owner=self.user).exists()
+        )
+        response = self.client.get(POST_URL)
+        self.assertEqual(result_ids(response), [post.id])
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=1)
+    def test_pages_merge_entries_with_high_follower_authors(self) -> None:
+        viral = create_test_user("viral@example.com", "password")
+        create_test_follow(follower=self.user, followed=self.author)
+        create_test_follow(follower=self.user, followed=viral)
+        create_test_follow(follower=self.author, followed=viral)
+        posts = [
+            Posts.objects.create(
+                user=(self.author, viral, self.user)[number % 3],
+                content=f"Post {number}",
+            )
+            for number in range(7)
+        ]
+
+        ids = []
+        url = f"{POST_URL}?page_size=2"
+        while url:
+            response = self.client.get(url)
+            ids += result_ids(response)
+            url = response.data["next"]
+
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+        self.assertFalse(
+            TimelineEntry.objects.filter(
+                owner=self.user, author=viral
+            ).exists()
+        )
+
+    @override_settings(TIMELINE_BACKFILL_LIMIT=1)
+    def test_posts_outside_the_timeline_are_retrievable(self) -> None:
+        older = Posts.objects.create(user=self.author, content="Older")
+        Posts.objects.create(user=self.author, content="Newer")
+        create_test_follow(follower=self.user, followed=self.author)
+
+        response = self.client.get(
+            reverse("user:posts-detail", kwargs={"pk": older.id})
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn(older.id, result_ids(self.client.get(POST_URL)))
+
+    def test_posts_of_unfollowed_authors_are_not_found(self) -> None:
+        post = Posts.objects.create(user=self.author, content="Theirs")
+        Comment.objects.create(user=self.author, posts=post, content="Hi")
+
+        for method, name in (
+                ("get", "posts-detail"),
+                ("get", "posts-comments"),
+                ("put", "posts-like"),
+        ):
+            response = getattr(self.client, method)(
+                reverse(f"user:{name}", kwargs={"pk": post.id})
+            )
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND, name
+            )
+        self.assertFalse(Like.objects.filter(posts=post).exists())
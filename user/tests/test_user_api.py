@@ -84,8 +84,8 @@ class UserSerializerTestCase(TestCase):
             "id": user.id,
             "email": "test@example.com",
             "is_staff": False,
-            "following": [],
-            "followers": []
+            "following_count": 0,
+            "followers_count": 0
         }
 
         self.assertEqual(serializer.data, expected_data)
@@ -0,0 +1,201 @@
+from django.conf import settings
+from django.db.models import F, Q, QuerySet, Window
+from django.db.models.functions import RowNumber
+
+from user.follow_cache import follow_graph
+from user.models import User, Follow, Posts, TimelineEntry
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def fanout_follower_limit() -> int:
+    return getattr(settings, "TIMELINE_FANOUT_FOLLOWER_LIMIT", 10000)
+
+
+def backfill_limit() -> int:
+    return getattr(settings, "TIMELINE_BACKFILL_LIMIT", 200)
+
+
+def is_high_follower_author(author_id: int) -> bool:
+    """Authors above the limit are merged into feeds at read time."""
+    return follow_graph.followers_count(author_id) > fanout_follower_limit()
+
+
+def _write_entries(post: Posts, owner_ids) -> None:
+    batch = []
+    for owner_id in owner_ids:
+        batch.append(
+            TimelineEntry(
+                owner_id=owner_id,
+                posts_id=post.id,
+                author_id=post.user_id,
+                created_at=post.created_at,
+            )
+        )
+        if len(batch) >= FANOUT_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post: Posts) -> None:
+    """Push a new post into its author's and followers' timelines."""
+    _write_entries(post, [post.user_id])
+
+    if is_high_follower_author(post.user_id):
+        return
+
+    follower_ids = Follow.objects.filter(
+        followed_id=post.user_id
+    ).values_list("follower_id", flat=True)
+    _write_entries(
+        post, follower_ids.iterator(chunk_size=FANOUT_BATCH_SIZE)
+    )
+
+
+def _copy_recent_posts(owner_id: int, author_id: int) -> None:
+    recent_posts = Posts.objects.filter(
+        user_id=author_id
+    ).only("id", "user_id", "created_at")[:backfill_limit()]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                owner_id=owner_id,
+                posts_id=post.id,
+                author_id=post.user_id,
+                created_at=post.created_at,
+            )
+            for post in recent_posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill_follow(follower_id: int, followed_id: int) -> None:
+    """Copy the most recent posts of a newly followed user."""
+    if not is_high_follower_author(followed_id):
+        _copy_recent_posts(follower_id, followed_id)
+
+
+def backfill_follows(follower_id: int, followed_ids: list[int]) -> None:
+    """`backfill_follow` for many followed users in one INSERT."""
+    limit = fanout_follower_limit()
+    authors = [
+        author_id
+        for author_id, followers_count in follow_graph.followers_counts(
+            followed_ids
+        ).items()
+        if followers_count <= limit
+    ]
+    if not authors:
+        return
+
+    recent_posts = Posts.objects.filter(user_id__in=authors).annotate(
+        recency=Window(
+            RowNumber(),
+            partition_by=F("user_id"),
+            order_by=F("created_at").desc(),
+        )
+    ).filter(recency__lte=backfill_limit()).only("id", "user_id", "created_at")
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                owner_id=follower_id,
+                posts_id=post.id,
+                author_id=post.user_id,
+                created_at=post.created_at,
+            )
+            for post in recent_posts
+        ],
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune_follow(follower_id: int, followed_id: int) -> None:
+    """Drop an unfollowed user's posts from the follower's timeline."""
+    TimelineEntry.objects.filter(
+        owner_id=follower_id, author_id=followed_id
+    ).delete()
+
+
+def rebuild_timeline(user: User) -> None:
+    """Rebuild a user's timeline from their own posts and follows."""
+    TimelineEntry.objects.filter(owner=user).delete()
+    _copy_recent_posts(user.id, user.id)
+    backfill_follows(
+        user.id,
+        list(
+            Follow.objects.filter(follower=user).values_list(
+                "followed_id", flat=True
+            )
+        ),
+    )
+
+
+def high_follower_authors(user: User) -> list[int]:
+    """Followed authors whose posts are merged into the feed on read."""
+    limit = fanout_follower_limit()
+    return [
+        author_id
+        for author_id, followers_count in follow_graph.followers_counts(
+            follow_graph.following_ids(user.id)
+        ).items()
+        if followers_count > limit
+    ]
+
+
+def visible_posts(user: User) -> QuerySet[Posts]:
+    """Posts `user` may open by id: their own and their followees'."""
+    return Posts.objects.filter(
+        Q(user=user)
+        | Q(
+            user_id__in=Follow.objects.filter(follower=user).values(
+                "followed_id"
+            )
+        )
+    )
+
+
+def home_timeline(user: User) -> QuerySet[Posts]:
+    """
+    Posts for the user's home feed, as one queryset.
+
+    Fanned-out posts are read from the user's timeline entries; posts of
+    followed high-follower authors, which are never fanned out, are merged
+    in at read time. Pages in recency order come cheaper from
+    `timeline_sources()`.
+    """
+    timeline = Q(
+        id__in=TimelineEntry.objects.filter(owner=user).values("posts_id")
+    )
+    authors = high_follower_authors(user)
+    if authors:
+        timeline |= Q(user_id__in=authors)
+
+    return Posts.objects.filter(timeline)
+
+
+def timeline_sources(user: User, posts: QuerySet[Posts]) -> list[QuerySet]:
+    """
+    The user's home feed restricted to `posts`, as querysets annotated with
+    `feed_created_at` to page with `KeysetPagination.paginate_merged()` on
+    (feed_created_at, id): the posts of their timeline entries, ordered by
+    the entries so pages are range scans of the (owner, created_at, posts)
+    index, and the posts of followed high-follower authors.
+    """
+    sources = [
+        posts.filter(timeline_entries__owner=user).annotate(
+            feed_created_at=F("timeline_entries__created_at")
+        )
+    ]
+    authors = high_follower_authors(user)
+    if authors:
+        sources.append(
+            posts.filter(user_id__in=authors).annotate(
+                feed_created_at=F("created_at")
+            )
+        )
+    return sources
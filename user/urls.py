@@ -1,20 +1,20 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView,
-)
 
+from user.async_views import obtain_token_pair, register
 from user.views import (
-    CreateUserView,
     ManageUserView,
+    TokenRefreshView,
+    TokenVerifyView,
+    ExportUserDataView,
     ProfileUserViewSet,
     FollowUserViewSet,
     PostViewSet,
     LikeViewSet,
     CommentViewSet,
     UserListView,
+    FollowerListView,
+    FollowingListView,
 )
 
 router = DefaultRouter()
@@ -25,12 +25,23 @@ router.register("likes", LikeViewSet)
 router.register("comments", CommentViewSet)
 
 urlpatterns = [
-    path("register/", CreateUserView.as_view(), name="create"),
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("register/", register, name="create"),
+    path("token/", obtain_token_pair, name="token_obtain_pair"),
     path("token/verify/", TokenVerifyView.as_view(), name="token_verify"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("me/", ManageUserView.as_view(), name="manage"),
+    path("me/export/", ExportUserDataView.as_view(), name="export"),
     path("users/", UserListView.as_view(), name="users"),
+    path(
+        "users/<int:pk>/followers/",
+        FollowerListView.as_view(),
+        name="user-followers",
+    ),
+    path(
+        "users/<int:pk>/following/",
+        FollowingListView.as_view(),
+        name="user-following",
+    ),
 ] + router.urls
 
 app_name = "user"
@@ -0,0 +1,103 @@
+"""
+Per-process cache of the `User` rows behind JWT requests.
+
+Authentication only needs to know that the token's user exists and is
+active; the row is kept here as a dict of field values in a short-TTL
+LRU so most requests resolve their user without a query. `User` signals
+invalidate the entry, so an update or deactivation is seen at once by
+this process and by the others within `USER_CACHE_TTL` seconds. Async
+views use `aget()`, which only leaves the event loop on a miss.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+
+from user.models import User
+
+ATTNAMES = tuple(field.attname for field in User._meta.concrete_fields)
+
+
+class UserCache:
+    def __init__(self, max_entries: int = 10_000, ttl: float = 30.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidation, so rows loaded concurrently with
+        # one are not stored.
+        self._generation = 0
+        self._entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def get(self, user_id: int) -> Optional[dict]:
+        """
+        The user's field values by attname, or None for unknown users.
+        The dict is shared: callers must not change it.
+        """
+        values, generation = self._lookup(user_id)
+        if generation is None:
+            return values
+        return self._load(user_id, generation)
+
+    async def aget(self, user_id: int) -> Optional[dict]:
+        values, generation = self._lookup(user_id)
+        if generation is None:
+            return values
+        return await sync_to_async(self._load)(user_id, generation)
+
+    def _lookup(self, user_id: int) -> tuple[Optional[dict], Optional[int]]:
+        """A fresh entry, or the generation to load the row under."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1], None
+            self.misses += 1
+            return None, self._generation
+
+    def _load(self, user_id: int, generation: int) -> Optional[dict]:
+        now = time.monotonic()
+        # Read from the primary: a lagging replica would cache rows older
+        # than the invalidation that caused this load.
+        values = User.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=user_id
+        ).values(*ATTNAMES).first()
+        # As in the follow graph cache, rows read inside a transaction
+        # may still be rolled back and are not shared.
+        if values is not None and not connection.in_atomic_block:
+            with self._lock:
+                if generation == self._generation:
+                    self._entries[user_id] = (now, values)
+                    self._entries.move_to_end(user_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return values
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+
+user_cache = UserCache(
+    max_entries=getattr(settings, "USER_CACHE_MAX_ENTRIES", 10_000),
+    ttl=getattr(settings, "USER_CACHE_TTL", 30),
+)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop the cached row now and again once the change is committed."""
+    user_cache.invalidate(user_id)
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
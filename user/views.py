@@ -1,32 +1,151 @@
-from typing import Any
+from typing import Any, Optional
 
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.db.models import QuerySet
+from django.http import QueryDict, StreamingHttpResponse
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from rest_framework import generics, viewsets
+from rest_framework.decorators import action
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.serializers import Serializer
 from rest_framework.settings import api_settings
-from rest_framework_simplejwt.tokens import RefreshToken
-
+from rest_framework_simplejwt import views as jwt_views
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import RefreshToken, Token
+
+from user.bulk import bulk_follow, bulk_like
+from user.counters import with_counters
+from user.export import buffered, export_user, parse_since
+from user.hashtags import filter_by_hashtags
+from user.likes import set_like
 from user.models import Profile, User, Follow, Posts, Like, Comment
+from user.pagination import CreatedAtKeysetPagination
 from user.permissions import IsOwnerOrReadOnly
+from user.revocation import revoke_token
+from user.row_serializers import (
+    CommentRowSerializer,
+    PostRowSerializer,
+    ProfileRowSerializer,
+    RowSerializer,
+    UserRowSerializer,
+)
+from user.search import search_posts
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
+    TokenRefreshSerializer,
+    TokenVerifySerializer,
+    BulkFollowSerializer,
+    BulkLikeSerializer,
+    BulkResultSerializer,
     ProfileSerializer,
     FollowSerializer,
+    FollowerSerializer,
+    FollowingSerializer,
     PostSerializer,
     LikeSerializer,
+    LikeStateSerializer,
     CommentSerializer,
 )
+from user.timeline import home_timeline, timeline_sources, visible_posts
+
+# Unranked feed pages are keyed on the timeline entries, see
+# `timeline_sources()`.
+TIMELINE_ORDERING = ("-feed_created_at", "-id")
+
+
+def filter_feed(
+        queryset: QuerySet[Posts], params: QueryDict
+) -> QuerySet[Posts]:
+    """Posts of `queryset` searched and filtered by `params`."""
+    content = params.get("content", None)
+    hashtags = params.get("hashtags", None)
+
+    if content:
+        queryset = search_posts(queryset, content)
+
+    if hashtags:
+        match_all = params.get("hashtags_match") == "all"
+        queryset = filter_by_hashtags(
+            queryset, hashtags.split(","), match_all
+        )
+
+    return queryset
+
+
+def post_feed(user: User, params: QueryDict) -> QuerySet[Posts]:
+    """
+    The user's home timeline as one queryset, searched and filtered by
+    `params`, for search results ranked by relevance.
+    """
+    return with_counters(filter_feed(home_timeline(user), params))
+
 
+def feed_sources(user: User, params: QueryDict) -> list[QuerySet[Posts]]:
+    """The home timeline filtered by `params`, see `timeline_sources()`."""
+    return [
+        with_counters(source)
+        for source in timeline_sources(
+            user, filter_feed(Posts.objects.all(), params)
+        )
+    ]
+
+
+def feed_ordering(params: QueryDict) -> Optional[tuple]:
+    """Search results are ranked unless `?ordering=recent`."""
+    if params.get("content") and params.get("ordering") != "recent":
+        return ("-rank", "-id")
+    return None
+
+
+def bulk_response(outcomes: dict[int, str]) -> Response:
+    return Response(
+        [
+            {"id": item_id, "status": outcome}
+            for item_id, outcome in outcomes.items()
+        ]
+    )
+
+
+class RowListMixin:
+    """
+    List `.values()` rows serialized by `row_serializer_class`, which gives
+    the same output as `serializer_class` at a fraction of the cost.
+    """
+
+    row_serializer_class: type[RowSerializer]
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        if not getattr(settings, "FAST_SERIALIZATION", True):
+            return super().list(request, *args, **kwargs)
 
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.row_serializer_class(
+            context=self.get_serializer_context()
+        )
+        rows = queryset.values(
+            *serializer.columns, *queryset.query.annotation_select
+        )
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representations(page)
+            )
+        return Response(serializer.to_representations(list(rows)))
+
+
+# Registration is served by `user.async_views.register`, which answers
+# like this view; the schema documents `register/` with it.
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
+    authentication_classes = ()
 
 
 class CreateTokenView(ObtainAuthToken):
@@ -34,6 +153,14 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
 
 
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    serializer_class = TokenRefreshSerializer
+
+
+class TokenVerifyView(jwt_views.TokenVerifyView):
+    serializer_class = TokenVerifySerializer
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
     permission_classes = (IsAuthenticated,)
@@ -42,10 +169,17 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
     def post(self, request, *args: Any, **kwargs: Any) -> Response:
-        refresh_token = request.COOKIES.get("refresh_token")
+        """Log out: revoke the refresh token and this access token."""
+        refresh_token = (
+            request.data.get("refresh") or request.COOKIES.get("refresh_token")
+        )
         if refresh_token:
-            token = RefreshToken(refresh_token)
-            token.blacklist()
+            try:
+                revoke_token(RefreshToken(refresh_token))
+            except TokenError as error:
+                raise InvalidToken(error.args[0])
+        if isinstance(request.auth, Token):
+            revoke_token(request.auth)
 
         response = Response({"message": "Logged out successfully"})
         response.delete_cookie("refresh_token")
@@ -53,15 +187,82 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         return response
 
 
-class UserListView(generics.ListAPIView):
-    queryset = User.objects.all()
+class ExportUserDataView(APIView):
+    """Stream the user's profile, posts, comments, likes and follows."""
+
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="since",
+                type=str,
+                description=(
+                    "Only rows created or changed after this ISO 8601 time, "
+                    "e.g. `exported_at` of the previous export"
+                ),
+                location=OpenApiParameter.QUERY
+            ),
+        ],
+        responses={(200, "application/x-ndjson"): str},
+    )
+    def get(self, request: Request) -> StreamingHttpResponse:
+        since = None
+        if request.query_params.get("since"):
+            try:
+                since = parse_since(request.query_params["since"])
+            except ValueError:
+                raise ValidationError({"since": "Invalid ISO 8601 time."})
+
+        response = StreamingHttpResponse(
+            buffered(export_user(request.user, since, {"request": request})),
+            content_type="application/x-ndjson",
+        )
+        response.headers["Content-Disposition"] = (
+            'attachment; filename="export.ndjson"'
+        )
+        return response
+
+
+class UserListView(RowListMixin, generics.ListAPIView):
+    queryset = User.objects.with_follow_counts()
     serializer_class = UserSerializer
+    row_serializer_class = UserRowSerializer
+    permission_classes = (IsAuthenticated,)
+
+
+class FollowerListView(generics.ListAPIView):
+    """Users following the user `pk`, newest follow first."""
+
+    serializer_class = FollowerSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self) -> QuerySet[Follow]:
+        return Follow.objects.filter(
+            followed_id=self.kwargs["pk"]
+        ).select_related("follower").only(
+            "id", "created_at", "follower__id", "follower__email"
+        )
+
+
+class FollowingListView(generics.ListAPIView):
+    """Users followed by the user `pk`, newest follow first."""
+
+    serializer_class = FollowingSerializer
     permission_classes = (IsAuthenticated,)
 
+    def get_queryset(self) -> QuerySet[Follow]:
+        return Follow.objects.filter(
+            follower_id=self.kwargs["pk"]
+        ).select_related("followed").only(
+            "id", "created_at", "followed__id", "followed__email"
+        )
+
 
-class ProfileUserViewSet(viewsets.ModelViewSet):
+class ProfileUserViewSet(RowListMixin, viewsets.ModelViewSet):
     queryset = Profile.objects.all()
     serializer_class = ProfileSerializer
+    row_serializer_class = ProfileRowSerializer
     permission_classes = (IsOwnerOrReadOnly,)
 
     def perform_create(self, serializer: Serializer) -> None:
@@ -93,67 +294,175 @@ class FollowUserViewSet(viewsets.ModelViewSet):
     permission_classes = (IsAuthenticated,)
 
     def perform_create(self, serializer: Serializer) -> None:
-        followed_user = User.objects.get(
-            id=serializer.validated_data["followed"].id
-        )
+        followed_user = serializer.validated_data["followed"]
 
         if self.request.user == followed_user:
             raise ValidationError({"message": "You cannot follow yourself."})
 
-        if Follow.objects.filter(
-            follower=self.request.user, followed=followed_user
-        ).exists():
+        # The unique constraint decides, not the follow cache: a cached
+        # entry may predate an unfollow handled by another worker.
+        try:
+            with transaction.atomic():
+                serializer.save(follower=self.request.user)
+        except IntegrityError:
             raise ValidationError(
                 {
                     "message": "You are already following this user."
                 }
             )
 
-        serializer.save(follower=self.request.user)
+    @extend_schema(
+        request=BulkFollowSerializer,
+        responses=BulkResultSerializer(many=True),
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request: Request) -> Response:
+        """Follow up to `BULK_MAX_ITEMS` users in one request."""
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = bulk_follow(
+            request.user, serializer.validated_data["followed"]
+        )
+        return bulk_response(outcomes)
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(RowListMixin, viewsets.ModelViewSet):
     queryset = Posts.objects.all()
     serializer_class = PostSerializer
+    row_serializer_class = PostRowSerializer
     permission_classes = (IsOwnerOrReadOnly, IsAuthenticated)
+    pagination_class = CreatedAtKeysetPagination
+    lookup_value_regex = r"\d+"
 
     @extend_schema(
         parameters=[
             OpenApiParameter(
                 name="content",
                 type=str,
-                description="Filter by content (ex. ?content=)",
+                description=(
+                    "Full-text search in content, ranked by relevance "
+                    "(ex. ?content=summer holiday)"
+                ),
+                location=OpenApiParameter.QUERY
+            ),
+            OpenApiParameter(
+                name="ordering",
+                type=str,
+                enum=["relevance", "recent"],
+                description=(
+                    "Order search results by relevance (default) "
+                    "or newest first (ex. ?ordering=recent)"
+                ),
                 location=OpenApiParameter.QUERY
             ),
             OpenApiParameter(
                 name="hashtags",
                 type=str,
-                description="Filter by hashtags (ex. ?hashtags=Summer)",
+                description=(
+                    "Filter by exact hashtags, comma separated "
+                    "(ex. ?hashtags=Summer,beach)"
+                ),
+                location=OpenApiParameter.QUERY
+            ),
+            OpenApiParameter(
+                name="hashtags_match",
+                type=str,
+                enum=["any", "all"],
+                description=(
+                    "Match posts with any (default) or all of the hashtags "
+                    "(ex. ?hashtags_match=all)"
+                ),
                 location=OpenApiParameter.QUERY
             ),
         ]
     )
     def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
-        return super().list(request, *args, **kwargs)
+        """
+        The home timeline, newest first. Ranked search pages the whole
+        feed queryset, other pages are merged from `feed_sources()`.
+        """
+        if feed_ordering(request.query_params):
+            return super().list(request, *args, **kwargs)
+
+        sources = feed_sources(request.user, request.query_params)
+        if not getattr(settings, "FAST_SERIALIZATION", True):
+            page = self.paginator.paginate_merged(sources, request, self)
+            return self.get_paginated_response(
+                self.get_serializer(page, many=True).data
+            )
+
+        serializer = self.row_serializer_class(
+            context=self.get_serializer_context()
+        )
+        page = self.paginator.paginate_merged(
+            [
+                source.values(
+                    *serializer.columns, *source.query.annotation_select
+                )
+                for source in sources
+            ],
+            request,
+            self,
+        )
+        return self.get_paginated_response(
+            serializer.to_representations(page)
+        )
 
     def perform_create(self, serializer: Serializer) -> None:
         serializer.save(user=self.request.user)
 
-    def get_queryset(self) -> QuerySet[Posts]:
-        user = self.request.user
-        content = self.request.query_params.get("content", None)
-        hashtags = self.request.query_params.get("hashtags", None)
-        queryset = Posts.objects.all()
-
-        if content:
-            queryset = queryset.filter(content__icontains=content)
+    @extend_schema(request=None, responses=LikeStateSerializer)
+    @action(
+        detail=True,
+        methods=["put", "delete"],
+        permission_classes=(IsAuthenticated,),
+    )
+    def like(self, request: Request, pk: str = None) -> Response:
+        """Like (PUT) or unlike (DELETE) a post; both are idempotent."""
+        liked = request.method == "PUT"
+        if not visible_posts(request.user).filter(pk=pk).exists():
+            raise NotFound()
+        count = set_like(request.user, int(pk), liked)
+        if count is None:
+            raise NotFound()
+        return Response({"liked": liked, "like_count": count})
+
+    @extend_schema(responses=CommentSerializer(many=True))
+    @action(detail=True, methods=["get"])
+    def comments(self, request: Request, pk: str = None) -> Response:
+        """Comments on a post, newest first."""
+        serializer = CommentRowSerializer(
+            context=self.get_serializer_context()
+        )
+        posts = visible_posts(request.user)
+        rows = Comment.objects.filter(
+            posts_id=pk, posts__in=posts
+        ).values(*serializer.columns)
+        page = self.paginate_queryset(rows)
+        if not page and not posts.filter(pk=pk).exists():
+            raise NotFound()
+        return self.get_paginated_response(
+            serializer.to_representations(page)
+        )
 
-        if hashtags:
-            queryset = queryset.filter(hashtags__icontains=hashtags)
+    def get_keyset_ordering(self) -> Optional[tuple]:
+        if self.action == "list":
+            return (
+                feed_ordering(self.request.query_params) or TIMELINE_ORDERING
+            )
+        return None
 
-        return queryset.filter(user=user) | queryset.filter(
-            user__in=user.following.values_list("followed", flat=True)
-        )
+    def get_queryset(self) -> QuerySet[Posts]:
+        """
+        The ranked feed for search, otherwise the posts of the user and of
+        those they follow: posts outside the materialized timeline (older
+        than its backfill, or of authors who were above the fan-out limit)
+        stay reachable by id.
+        """
+        params = self.request.query_params
+        if self.action == "list" and feed_ordering(params):
+            return post_feed(self.request.user, params)
+        return with_counters(visible_posts(self.request.user))
 
 
 class LikeViewSet(viewsets.ModelViewSet):
@@ -162,17 +471,40 @@ class LikeViewSet(viewsets.ModelViewSet):
     permission_classes = (IsOwnerOrReadOnly, IsAuthenticated)
 
     def perform_create(self, serializer: Serializer) -> None:
-        user = self.request.user
-        post = serializer.validated_data["posts"]
-        if Like.objects.filter(user=user, posts=post).exists():
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
             raise ValidationError("You have already liked this post.")
-        serializer.save(user=user)
 
+    def perform_destroy(self, instance: Like) -> None:
+        with transaction.atomic():
+            instance.delete()
 
-class CommentViewSet(viewsets.ModelViewSet):
+    @extend_schema(
+        request=BulkLikeSerializer,
+        responses=BulkResultSerializer(many=True),
+    )
+    @action(detail=False, methods=["post"])
+    def bulk(self, request: Request) -> Response:
+        """Like up to `BULK_MAX_ITEMS` posts in one request."""
+        serializer = BulkLikeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = bulk_like(request.user, serializer.validated_data["posts"])
+        return bulk_response(outcomes)
+
+
+class CommentViewSet(RowListMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    row_serializer_class = CommentRowSerializer
     permission_classes = (IsOwnerOrReadOnly, IsAuthenticated)
+    pagination_class = CreatedAtKeysetPagination
 
     def perform_create(self, serializer: Serializer) -> None:
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            serializer.save(user=self.request.user)
+
+    def perform_destroy(self, instance: Comment) -> None:
+        with transaction.atomic():
+            instance.delete()